@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+可选的 asyncio 运行时 - 在一个事件循环中运行闹钟调度和定时器
+
+AsyncAlarmRuntime 用协程代替 AlarmEngine 自带的触发线程：调度协程睡眠到
+最早的触发时间，闹钟变化时通过等待器回调被唤醒。定时器是事件循环上的
+回调，取消只需取消句柄，不需要额外的线程。
+
+有界面时由 TkLoopPump 在 Tk 主循环中推进事件循环（闹钟回调和界面代码都在
+主线程中执行，无需加锁）：推进一轮后按事件循环中最早的定时器安排下一次，
+其他线程提交回调时通过 wakeup 立即唤醒，空闲时不会周期性地轮询。
+"""
+import asyncio
+import logging
+import math
+import threading
+
+from alarm_scheduler import MAX_IDLE_WAIT, seconds_until
+
+MAX_PUMP_DELAY_MS = int(MAX_IDLE_WAIT * 1000)  # 没有定时器时两次推进的最长间隔
+
+
+class AsyncAlarmRuntime:
+    """基于 asyncio 的闹钟运行时
+
+    Args:
+        engine: AlarmEngine 实例，运行时接管其触发（不要同时调用 engine.start()）
+        loop: 使用的事件循环，默认新建
+    """
+
+    def __init__(self, engine, loop=None):
+        self.engine = engine
+        self.loop = loop or asyncio.new_event_loop()
+        self._changed = asyncio.Event()
+        self._scheduler_task = None
+        self._thread = None
+        # 其他线程向事件循环提交回调后调用（TkLoopPump.wake），使推进事件循环的一方立即处理
+        self.wakeup = None
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """创建调度协程（事件循环由 TkLoopPump 或 run_in_thread() 推进）"""
+        if self._scheduler_task and not self._scheduler_task.done():
+            return
+        self.engine.scheduler.waiter.add_callback(self._on_change)
+        self._scheduler_task = self.loop.create_task(self._run_scheduler())
+        logging.info("asyncio 闹钟运行时已启动")
+
+    def run_in_thread(self):
+        """在后台线程中运行事件循环（无界面时使用）"""
+        self.start()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="AlarmAsyncLoop", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """取消所有任务并停止事件循环"""
+        self.engine.scheduler.waiter.remove_callback(self._on_change)
+        if self._thread and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self._cancel_all)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=timeout)
+        elif not self.loop.is_closed():
+            self._cancel_all()
+            # 让被取消的任务执行完清理代码
+            self.loop.run_until_complete(asyncio.sleep(0))
+        logging.info("asyncio 闹钟运行时已停止")
+
+    def _cancel_all(self):
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+
+    # ---- 调度 ----
+
+    def _on_change(self):
+        """闹钟变化时（可能在任意线程中）唤醒调度协程"""
+        try:
+            self.loop.call_soon_threadsafe(self._changed.set)
+        except RuntimeError:
+            return  # 事件循环已关闭
+        self._wake()
+
+    async def _run_scheduler(self):
+        """调度协程：触发到期闹钟后睡眠到下一个触发时间或闹钟变化"""
+        while True:
+            # 先清除标志再检查，检查期间发生的变化不会丢失
+            self._changed.clear()
+            try:
+                self.engine.run_pending()
+            except Exception as e:
+                logging.error(f"asyncio 调度协程中的错误: {e}")
+            deadline = self.engine.next_fire_time()
+            timeout = MAX_IDLE_WAIT if deadline is None else min(MAX_IDLE_WAIT, seconds_until(deadline))
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---- 任务 ----
+
+    def spawn(self, coro):
+        """在事件循环中运行协程
+
+        在事件循环线程（或 Tk 主线程）中调用时返回 asyncio.Task，
+        从其他线程调用时返回 concurrent.futures.Future。
+        """
+        if self._thread and threading.current_thread() is not self._thread:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        task = self.loop.create_task(coro)
+        self._wake()
+        return task
+
+    def call_later(self, delay, callback, *args):
+        """在 delay 秒后调用 callback，返回可 cancel() 的句柄（无需额外线程）"""
+        handle = self.loop.call_later(delay, callback, *args)
+        self._wake()  # 新的定时器可能早于推进事件循环的一方原来安排的时间
+        return handle
+
+    def _wake(self):
+        if self.wakeup:
+            self.wakeup()
+
+
+class TkLoopPump:
+    """由 Tk 主循环推进 asyncio 事件循环
+
+    每次执行一轮事件循环中已就绪的回调后立即交还给 Tk，并按最早的定时器
+    安排下一次推进（最长 max_delay_ms 毫秒）。其他线程提交回调时调用 wake()
+    立即推进。
+    """
+
+    def __init__(self, root, loop, max_delay_ms=MAX_PUMP_DELAY_MS):
+        self.root = root
+        self.loop = loop
+        self.max_delay_ms = max_delay_ms
+        self._job = None
+        self._woken = False
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(0, self._pump)
+
+    def stop(self):
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+
+    def wake(self):
+        """尽快推进一轮（可以在任意线程中调用，多次调用合并为一次）"""
+        if self._job is None or self._woken:
+            return
+        self._woken = True
+        try:
+            self.root.after(0, self._pump)
+        except RuntimeError:
+            pass  # Tk 主循环已结束
+
+    def next_delay_ms(self):
+        """距下一次需要推进事件循环的毫秒数"""
+        # asyncio 没有查询下一个定时器的公开接口，这里读取 BaseEventLoop 的就绪队列和定时器堆
+        if getattr(self.loop, '_ready', None):
+            return 0
+        scheduled = getattr(self.loop, '_scheduled', None)
+        if not scheduled:
+            return self.max_delay_ms
+        delay = scheduled[0].when() - self.loop.time()
+        return max(0, min(self.max_delay_ms, math.ceil(delay * 1000)))
+
+    def _pump(self):
+        if self._job is None:
+            return  # 已停止
+        self._woken = False
+        # 被 wake() 提前唤醒时取消原来按定时器安排的推进
+        self.root.after_cancel(self._job)
+        # stop() 排在已就绪回调之后，run_forever() 只执行一轮就返回
+        self.loop.call_soon(self.loop.stop)
+        try:
+            self.loop.run_forever()
+        except Exception as e:
+            logging.error(f"推进事件循环时出错: {e}")
+        self._job = self.root.after(self.next_delay_ms(), self._pump)
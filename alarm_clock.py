@@ -1,15 +1,21 @@
 import time
 import datetime
-import winsound
 import sys
 import traceback
 from typing import Optional, Dict, Any
 
+from alarm_engine import AlarmEngine, next_fire_time
+from alarm_scheduler import seconds_until
+from alarm_sound import beep
+from recurrence import RecurrenceRule
+from single_instance import InstanceLock, hand_off
+
 # 配置常量
 APP_NAME = "专业闹钟程序"
 APP_VERSION = "v1.0"
 MAX_RETRIES = 3
 DEFAULT_SOUND_DURATION = 3
+STATUS_REFRESH_INTERVAL = 1  # 终端状态行的刷新间隔（秒）
 
 # 颜色和样式常量（Windows命令提示符可能不支持所有颜色）
 COLORS = {
@@ -29,7 +35,8 @@ ERROR_CODES = {
     "AUDIO_PLAYBACK_ERROR": 1005,
     "TIME_INPUT_ERROR": 1006,
     "MODE_INPUT_ERROR": 1007,
-    "FATAL_ERROR": 1008
+    "FATAL_ERROR": 1008,
+    "INSTANCE_UNREACHABLE": 1009
 }
 
 class AlarmClockError(Exception):
@@ -157,7 +164,7 @@ def play_alarm_sound(duration=DEFAULT_SOUND_DURATION):
     log_message("info", f"🔔 正在响铃 {duration} 秒...", show_icon=False)
     
     try:
-        # 使用Windows蜂鸣音
+        # 使用Windows蜂鸣音（其他平台为终端响铃）
         frequency = 2500  # 频率(Hz)
         delay = 500  # 每次蜂鸣的持续时间(毫秒)
         pause = 100  # 蜂鸣间隔(毫秒)
@@ -167,7 +174,7 @@ def play_alarm_sound(duration=DEFAULT_SOUND_DURATION):
         # 显示响铃进度
         for i in range(iterations):
             try:
-                winsound.Beep(frequency, delay)
+                beep(frequency, delay)
                 time.sleep(pause / 1000)
                 
                 # 显示响铃进度
@@ -243,14 +250,9 @@ def get_valid_boolean_input(prompt="请选择（y/n，默认n）：", default=Fa
 def calculate_time_remaining(target_hour, target_minute):
     """计算距离目标时间的剩余时间"""
     now = datetime.datetime.now()
-    current_time = now.replace(second=0, microsecond=0)
-    
-    # 创建今天的目标时间
-    target_datetime = now.replace(hour=target_hour, minute=target_minute, second=0, microsecond=0)
     
-    # 如果目标时间已过，则设置为明天
-    if target_datetime <= current_time:
-        target_datetime += datetime.timedelta(days=1)
+    # 目标时间（如果今天已过，则设置为明天）
+    target_datetime = next_fire_time(target_hour, target_minute, now)
     
     # 计算剩余时间
     remaining = target_datetime - now
@@ -285,8 +287,18 @@ def alarm(alarm_time: str, repeat: bool = False, sound_duration: int = DEFAULT_S
         log_message("info", "提示：按 Ctrl+C 随时退出程序", show_icon=False)
         print("="*60)
         
-        # 计算初始总等待时间（用于进度条）
-        _, _, _, initial_total_seconds = calculate_time_remaining(target_hour, target_minute)
+        # 由闹钟引擎负责触发，命令行只需在前台调用 run_pending()
+        # 循环模式是每60分钟重复一次的规则，下一次时间由引擎在触发时计算
+        engine = AlarmEngine()
+        recurrence = RecurrenceRule.every_minutes(60) if repeat else None
+        engine.add_alarm(next_fire_time(target_hour, target_minute), label=alarm_time, recurrence=recurrence)
+        target_datetime = engine.next_fire_time()
+        
+        # 初始总等待时间（用于进度条）
+        initial_total_seconds = seconds_until(target_datetime)
+        
+        # 只有输出到终端时才需要每秒刷新状态行，否则直接睡眠到闹钟时间
+        show_status = sys.stdout.isatty()
         
         log_message("info", "闹钟已启动，开始监控时间...", show_icon=False)
         
@@ -294,30 +306,10 @@ def alarm(alarm_time: str, repeat: bool = False, sound_duration: int = DEFAULT_S
             try:
                 # 获取当前时间和剩余时间
                 now = datetime.datetime.now()
-                status_time = now.strftime("%H:%M:%S")
-                hours, minutes, seconds, total_seconds = calculate_time_remaining(target_hour, target_minute)
-                
-                # 计算进度百分比（基于当前周期）
-                if initial_total_seconds > 0:
-                    progress = 1 - (total_seconds / initial_total_seconds)
-                    progress = max(0, min(1, progress))  # 确保进度在0-1之间
-                    progress_bar = update_progress_bar(progress)
-                else:
-                    progress_bar = update_progress_bar(1.0)
-                
-                # 生成剩余时间显示
-                if hours > 0:
-                    remaining_text = f"剩余 {hours:02d}:{minutes:02d}:{seconds:02d}"
-                else:
-                    remaining_text = f"剩余 {minutes:02d}:{seconds:02d}"
-                
-                # 实时更新状态行
-                status_line = f"\r⏱️  当前: {status_time} | 🎯 目标: {alarm_time} | {remaining_text} | {progress_bar}"
-                print(status_line, end="", flush=True)
                 
                 # 检查是否到达目标时间
-                current_hour, current_minute = now.hour, now.minute
-                if current_hour == target_hour and current_minute == target_minute:
+                fired = engine.run_pending(now)
+                if fired:
                     print("\n")
                     log_message("success", "🎉 闹钟时间到！")
                     
@@ -330,25 +322,44 @@ def alarm(alarm_time: str, repeat: bool = False, sound_duration: int = DEFAULT_S
                     if not repeat:
                         log_message("info", "✅ 闹钟已关闭")
                         break  # 单次模式：响铃后退出
-                    else:
-                        log_message("info", "🔄 循环模式：重置进度，下一次提醒将在1小时后")
-                        print("="*60)
-                        # 重置进度计算的总时间为3600秒
-                        initial_total_seconds = 3600
-                        # 等待1小时后再次提醒
-                        # 每10秒更新一次进度显示
-                        for i in range(360):
-                            time.sleep(10)
-                            # 更新进度条
-                            progress = (i + 1) / 360
-                            progress_bar = update_progress_bar(progress)
-                            remaining_seconds = 3600 - (i + 1) * 10
-                            rem_minutes, rem_seconds = divmod(remaining_seconds, 60)
-                            status_line = f"\r🔄 等待下次提醒 | 剩余 {rem_minutes:02d}:{rem_seconds:02d} | {progress_bar}"
-                            print(status_line, end="", flush=True)
+                    
+                    log_message("info", "🔄 循环模式：重置进度，下一次提醒将在1小时后")
+                    print("="*60)
+                    # 下一次提醒在1小时后，重置进度计算的总时间为3600秒
+                    target_datetime = engine.next_fire_time()
+                    initial_total_seconds = 3600
+                    continue
                 
-                # 每1秒更新一次（更好的实时性）
-                time.sleep(1)
+                remaining_seconds = seconds_until(target_datetime, now)
+                
+                if show_status:
+                    hours, remainder = divmod(int(remaining_seconds), 3600)
+                    minutes, seconds = divmod(remainder, 60)
+                    
+                    # 计算进度百分比（基于当前周期）
+                    if initial_total_seconds > 0:
+                        progress = 1 - (remaining_seconds / initial_total_seconds)
+                        progress = max(0, min(1, progress))  # 确保进度在0-1之间
+                        progress_bar = update_progress_bar(progress)
+                    else:
+                        progress_bar = update_progress_bar(1.0)
+                    
+                    # 生成剩余时间显示
+                    if hours > 0:
+                        remaining_text = f"剩余 {hours:02d}:{minutes:02d}:{seconds:02d}"
+                    else:
+                        remaining_text = f"剩余 {minutes:02d}:{seconds:02d}"
+                    
+                    # 实时更新状态行
+                    status_time = now.strftime("%H:%M:%S")
+                    status_line = f"\r⏱️  当前: {status_time} | 🎯 目标: {target_datetime.strftime('%H:%M')} | {remaining_text} | {progress_bar}"
+                    print(status_line, end="", flush=True)
+                    
+                    # 睡眠到下一次刷新或闹钟时间（取较早者），避免最多1秒的触发延迟
+                    time.sleep(min(STATUS_REFRESH_INTERVAL, remaining_seconds))
+                else:
+                    # 无需刷新状态行时直接睡眠到闹钟时间
+                    time.sleep(remaining_seconds)
                 
             except AlarmClockError as e:
                 log_message("error", f"闹钟运行错误: {e.message}")
@@ -369,6 +380,32 @@ def alarm(alarm_time: str, repeat: bool = False, sound_duration: int = DEFAULT_S
         log_message("error", f"严重错误: {str(e)}")
         traceback.print_exc(file=sys.stderr)
 
+def hand_off_to_running_instance(alarm_time: str, repeat: bool) -> bool:
+    """
+    已有闹钟程序（图形界面或守护进程）在运行时，把闹钟交给它，避免两个进程各自检查和响铃
+    :return: 是否已交给正在运行的实例
+    :raises AlarmClockError: 已有实例在运行但无法交给它时（不在本进程中再运行一份闹钟）
+    """
+    instance_lock = InstanceLock()
+    if instance_lock.acquire():
+        # 没有正在运行的实例，由本进程自己响铃（命令行不作为常驻实例）
+        instance_lock.release()
+        return False
+    request = {'op': 'add', 'time': alarm_time, 'label': alarm_time}
+    if repeat:
+        request['repeat'] = "每小时"
+    try:
+        response = hand_off([request])[0]
+    except OSError as e:
+        raise AlarmClockError(ERROR_CODES["INSTANCE_UNREACHABLE"],
+                              f"闹钟程序已在运行 (PID {instance_lock.owner_pid()})，但无法连接: {e}",
+                              original_exception=e)
+    if not response['ok']:
+        raise AlarmClockError(ERROR_CODES["INSTANCE_UNREACHABLE"],
+                              f"正在运行的闹钟程序拒绝了请求: {response['error']}")
+    log_message("success", f"闹钟程序已在运行 (PID {instance_lock.owner_pid()})，闹钟 #{response['result']['id']} 已交给它处理")
+    return True
+
 def show_welcome_screen():
     """显示专业的欢迎界面"""
     # 清屏（跨平台兼容的简单实现）
@@ -461,8 +498,9 @@ def main():
         log_message("success", "✅ 所有配置已完成，即将启动闹钟")
         print("="*60)
         
-        # 启动闹钟
-        alarm(alarm_time=alarm_time, repeat=repeat, sound_duration=sound_duration)
+        # 已有闹钟程序在运行时交给它处理，否则在本进程中启动闹钟
+        if not hand_off_to_running_instance(alarm_time, repeat):
+            alarm(alarm_time=alarm_time, repeat=repeat, sound_duration=sound_duration)
         
         # 程序结束
         print("="*60)
@@ -504,6 +542,16 @@ except Exception:
     pass
 
 if __name__ == "__main__":
+    # --daemon: 以无界面守护进程方式运行（不导入 Tk）
+    if "--daemon" in sys.argv[1:]:
+        from alarm_daemon import main as daemon_main
+        sys.exit(daemon_main(sys.argv[1:]))
+    # add/list/rm/snooze/next/import: 非交互式子命令，转发给 alarmctl（输出供脚本使用，不打印退出信息）
+    from alarmctl import COMMANDS as CTL_COMMANDS
+    if len(sys.argv) > 1 and sys.argv[1] in CTL_COMMANDS:
+        from alarmctl import main as ctl_main
+        atexit.unregister(handle_program_exit)
+        sys.exit(ctl_main(sys.argv[1:]))
     try:
         exit_code = main()
         sys.exit(exit_code)
@@ -10,6 +10,16 @@ import traceback
 import logging
 import os
 
+from alarm_async import AsyncAlarmRuntime, TkLoopPump
+from alarm_engine import AlarmEngine, next_fire_time
+from alarm_history import DISMISS, FIRE, SNOOZE, STOP, AlarmHistory
+from alarm_ipc import DEFAULT_SOCKET_PATH, AlarmIPCServer, IPCError
+from alarm_journal import AlarmJournal
+from alarm_remote import RemoteAlarmEngine
+from alarm_workers import WorkerPool
+from recurrence import REPEAT_CHOICES, RecurrenceRule
+from single_instance import InstanceLock, hand_off
+
 # 尝试导入pygame库用于内置音频播放
 pygame_available = False
 print("[DEBUG] 尝试导入pygame库...")
@@ -324,7 +334,14 @@ def handle_unexpected_error(exctype, value, tb):
 sys.excepthook = handle_unexpected_error
 
 class AlarmClockGUI:
-    def __init__(self, root):
+    def __init__(self, root, use_asyncio=False, daemon=None, remote=None):
+        """
+        Args:
+            root: Tk 根窗口
+            use_asyncio: 使用 asyncio 运行时触发闹钟（由Tk主循环推进），否则使用引擎线程
+            daemon: 连接到同一进程中的闹钟守护进程（AlarmDaemon），使用其引擎，关闭窗口时只断开连接
+            remote: 连接到其他进程中的守护进程（RemoteAlarmEngine），关闭窗口时只断开连接
+        """
         self.root = root
         self.root.title("闹钟应用")
         self.root.geometry("650x1000")  # 减小窗口大小以提高稳定性
@@ -350,8 +367,6 @@ class AlarmClockGUI:
         # 启动紧急更新循环
         self.root.after(1000, emergency_update)
         
-        # 用于生成唯一闹钟ID的计数器
-        self.alarm_id_counter = 1
         logging.info("闹钟应用初始化")
         logging.info(f"应用启动时playsound状态: available={playsound_available}")
         
@@ -374,8 +389,32 @@ class AlarmClockGUI:
         self.local_music_path = None
         
         # 闹钟相关变量
-        self.alarms = []  # 存储多个闹钟的列表，每个闹钟是一个字典
-        self.alarm_thread = None
+        # 闹钟的存储、排序和触发由引擎负责，界面只接收到期通知
+        self.daemon = daemon
+        self.remote = remote
+        if daemon:
+            self.engine = daemon.engine
+            daemon.attach(self._on_alarms_triggered)
+            # 通过控制接口（alarmctl）修改的闹钟也要刷新到列表中
+            self.engine.add_change_listener(self._on_engine_changed)
+            if daemon.ipc:
+                daemon.ipc.controller.add_activate_listener(self._on_activate)
+        elif remote:
+            self.engine = remote
+            self.engine.add_listener(self._on_alarms_triggered)
+            self.engine.add_change_listener(self._on_engine_changed)
+            self.engine.add_activate_listener(self._on_activate)
+        else:
+            self.engine = AlarmEngine()
+            self.engine.add_listener(self._on_alarms_triggered)
+        self.ipc = None  # 本窗口提供的控制接口（见 serve_ipc）
+        self.journal = None  # 闹钟日志（见 enable_journal）
+        self.history = None  # 响铃历史（见 enable_history）
+        self.alarm_sort_key = None  # 闹钟列表的显示排序方式
+        self._list_refresh_pending = False  # 是否已安排列表刷新（合并连续的变化）
+        self.current_alarm = None  # 当前响铃的闹钟（决定铃声和贪睡时间）
+        self.ringing_alarms = []  # 本次响铃中到期的所有闹钟
+        self.ringing_listbox = None
         self.stop_event = threading.Event()
         self.current_alarm_label = ""
         self.use_24h_format = True
@@ -385,7 +424,11 @@ class AlarmClockGUI:
         self.player_process = None
         self._music_playing = False  # 标记本地音乐是否正在播放
         self.lock = threading.RLock()  # 用于线程安全操作的锁
-        self.preview_thread = None
+        # 铃声播放、预览和触发回调共用固定大小的工作线程池
+        self.workers = WorkerPool(size=3, name="AlarmWorker")
+        self.sound_token = None  # 当前铃声播放任务的取消令牌
+        self.preview_token = None  # 当前预览任务的取消令牌
+        self.trigger_hooks = []  # 闹钟触发后在工作线程中执行的回调 hook(alarms)
         self.is_previewing = False
         self.player_process = None  # 播放器进程引用
         # 为兼容旧代码添加初始化
@@ -415,9 +458,32 @@ class AlarmClockGUI:
         self.update_clock()
         logging.info("时钟更新线程启动")
         
+        # 启动闹钟引擎（asyncio 模式下闹钟在主线程中由事件循环触发）
+        self.runtime = None
+        self.loop_pump = None
+        if self.daemon:
+            logging.info("已连接到闹钟守护进程")
+        elif self.remote:
+            # 订阅守护进程的事件，守护进程之后把到期的闹钟交给本窗口
+            self.engine.start()
+        elif use_asyncio:
+            self.runtime = AsyncAlarmRuntime(self.engine)
+            self.runtime.start()
+            self.loop_pump = TkLoopPump(self.root, self.runtime.loop)
+            self.runtime.wakeup = self.loop_pump.wake
+            self.loop_pump.start()
+            logging.info("使用 asyncio 运行时触发闹钟")
+        else:
+            self.engine.start()
+        
         # 设置窗口关闭时的处理
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
+    @property
+    def alarms(self):
+        """当前设置的所有闹钟（按添加顺序）"""
+        return self.engine.alarms()
+    
     def create_widgets(self):
         print("[DEBUG] 开始创建UI组件...")
         
@@ -560,6 +626,14 @@ class AlarmClockGUI:
         snooze_spin.pack(side="left", padx=5)
         ttk.Label(snooze_frame, text="分钟", font=self.font_config["label"]).pack(side="left", padx=5)
         
+        # 重复设置
+        ttk.Label(snooze_frame, text="重复:", font=self.font_config["label"]).pack(side="left", padx=(20, 5))
+        self.repeat_var = tk.StringVar(value=REPEAT_CHOICES[0])
+        repeat_combo = ttk.Combobox(snooze_frame, textvariable=self.repeat_var, width=8, state="readonly")
+        repeat_combo['values'] = REPEAT_CHOICES
+        repeat_combo.current(0)
+        repeat_combo.pack(side="left", padx=5)
+        
         # 铃声选择
         ringtone_frame = ttk.LabelFrame(self.root, text="铃声设置", padding=10)
         ringtone_frame.pack(fill="x", padx=20, pady=(8, 2))
@@ -742,6 +816,8 @@ class AlarmClockGUI:
         # 如果正在预览，先停止
         if self.is_previewing:
             self.is_previewing = False
+            if self.preview_token:
+                self.preview_token.cancel()
             return
         
         try:
@@ -750,8 +826,8 @@ class AlarmClockGUI:
             # 设置预览状态
             self.is_previewing = True
             
-            # 在单独线程中播放铃声预览
-            def preview_thread_func():
+            # 在工作线程中播放铃声预览
+            def preview_thread_func(token):
                 try:
                     if selected_ringtone == "本地音乐":
                         # 检查本地音乐路径是否存在
@@ -792,11 +868,11 @@ class AlarmClockGUI:
                         logging.info(f"正在预览铃声: {selected_ringtone} (频率: {frequency}Hz)")
                         # 播放预览铃声（短版本）
                         for _ in range(2):  # 播放两次
-                            if not self.is_previewing:
+                            if not self.is_previewing or token.cancelled:
                                 break
                             try:
                                 winsound.Beep(frequency, duration)
-                                time.sleep(0.2)  # 短暂间隔
+                                token.wait(0.2)  # 短暂间隔
                             except Exception as e:
                                 error_msg = f"播放铃声蜂鸣音失败: {str(e)}"
                                 print(error_msg)
@@ -814,17 +890,15 @@ class AlarmClockGUI:
                 finally:
                     self.is_previewing = False
             
-            # 启动预览线程
-            self.preview_thread = threading.Thread(target=preview_thread_func)
-            self.preview_thread.daemon = True
-            self.preview_thread.start()
+            # 提交预览任务
+            self.preview_token = self.workers.submit(preview_thread_func)
             
         except Exception as e:
             error_details = f"启动铃声预览失败: {str(e)}"
             print(error_details)
             logging.error(error_details)
             stack_trace = traceback.format_exc()
-            logging.error(f"启动预览线程异常堆栈: {stack_trace}")
+            logging.error(f"启动预览任务异常堆栈: {stack_trace}")
             messagebox.showerror("错误", error_details)
             self.is_previewing = False
     
@@ -1313,64 +1387,38 @@ class AlarmClockGUI:
                 current_time = now.strftime("%I:%M:%S %p")
             self.clock_label.config(text=current_time)
             
-            # 更新倒计时显示
-            with self.lock:
-                if self.alarms:  # 检查是否有设置的闹钟
-                    try:
-                        # 找到下一个要触发的闹钟
-                        now_time = now.time()
-                        next_alarm = None
-                        next_alarm_label = ""
-                        next_alarm_delay = float('inf')
-                        
-                        for alarm in self.alarms:
-                            alarm_time = alarm['time']
-                            # 计算与当前时间的差异
-                            diff = (alarm_time.hour - now_time.hour) * 3600 + \
-                                   (alarm_time.minute - now_time.minute) * 60 + \
-                                   (alarm_time.second - now_time.second)
-                            
-                            # 如果闹钟时间已过，计算明天的时间差
-                            if diff <= 0:
-                                diff += 24 * 3600
-                            
-                            # 找到最近的闹钟
-                            if diff < next_alarm_delay:
-                                next_alarm_delay = diff
-                                next_alarm = alarm_time
-                                next_alarm_label = alarm.get('label', '')
-                        
-                        if next_alarm:
-                            # 计算具体的天、时、分、秒
-                            days = next_alarm_delay // (24 * 3600)
-                            remaining = next_alarm_delay % (24 * 3600)
-                            hours, remainder = divmod(remaining, 3600)
-                            minutes, seconds = divmod(remainder, 60)
-                            
-                            # 格式化倒计时显示
-                            if days > 0:
-                                countdown_text = f"{days}天 {hours:02d}小时 {minutes:02d}分钟 {seconds:02d}秒"
-                            else:
-                                countdown_text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                            
-                            # 如果闹钟有标签，显示标签
-                            if next_alarm_label:
-                                display_text = f"{countdown_text} ({next_alarm_label})"
-                            else:
-                                display_text = countdown_text
-                            
-                            self.countdown_label.config(text=display_text)
-                            
-                            # 当倒计时小于30分钟时，改变颜色提醒
-                            if next_alarm_delay < 30 * 60:
-                                self.countdown_label.config(foreground="red")
-                            else:
-                                self.countdown_label.config(foreground="black")
-                    except Exception as e:
-                        logging.error(f"更新倒计时时出错: {e}")
-                        self.countdown_label.config(text="计算倒计时时出错", foreground="red")
-                else:
-                    self.countdown_label.config(text="无设置的闹钟", foreground="black")
+            # 更新倒计时显示（下一个闹钟由引擎缓存，闹钟变化时才重新计算，这里不加锁）
+            next_deadline = self.engine.next_deadline()
+            if next_deadline:
+                try:
+                    deadline, next_alarm_label = next_deadline
+                    next_alarm_delay = max(0, deadline - int(time.time()))
+                    
+                    # 计算具体的天、时、分、秒
+                    days, remaining = divmod(next_alarm_delay, 24 * 3600)
+                    hours, remainder = divmod(remaining, 3600)
+                    minutes, seconds = divmod(remainder, 60)
+                    
+                    # 格式化倒计时显示
+                    if days > 0:
+                        countdown_text = f"{days}天 {hours:02d}小时 {minutes:02d}分钟 {seconds:02d}秒"
+                    else:
+                        countdown_text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+                    
+                    # 如果闹钟有标签，显示标签
+                    if next_alarm_label:
+                        display_text = f"{countdown_text} ({next_alarm_label})"
+                    else:
+                        display_text = countdown_text
+                    
+                    # 当倒计时小于30分钟时，改变颜色提醒
+                    foreground = "red" if next_alarm_delay < 30 * 60 else "black"
+                    self.countdown_label.config(text=display_text, foreground=foreground)
+                except Exception as e:
+                    logging.error(f"更新倒计时时出错: {e}")
+                    self.countdown_label.config(text="计算倒计时时出错", foreground="red")
+            else:
+                self.countdown_label.config(text="无设置的闹钟", foreground="black")
             
             # 安排下一次更新
             self.root.after(1000, self.update_clock)
@@ -1417,17 +1465,12 @@ class AlarmClockGUI:
                     messagebox.showerror("错误", "请输入有效的时间")
                     return
                 
-                # 获取当前日期
-                now = datetime.datetime.now()
-                # 设置闹钟时间
-                alarm_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                # 设置闹钟时间（如果设置的时间已过，则设置为明天）
+                alarm_time = next_fire_time(hour, minute)
                 
-                # 如果设置的时间已过，则设置为明天
-                if alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
-                
-                # 获取闹钟标签
+                # 获取闹钟标签和重复规则
                 alarm_label = self.label_entry.get().strip()
+                recurrence = RecurrenceRule.from_choice(self.repeat_var.get())
                 
                 # 格式化显示时间
                 if self.use_24h_format:
@@ -1435,23 +1478,16 @@ class AlarmClockGUI:
                 else:
                     time_str = alarm_time.strftime("%I:%M %p")
                 
-                # 创建闹钟对象
-                alarm = {
-                    'id': self.alarm_id_counter,
-                    'time': alarm_time,
-                    'label': alarm_label,
-                    'snooze': snooze,
-                    'ringtone': self.ringtone_var.get(),  # 添加铃声设置
-                    'local_music_path': self.local_music_path if self.ringtone_var.get() == "本地音乐" else None,  # 保存本地音乐路径
-                    'enabled': True,
-                    'created_at': datetime.datetime.now()
-                }
-                self.alarm_id_counter += 1
-                
-                # 添加到闹钟列表
-                with self.lock:
-                    self.alarms.append(alarm)
-                    logging.info(f"添加闹钟: ID={alarm['id']}, 时间={time_str}, 标签='{alarm_label or '无'}', 贪睡={snooze}分钟")
+                # 创建闹钟并交给引擎调度
+                alarm = self.engine.add_alarm(
+                    alarm_time,
+                    label=alarm_label,
+                    snooze=snooze,
+                    recurrence=recurrence,
+                    ringtone=self.ringtone_var.get(),  # 添加铃声设置
+                    local_music_path=self.local_music_path if self.ringtone_var.get() == "本地音乐" else None  # 保存本地音乐路径
+                )
+                logging.info(f"添加闹钟: ID={alarm['id']}, 时间={time_str}, 标签='{alarm_label or '无'}', 贪睡={snooze}分钟")
                 
                 # 更新最近设置的闹钟（保持向后兼容）
                 self.alarm_time = datetime.time(hour, minute)
@@ -1461,7 +1497,8 @@ class AlarmClockGUI:
                 
                 # 更新状态
                 status_text = f"闹钟已设置: {time_str} ({alarm_label})"
-                message_text = f"闹钟已成功添加\n时间: {time_str}\n标签: {alarm_label or '无'}\n贪睡时间: {snooze}分钟\n\n当前已设置 {len(self.alarms)} 个闹钟"
+                repeat_text = recurrence.describe() if recurrence else "不重复"
+                message_text = f"闹钟已成功添加\n时间: {time_str}\n标签: {alarm_label or '无'}\n贪睡时间: {snooze}分钟\n重复: {repeat_text}\n\n当前已设置 {len(self.engine)} 个闹钟"
                 
                 # 更新闹钟列表显示
                 self.root.after(0, self.update_alarm_list_display)
@@ -1470,21 +1507,6 @@ class AlarmClockGUI:
                 # 保持按钮状态（允许添加更多闹钟）
                 self.stop_button.config(state="normal")
                 
-                # 如果没有运行中的闹钟线程，则启动
-                if not self.alarm_thread or not self.alarm_thread.is_alive():
-                    # 重置停止事件
-                    self.stop_event.clear()
-                    
-                    try:
-                        self.alarm_thread = threading.Thread(target=self.alarm_thread_func, daemon=True)
-                        self.alarm_thread.start()
-                    except Exception as e:
-                        logging.error(f"启动闹钟线程失败: {e}")
-                        messagebox.showerror("错误", "启动闹钟线程失败，请重试")
-                        # 移除失败的闹钟
-                        self.alarms.pop()
-                        return
-                
                 messagebox.showinfo("成功", message_text)
         except Exception as e:
             logging.error(f"设置闹钟时发生错误: {e}")
@@ -1500,83 +1522,40 @@ class AlarmClockGUI:
             with self.lock:
                 if alarm_id is None:
                     # 取消所有闹钟
-                    if not self.alarms:
+                    count = self.engine.clear()
+                    if not count:
                         messagebox.showinfo("闹钟取消", "没有设置任何闹钟")
                         return
                     
-                    # 保存取消前的闹钟数量用于日志
-                    count = len(self.alarms)
-                    
-                    # 停止闹钟线程
-                    if self.alarm_thread and self.alarm_thread.is_alive():
-                        self.stop_event.set()
-                        try:
-                            self.alarm_thread.join(timeout=1.0)
-                        except Exception:
-                            logging.error("等待闹钟线程停止时发生错误")
-                    
-                    # 清空闹钟列表
-                    self.alarms.clear()
                     logging.info(f"所有闹钟已取消，共 {count} 个")
                     message_text = f"所有闹钟已成功取消\n共 {count} 个闹钟"
                 else:
                     # 取消特定闹钟
-                    removed = False
-                    removed_time = None
-                    removed_label = None
-                    for i, alarm in enumerate(self.alarms):
-                        if alarm['id'] == alarm_id:
-                            removed_time = alarm['time'].strftime("%H:%M")
-                            removed_label = alarm['label'] or "无标签"
-                            self.alarms.pop(i)
-                            removed = True
-                            logging.info(f"闹钟已取消: ID={alarm_id}, 时间={removed_time}, 标签={removed_label}")
-                            message_text = f"闹钟已成功取消\nID: {alarm_id}\n时间: {removed_time}\n标签: {removed_label}"
-                            break
-                    
-                    if not removed:
+                    alarm = self.engine.remove_alarm(alarm_id)
+                    if alarm is None:
                         messagebox.showinfo("闹钟取消", f"未找到ID为 {alarm_id} 的闹钟")
                         return
                     
-                    # 如果没有闹钟了，停止线程
-                    if not self.alarms and self.alarm_thread and self.alarm_thread.is_alive():
-                        self.stop_event.set()
-                        try:
-                            self.alarm_thread.join(timeout=1.0)
-                        except Exception:
-                            logging.error("等待闹钟线程停止时发生错误")
+                    removed_time = alarm['time'].strftime("%H:%M")
+                    removed_label = alarm['label'] or "无标签"
+                    logging.info(f"闹钟已取消: ID={alarm_id}, 时间={removed_time}, 标签={removed_label}")
+                    message_text = f"闹钟已成功取消\nID: {alarm_id}\n时间: {removed_time}\n标签: {removed_label}"
                 
-                # 重置闹钟状态
-                self.alarm_set = False
+                # 重置闹钟状态，并通知正在运行的响铃线程停止
+                self.alarm_set = bool(len(self.engine))
                 self.stop_event.set()
                 
-                # 更新UI
-                # 重启闹钟线程以处理剩余的闹钟
-                if self.alarm_thread and self.alarm_thread.is_alive():
-                    self.stop_event.set()
-                    try:
-                        self.alarm_thread.join(timeout=1.0)
-                    except Exception:
-                        logging.error("等待闹钟线程停止时发生错误")
-                
-                if self.alarms:
-                    self.stop_event.clear()
-                    self.alarm_thread = threading.Thread(target=self.alarm_thread_func, daemon=True)
-                    self.alarm_thread.start()
-                
                 # 更新闹钟列表显示
                 self.root.after(0, self.update_alarm_list_display)
                 
-                # 如果正在响铃，停止响铃
+                # 如果正在响铃，按关闭闹钟停止响铃：同时清空本次响铃的闹钟、响铃窗口列表和
+                # 铃声任务，之后到期的闹钟不会追加到已取消的批次中，贪睡也不会恢复已删除的闹钟
                 if self.is_ringing:
-                    self.is_ringing = False
-                    if hasattr(self, 'ringing_window') and self.ringing_window:
-                        self.ringing_window.destroy()
-                        self.ringing_window = None
+                    self.stop_ringing(DISMISS)
                 
                 # 更新按钮状态
                 self.set_button.config(state="normal")
-                if not self.alarms:
+                if not len(self.engine):
                     self.stop_button.config(state="disabled")
                 
                 messagebox.showinfo("提示", message_text)
@@ -1593,82 +1572,37 @@ class AlarmClockGUI:
                 messagebox.showinfo("提示", "请选择一个内置闹钟类型")
                 return
             
-            # 获取当前时间
-            now = datetime.datetime.now()
-            alarm_time = None
+            # 内置闹钟预设：(小时, 分钟, 重复规则)
+            presets = {
+                "工作日起床闹钟": (7, 30, RecurrenceRule.weekdays_only()),  # 周一至周五的早上7:30
+                "周末起床闹钟": (9, 0, RecurrenceRule.weekends()),  # 周六和周日的早上9:00
+                "午餐提醒": (12, 0, RecurrenceRule.daily()),  # 每天中午12:00
+                "下午茶提醒": (15, 30, RecurrenceRule.daily()),  # 每天下午15:30
+                "晚餐提醒": (18, 30, RecurrenceRule.daily()),  # 每天晚上18:30
+                "睡前提醒": (22, 30, RecurrenceRule.daily()),  # 每天晚上22:30
+            }
+            if builtin_alarm_type not in presets:
+                messagebox.showerror("错误", "无法设置内置闹钟时间")
+                return
+            
+            hour, minute, recurrence = presets[builtin_alarm_type]
             alarm_label = builtin_alarm_type
             snooze = 5  # 默认贪睡5分钟
             
-            # 根据内置闹钟类型设置时间
-            if builtin_alarm_type == "工作日起床闹钟":
-                # 周一至周五的早上7:30
-                alarm_time = now.replace(hour=7, minute=30, second=0, microsecond=0)
-                # 如果今天是工作日且时间已过，设置为明天
-                if now.weekday() < 5 and alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
-                # 如果今天是周末，设置为下周一
-                elif now.weekday() >= 5:
-                    days_until_monday = (7 - now.weekday()) % 7 or 7
-                    alarm_time += datetime.timedelta(days=days_until_monday)
-                    
-            elif builtin_alarm_type == "周末起床闹钟":
-                # 周六和周日的早上9:00
-                alarm_time = now.replace(hour=9, minute=0, second=0, microsecond=0)
-                # 如果今天是周末且时间已过，设置为下周日
-                if now.weekday() >= 5 and alarm_time <= now:
-                    if now.weekday() == 5:  # 周六
-                        alarm_time += datetime.timedelta(days=1)
-                    else:  # 周日
-                        alarm_time += datetime.timedelta(days=6)
-                # 如果今天是工作日，设置为这个周六
-                elif now.weekday() < 5:
-                    days_until_saturday = (5 - now.weekday()) % 7 or 7
-                    alarm_time += datetime.timedelta(days=days_until_saturday)
-                    
-            elif builtin_alarm_type == "午餐提醒":
-                # 每天中午12:00
-                alarm_time = now.replace(hour=12, minute=0, second=0, microsecond=0)
-                if alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
-                    
-            elif builtin_alarm_type == "下午茶提醒":
-                # 每天下午15:30
-                alarm_time = now.replace(hour=15, minute=30, second=0, microsecond=0)
-                if alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
-                    
-            elif builtin_alarm_type == "晚餐提醒":
-                # 每天晚上18:30
-                alarm_time = now.replace(hour=18, minute=30, second=0, microsecond=0)
-                if alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
-                    
-            elif builtin_alarm_type == "睡前提醒":
-                # 每天晚上22:30
-                alarm_time = now.replace(hour=22, minute=30, second=0, microsecond=0)
-                if alarm_time <= now:
-                    alarm_time += datetime.timedelta(days=1)
+            # 第一次触发时间由引擎按重复规则对齐（如周末设置工作日闹钟时顺延到周一）
+            alarm_time = next_fire_time(hour, minute)
             
-            if alarm_time is None:
-                messagebox.showerror("错误", "无法设置内置闹钟时间")
-                return
-            
-            # 创建闹钟对象
+            # 创建闹钟并交给引擎调度
             with self.lock:
-                alarm = {
-                    'id': self.alarm_id_counter,
-                    'time': alarm_time,
-                    'label': alarm_label,
-                    'snooze': snooze,
-                    'ringtone': self.ringtone_var.get(),
-                    'local_music_path': self.local_music_path if self.ringtone_var.get() == "本地音乐" else None,
-                    'enabled': True,
-                    'created_at': datetime.datetime.now()
-                }
-                self.alarm_id_counter += 1
-                
-                # 添加到闹钟列表
-                self.alarms.append(alarm)
+                alarm = self.engine.add_alarm(
+                    alarm_time,
+                    label=alarm_label,
+                    snooze=snooze,
+                    recurrence=recurrence,
+                    ringtone=self.ringtone_var.get(),
+                    local_music_path=self.local_music_path if self.ringtone_var.get() == "本地音乐" else None
+                )
+                alarm_time = alarm['time']
                 
                 # 更新最近设置的闹钟（保持向后兼容）
                 self.alarm_time = alarm_time.time()
@@ -1684,26 +1618,11 @@ class AlarmClockGUI:
                 
                 # 更新状态
                 status_text = f"内置闹钟已设置: {time_str} ({alarm_label})"
-                message_text = f"内置闹钟已成功添加\n时间: {time_str}\n标签: {alarm_label}\n贪睡时间: {snooze}分钟\n\n当前已设置 {len(self.alarms)} 个闹钟"
+                message_text = f"内置闹钟已成功添加\n时间: {time_str}\n标签: {alarm_label}\n贪睡时间: {snooze}分钟\n重复: {recurrence.describe()}\n\n当前已设置 {len(self.engine)} 个闹钟"
                 
                 # 更新闹钟列表显示
                 self.root.after(0, self.update_alarm_list_display)
                 
-                # 如果没有运行中的闹钟线程，则启动
-                if not self.alarm_thread or not self.alarm_thread.is_alive():
-                    # 重置停止事件
-                    self.stop_event.clear()
-                    
-                    try:
-                        self.alarm_thread = threading.Thread(target=self.alarm_thread_func, daemon=True)
-                        self.alarm_thread.start()
-                    except Exception as e:
-                        logging.error(f"启动闹钟线程失败: {e}")
-                        messagebox.showerror("错误", "启动闹钟线程失败，请重试")
-                        # 移除失败的闹钟
-                        self.alarms.pop()
-                        return
-                
                 messagebox.showinfo("成功", message_text)
                 
                 # 重置内置闹钟选择
@@ -1714,85 +1633,123 @@ class AlarmClockGUI:
             logging.error(f"快速设置内置闹钟时发生错误: {e}")
             messagebox.showerror("错误", f"快速设置内置闹钟时发生错误: {str(e)}")
     
-    def alarm_thread_func(self):
-        """闹钟线程函数 - 支持多个闹钟"""
+    def _on_alarms_triggered(self, alarms):
+        """闹钟引擎的到期回调（在引擎线程中调用）
+
+        同一时刻到期的闹钟作为一批，只向主线程派发一次。
+        """
+        logging.info(f"闹钟触发: {len(alarms)} 个, 标签: {', '.join(alarm['label'] or '无' for alarm in alarms[:10])}"
+                     + (" ..." if len(alarms) > 10 else ""))
+        self._record_history(FIRE, alarms)
+        self.root.after(0, self._dispatch_triggered_alarms, alarms)
+    
+    def _on_engine_changed(self):
+        """引擎的变化回调（可能在控制接口线程中调用），连续的变化合并为一次列表刷新"""
+        if self._list_refresh_pending:
+            return
+        self._list_refresh_pending = True
+        self.root.after(0, self._refresh_alarm_list)
+    
+    def _refresh_alarm_list(self):
+        self._list_refresh_pending = False
+        self.update_alarm_list_display()
+    
+    def serve_ipc(self, socket_path=DEFAULT_SOCKET_PATH):
+        """提供控制接口，使 alarmctl 和再次启动的程序可以交给本窗口处理"""
+        if self.daemon or self.remote:
+            return  # 控制接口由守护进程提供
         try:
-            logging.info("闹钟线程已启动")
-            
-            while not self.stop_event.is_set():
-                try:
-                    now = datetime.datetime.now()
-                    triggered_alarms = []
-                    
-                    with self.lock:
-                        # 复制闹钟列表以避免在迭代时修改
-                        current_alarms = self.alarms.copy()
-                    
-                    # 检查哪些闹钟需要触发
-                    for alarm in current_alarms:
-                        if alarm['enabled'] and now >= alarm['time']:
-                            triggered_alarms.append(alarm)
-                    
-                    # 处理触发的闹钟
-                    if triggered_alarms:
-                        logging.info(f"发现 {len(triggered_alarms)} 个需要触发的闹钟")
-                        
-                        for alarm in triggered_alarms:
-                            logging.info(f"闹钟触发: ID={alarm['id']}, 时间={alarm['time'].strftime('%H:%M')}, 标签='{alarm['label'] or '无'}'")
-                            
-                            # 设置当前闹钟信息（保存完整的闹钟信息）
-                            self.current_alarm_label = alarm['label']
-                            self.snooze_time = alarm['snooze']
-                            self.current_alarm_ringtone = alarm['ringtone']
-                            # 保存本地音乐路径，即使闹钟被移除也能访问
-                            self.current_alarm_local_music = alarm.get('local_music_path', None)
-                            
-                            # 播放闹钟声音（在主线程中执行GUI相关操作）
-                            self.root.after(0, self.play_alarm_sound)
-                            
-                            # 从列表中移除已触发的闹钟（单次闹钟）
-                            with self.lock:
-                                for i, a in enumerate(self.alarms):
-                                    if a['id'] == alarm['id']:
-                                        self.alarms.pop(i)
-                                        logging.info(f"已从列表中移除触发的闹钟 ID={alarm['id']}")
-                                        break
-                            
-                            # 更新闹钟列表显示
-                            self.root.after(0, self.update_alarm_list_display)
-                    
-                    # 检查是否需要更新倒计时
-                    next_alarm = None
-                    with self.lock:
-                        # 找到下一个要触发的闹钟
-                        enabled_alarms = [a for a in self.alarms if a['enabled']]
-                        if enabled_alarms:
-                            next_alarm = min(enabled_alarms, key=lambda x: x['time'])
-                    
-                    if next_alarm:
-                        # 更新最近设置的闹钟（保持向后兼容）
-                        next_alarm_time = next_alarm['time'].time()
-                        with self.lock:
-                            self.alarm_time = next_alarm_time
-                            self.alarm_label = next_alarm['label']
-                            self.alarm_set = True
-                    else:
-                        # 没有设置的闹钟
-                        with self.lock:
-                            self.alarm_set = False
-                        break  # 没有闹钟了，退出循环
-                        
-                except Exception as e:
-                    logging.error(f"闹钟线程中的错误: {e}")
+            self.ipc = AlarmIPCServer(self.engine, socket_path)
+            self.ipc.start()
+        except OSError as e:
+            self.ipc = None
+            logging.error(f"启动控制接口失败: {e}")
+            return
+        self.ipc.controller.add_activate_listener(self._on_activate)
+        self.engine.add_change_listener(self._on_engine_changed)
+    
+    def enable_journal(self, journal):
+        """恢复保存的闹钟，并把之后的每次变更追加写入日志（在后台线程中写盘）"""
+        if self.daemon or self.remote:
+            return  # 守护进程负责持久化
+        try:
+            restored = journal.restore(self.engine)
+        except OSError as e:
+            logging.error(f"恢复闹钟失败: {e}")
+            return
+        self.journal = journal
+        if restored:
+            self.update_alarm_list_display()
+            self.status_var.set(f"已恢复 {restored} 个闹钟")
+    
+    def enable_history(self, history):
+        """记录之后每次响铃、停止、贪睡和关闭闹钟（见 AlarmHistory）"""
+        self.history = history
+    
+    def _record_history(self, kind, alarms):
+        """把一批闹钟的事件写入响铃历史（未启用历史时忽略）"""
+        if self.history and alarms:
+            self.history.record_many(kind, alarms)
+    
+    def _on_activate(self, argv):
+        """再次启动的程序把参数交给本窗口（在控制接口线程中调用）"""
+        self.root.after(0, self._show_window)
+    
+    def _show_window(self):
+        """把已打开的窗口显示到最前面"""
+        try:
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+        except tk.TclError as e:
+            logging.error(f"显示窗口失败: {e}")
+    
+    def _dispatch_triggered_alarms(self, alarms):
+        """在主线程中处理一批到期闹钟：一次响铃、一次列表刷新"""
+        try:
+            with self.lock:
+                already_ringing = self.is_ringing
+                self.ringing_alarms.extend(alarms)
+                
+                if not already_ringing:
+                    # 以本批第一个闹钟的设置响铃（保存完整的闹钟信息）
+                    alarm = alarms[0]
+                    self.current_alarm = alarm
+                    self.current_alarm_label = alarm['label']
+                    self.snooze_time = alarm['snooze']
+                    self.current_alarm_ringtone = alarm.get('ringtone', '默认铃声')
+                    # 保存本地音乐路径，即使闹钟被移除也能访问
+                    self.current_alarm_local_music = alarm.get('local_music_path', None)
                 
-                time.sleep(1)
+                # 更新最近设置的闹钟（保持向后兼容）
+                next_alarm = self.engine.next_alarm()
+                if next_alarm:
+                    self.alarm_time = next_alarm['time'].time()
+                    self.alarm_label = next_alarm['label']
+                    self.alarm_set = True
+                else:
+                    self.alarm_set = False
+            
+            if already_ringing:
+                # 正在响铃时只把新到期的闹钟追加到响铃窗口
+                self._append_ringing_alarms(alarms)
+            else:
+                self.play_alarm_sound()
+            
+            self.update_alarm_list_display()
+            
+            # 触发后的回调在工作线程中执行，不阻塞界面
+            for hook in self.trigger_hooks:
+                self.workers.submit(lambda token, hook=hook: hook(alarms))
         except Exception as e:
-            logging.error(f"闹钟线程异常: {e}")
-        finally:
-            logging.info("闹钟线程已退出")
+            logging.error(f"处理到期闹钟时出错: {e}")
+    
+    def add_trigger_hook(self, hook):
+        """注册闹钟触发后的回调 hook(alarms)，在工作线程池中执行"""
+        self.trigger_hooks.append(hook)
     
-    def _sound_play_thread(self):
-        """声音播放线程函数，实现进程引用保存和重复调用防护"""
+    def _sound_play_thread(self, token):
+        """声音播放任务（在工作线程中执行），实现进程引用保存和重复调用防护"""
         try:
             # 获取当前闹钟的铃声设置
             ringtone = getattr(self, 'current_alarm_ringtone', '默认铃声')
@@ -1840,8 +1797,8 @@ class AlarmClockGUI:
                 local_music_path = self.local_music_path
                 print(f"[DEBUG] 使用当前设置的本地音乐路径: {local_music_path}")
             
-            # 循环播放声音，直到停止事件被设置或is_ringing为False
-            while self.is_ringing and not self.stop_event.is_set():
+            # 循环播放声音，直到停止事件被设置、任务被取消或is_ringing为False
+            while self.is_ringing and not self.stop_event.is_set() and not token.cancelled:
                 # 检查进程是否仍在运行，如果不在运行再创建新进程
                 with self.lock:
                     if hasattr(self, 'player_process') and self.player_process:
@@ -1880,11 +1837,11 @@ class AlarmClockGUI:
                                 global_player.play(norm_path, loops=-1, volume=1.0)
                                 
                                 # 等待直到音乐停止或被中断
-                                while self.is_ringing and not self.stop_event.is_set():
+                                while self.is_ringing and not self.stop_event.is_set() and not token.cancelled:
                                     if not global_player.is_playing():
                                         print("[DEBUG] 内置播放器播放结束，重新开始")
                                         global_player.play(norm_path, loops=-1, volume=1.0)
-                                    time.sleep(0.5)
+                                    token.wait(0.5)
                             else:
                                 # 如果内置播放器不可用，回退到系统播放器
                                 print(f"[DEBUG] 使用系统播放器播放: {norm_path}")
@@ -1943,7 +1900,7 @@ class AlarmClockGUI:
                                             self.player_process = None
                                     # 对于系统播放器播放，等待音乐播放更长时间
                                     # 这里设置为300秒，足够让大多数音乐片段播放较长时间
-                                    time.sleep(300)  # 增加等待时间，让本地音乐能够持续播放
+                                    token.wait(300)  # 增加等待时间，让本地音乐能够持续播放（停止时立即返回）
                                 else:
                                     # 如果没有try_alternative_play，使用_play_with_system_player
                                     play_result = self._play_with_system_player(norm_path)
@@ -1953,7 +1910,7 @@ class AlarmClockGUI:
                                         else:
                                             self._music_playing = True
                                             self.player_process = None
-                                    time.sleep(300)  # 增加等待时间，让本地音乐能够持续播放
+                                    token.wait(300)  # 增加等待时间，让本地音乐能够持续播放（停止时立即返回）
                             
                             # 不再尝试playsound，因为测试表明它在Windows上处理中文路径有问题
                         except Exception as e:
@@ -1972,7 +1929,7 @@ class AlarmClockGUI:
                             time.sleep(0.2)  # 短暂暂停后再次播放
                 else:
                     # 如果有播放器进程正在运行，等待一段时间再检查
-                    time.sleep(1)
+                    token.wait(1)
         except Exception as e:
             logging.error(f"播放闹钟声音时出错: {e}")
         finally:
@@ -1990,8 +1947,8 @@ class AlarmClockGUI:
                         except Exception as cleanup_error:
                             print(f"[DEBUG] 清理播放器进程时出错: {cleanup_error}")
                         self.player_process = None
-                # 确保is_ringing设置为False
-                if self.is_ringing:
+                # 确保is_ringing设置为False（被新的响铃取代时保留新的响铃状态）
+                if self.is_ringing and not token.cancelled:
                     self.is_ringing = False
             except Exception:
                 pass
@@ -1999,9 +1956,10 @@ class AlarmClockGUI:
     def play_alarm_sound(self):
         """播放闹钟声音（循环播放直到停止）"""
         try:
-            # 在锁的保护下设置is_ringing
+            # 在锁的保护下设置is_ringing，并清除上一次取消闹钟留下的停止标志
             with self.lock:
                 self.is_ringing = True
+                self.stop_event.clear()
                 # 确保current_alarm_ringtone有默认值
                 if not hasattr(self, 'current_alarm_ringtone'):
                     self.current_alarm_ringtone = '默认铃声'
@@ -2009,9 +1967,10 @@ class AlarmClockGUI:
             # 在主线程中创建响铃窗口
             self.create_ringing_window()
             
-            # 创建并启动声音播放线程
-            sound_thread = threading.Thread(target=self._sound_play_thread, daemon=True)
-            sound_thread.start()
+            # 取消上一次的播放任务，并把声音播放交给工作线程池
+            if self.sound_token:
+                self.sound_token.cancel()
+            self.sound_token = self.workers.submit(self._sound_play_thread)
             
         except Exception as e:
             logging.error(f"启动闹钟响铃时出错: {e}")
@@ -2031,8 +1990,8 @@ class AlarmClockGUI:
             
             self.ringing_window = tk.Toplevel(self.root)
             self.ringing_window.title("闹钟响了！")
-            self.ringing_window.geometry("450x350")  # 增大窗口尺寸
-            self.ringing_window.minsize(450, 350)  # 设置最小尺寸
+            self.ringing_window.geometry("450x420")  # 增大窗口尺寸，容纳到期闹钟列表
+            self.ringing_window.minsize(450, 420)  # 设置最小尺寸
             self.ringing_window.configure(bg="#ffcccc")
             self.ringing_window.attributes("-topmost", True)  # 置顶显示
             self.ringing_window.attributes("-alpha", 0.95)  # 稍微透明，更醒目
@@ -2075,14 +2034,16 @@ class AlarmClockGUI:
             info_label = ttk.Label(ring_content_frame, text=info_text, font=("SimHei", 16, "bold"), justify="center")
             info_label.pack(pady=15)
             
-            # 闹钟标签显示
-            if self.alarm_label:
-                label_label = ttk.Label(ring_content_frame, text="标签:", font=("SimHei", 12))
-                label_label.pack(anchor="center", pady=3)
-                
-                alarm_label_display = ttk.Label(ring_content_frame, text=self.alarm_label, 
-                                              font=("SimHei", 14), wraplength=400)
-                alarm_label_display.pack(anchor="center", pady=3)
+            # 本次到期的所有闹钟（同时到期的闹钟在同一个窗口中列出）
+            list_frame = ttk.Frame(ring_content_frame)
+            list_frame.pack(fill="both", expand=True, pady=3)
+            scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+            self.ringing_listbox = tk.Listbox(list_frame, height=4, font=("SimHei", 12),
+                                              yscrollcommand=scrollbar.set)
+            scrollbar.config(command=self.ringing_listbox.yview)
+            scrollbar.pack(side="right", fill="y")
+            self.ringing_listbox.pack(side="left", fill="both", expand=True)
+            self._append_ringing_alarms(self.ringing_alarms)
             
             # 按钮框架
             button_frame = ttk.Frame(ring_content_frame)
@@ -2109,16 +2070,38 @@ class AlarmClockGUI:
             logging.error(f"创建响铃窗口时出错: {e}")
             messagebox.showerror("错误", "显示闹钟窗口失败")
     
-    def stop_ringing(self):
-        """停止闹钟响铃 - 增强版，使用结构化分层终止策略确保播放器被正确关闭"""
+    def _append_ringing_alarms(self, alarms):
+        """把到期闹钟追加到响铃窗口的列表中"""
+        if not self.ringing_listbox:
+            return
+        try:
+            self.ringing_listbox.insert("end", *[
+                f"{alarm['time'].strftime('%H:%M')}  {alarm['label'] or '无标签'}" for alarm in alarms
+            ])
+            if self.ringing_window:
+                self.ringing_window.title(f"闹钟响了！({len(self.ringing_alarms)} 个)")
+        except tk.TclError as e:
+            logging.error(f"更新响铃列表时出错: {e}")
+    
+    def stop_ringing(self, kind=STOP):
+        """停止闹钟响铃 - 增强版，使用结构化分层终止策略确保播放器被正确关闭
+        
+        Args:
+            kind: 写入响铃历史的事件类型（关闭闹钟时为 DISMISS）
+        """
         print("[DEBUG] 停止闹钟响铃 - 开始执行结构化分层终止策略")
         try:
             import time, os
             
             with self.lock:
+                self._record_history(kind, self.ringing_alarms)
                 # 立即设置状态标志，防止并发操作
                 self.is_ringing = False
                 self._music_playing = False
+                self.ringing_alarms = []
+                self.ringing_listbox = None
+                if self.sound_token:
+                    self.sound_token.cancel()
                 
                 # 销毁响铃窗口
                 if self.ringing_window:
@@ -2390,7 +2373,7 @@ class AlarmClockGUI:
         """完全关闭闹钟（停止响铃并确保闹钟不再响起）"""
         try:
             # 先调用stop_ringing停止响铃
-            self.stop_ringing()
+            self.stop_ringing(DISMISS)
             
             # 确保所有相关状态都被重置
             with self.lock:
@@ -2400,7 +2383,7 @@ class AlarmClockGUI:
                 self.current_alarm_label = ""
                 
                 # 从列表中移除已触发的单次闹钟
-                # 注意：实际上alarm_thread_func已经处理了移除，但这里再次确保
+                # 注意：闹钟引擎在触发时已经移除了单次闹钟
                 logging.info("闹钟已完全关闭")
         except Exception as e:
             logging.error(f"关闭闹钟时出错: {e}")
@@ -2411,6 +2394,8 @@ class AlarmClockGUI:
         try:
             with self.lock:
                 self.is_ringing = False
+                if self.sound_token:
+                    self.sound_token.cancel()
                 
                 if self.ringing_window:
                     try:
@@ -2418,50 +2403,25 @@ class AlarmClockGUI:
                     except Exception as e:
                         logging.error(f"销毁响铃窗口时出错: {e}")
                     self.ringing_window = None
+                self.ringing_listbox = None
                 
-                # 计算贪睡后的时间
-                now = datetime.datetime.now()
-                snooze_datetime = now + datetime.timedelta(minutes=self.snooze_time)
-                
-                # 创建新的贪睡闹钟
-                snooze_alarm = {
-                    'id': self.alarm_id_counter,
-                    'time': snooze_datetime,
-                    'label': self.current_alarm_label + " (贪睡)",
-                    'snooze': self.snooze_time,
-                    'enabled': True,
-                    'created_at': datetime.datetime.now()
-                }
-                self.alarm_id_counter += 1
-                
-                # 添加到闹钟列表
-                self.alarms.append(snooze_alarm)
+                # 本次响铃中的每个闹钟在引擎中以原ID改期（不新建闹钟、不重启线程）
+                source_alarms = self.ringing_alarms or ([self.current_alarm] if self.current_alarm else [])
+                self.ringing_alarms = []
+                self._record_history(SNOOZE, source_alarms)
+                for source_alarm in source_alarms:
+                    snooze_alarm = self.engine.snooze(source_alarm, self.snooze_time)
                 
                 # 保持向后兼容
-                self.alarm_time = snooze_datetime.time()
-                self.alarm_label = snooze_alarm['label']
-                self.alarm_set = True
+                if source_alarms:
+                    self.alarm_time = snooze_alarm['time'].time()
+                    self.alarm_label = snooze_alarm['label']
+                    self.alarm_set = True
                 
                 # 更新状态和列表
                 self.status_var.set(f"贪睡中... 将在 {self.snooze_time} 分钟后再次提醒")
                 self.root.after(0, self.update_alarm_list_display)
                 logging.info(f"闹钟已贪睡: {self.snooze_time}分钟")
-                
-                # 重置停止事件并启动闹钟线程
-                self.stop_event.clear()
-                if self.alarm_thread and self.alarm_thread.is_alive():
-                    try:
-                        self.alarm_thread.join(timeout=1.0)
-                    except Exception as e:
-                        logging.error(f"等待线程结束时出错: {e}")
-                
-                try:
-                    self.alarm_thread = threading.Thread(target=self.alarm_thread_func, daemon=True)
-                    self.alarm_thread.start()
-                except Exception as e:
-                    logging.error(f"启动贪睡线程失败: {e}")
-                    messagebox.showerror("错误", "设置贪睡失败，请重试")
-                    self.reset_alarm_ui()
         except Exception as e:
             logging.error(f"设置贪睡时出错: {e}")
             messagebox.showerror("错误", "设置贪睡失败")
@@ -2475,11 +2435,7 @@ class AlarmClockGUI:
         """编辑闹钟信息"""
         try:
             # 查找要编辑的闹钟
-            alarm_to_edit = None
-            for alarm in self.alarms:
-                if alarm['id'] == alarm_id:
-                    alarm_to_edit = alarm
-                    break
+            alarm_to_edit = self.engine.get_alarm(alarm_id)
             
             if not alarm_to_edit:
                 messagebox.showwarning("错误", f"未找到闹钟 ID={alarm_id}")
@@ -2518,9 +2474,7 @@ class AlarmClockGUI:
                         return
                     
                     # 保存更改
-                    with self.lock:
-                        alarm_to_edit['label'] = label_var.get().strip()
-                        alarm_to_edit['snooze'] = snooze
+                    self.engine.update_alarm(alarm_id, label=label_var.get().strip(), snooze=snooze)
                     
                     logging.info(f"已编辑闹钟 ID={alarm_id}, 新标签='{label_var.get()}', 新贪睡时间={snooze}分钟")
                     messagebox.showinfo("成功", "闹钟信息已更新")
@@ -2540,13 +2494,13 @@ class AlarmClockGUI:
     
     def sort_alarms_by_time(self):
         """按时间排序闹钟"""
-        self.alarms.sort(key=lambda x: x['time'])
+        self.alarm_sort_key = lambda x: x['time']
         self.update_alarm_list_display()
         logging.info("闹钟列表已按时间排序")
     
     def sort_alarms_by_label(self):
         """按标签排序闹钟"""
-        self.alarms.sort(key=lambda x: x['label'] or "")
+        self.alarm_sort_key = lambda x: x['label'] or ""
         self.update_alarm_list_display()
         logging.info("闹钟列表已按标签排序")
     
@@ -2558,14 +2512,19 @@ class AlarmClockGUI:
                 self.alarm_tree.delete(item)
             
             # 获取当前闹钟列表的副本以确保线程安全
-            with self.lock:
-                current_alarms = self.alarms.copy()
+            current_alarms = self.engine.alarms()
+            if self.alarm_sort_key:
+                current_alarms.sort(key=self.alarm_sort_key)
             
             # 添加当前设置的所有闹钟
-            for alarm in current_alarms:  # 不再默认排序，使用当前顺序
+            for alarm in current_alarms:  # 默认按添加顺序，点击列标题后按对应列排序
                 try:
                     time_str = alarm['time'].strftime("%H:%M")
                     label = alarm['label'] if alarm['label'] else "无标签"
+                    if alarm.get('recurrence'):
+                        label += f" ({alarm['recurrence'].describe()})"
+                    if alarm.get('snoozed'):
+                        label += f" (贪睡×{alarm['snooze_count']})"
                     
                     # 插入行
                     item = self.alarm_tree.insert("", "end", values=(alarm['id'], time_str, label, alarm['snooze'], ""))
@@ -2619,8 +2578,7 @@ class AlarmClockGUI:
                     logging.error(f"更新单个闹钟显示时出错: ID={alarm.get('id', 'unknown')}, 错误={str(e)}")
             
             # 更新状态和按钮
-            with self.lock:
-                alarm_count = len(self.alarms)
+            alarm_count = len(current_alarms)
             
             if alarm_count > 0:
                 self.status_var.set(f"已设置 {alarm_count} 个闹钟")
@@ -2668,12 +2626,31 @@ class AlarmClockGUI:
             except Exception as e:
                 print(f"[ERROR] 清理内置播放器时出错: {e}")
             
-            # 等待线程结束
-            if self.alarm_thread and self.alarm_thread.is_alive():
-                try:
-                    self.alarm_thread.join(timeout=1.0)
-                except:
-                    pass
+            # 停止闹钟引擎和工作线程池并等待线程结束
+            try:
+                if self.daemon:
+                    # 守护进程继续运行，之后到期的闹钟由守护进程处理
+                    self.daemon.detach(self._on_alarms_triggered)
+                    self.engine.remove_change_listener(self._on_engine_changed)
+                    if self.daemon.ipc:
+                        self.daemon.ipc.controller.remove_activate_listener(self._on_activate)
+                elif self.remote:
+                    # 断开订阅，之后到期的闹钟由守护进程自己响铃
+                    self.engine.stop(timeout=1.0)
+                elif self.runtime:
+                    self.loop_pump.stop()
+                    self.runtime.stop()
+                else:
+                    self.engine.stop(timeout=1.0)
+                if self.ipc:
+                    self.ipc.stop()
+                if self.journal:
+                    self.journal.close()
+                if self.history:
+                    self.history.close()
+                self.workers.shutdown(timeout=1.0)
+            except Exception as e:
+                logging.error(f"停止闹钟引擎时出错: {e}")
             
             logging.info("应用程序已关闭")
             self.root.destroy()
@@ -2681,14 +2658,70 @@ class AlarmClockGUI:
             logging.error(f"关闭应用程序时出错: {e}")
             sys.exit(1)
 
+def _show_launch_error(message):
+    """启动前（还没有主窗口时）显示错误对话框"""
+    print(f"[ERROR] {message}")
+    try:
+        error_root = tk.Tk()
+        error_root.withdraw()
+        messagebox.showerror("闹钟程序已在运行", message)
+        error_root.destroy()
+    except tk.TclError:
+        pass
+
+
+def hand_off_to_running_instance(instance_lock, argv):
+    """已有实例持有锁时调用
+
+    正在运行的实例有窗口时把窗口显示到最前面，返回退出码 0；正在运行的是
+    没有界面的守护进程时返回 None，由调用方作为客户端连接该守护进程；
+    无法连接时显示错误并返回 1。
+    """
+    pid = instance_lock.owner_pid()
+    try:
+        response = hand_off([{'op': 'activate', 'argv': argv}])[0]
+    except OSError as e:
+        _show_launch_error(f"闹钟程序已在运行 (PID {pid})，但无法连接: {e}")
+        return 1
+    if response['ok'] and response['result'].get('activated'):
+        print(f"[DEBUG] 闹钟程序已在运行 (PID {pid})，已切换到已打开的窗口")
+        return 0
+    print(f"[DEBUG] 闹钟守护进程正在后台运行 (PID {pid})，以客户端方式连接")
+    return None
+
+
+def connect_to_daemon(instance_lock):
+    """连接持有锁的守护进程，返回 RemoteAlarmEngine，失败时显示错误并返回 None"""
+    try:
+        return RemoteAlarmEngine()
+    except (OSError, IPCError) as e:
+        _show_launch_error(f"闹钟守护进程正在运行 (PID {instance_lock.owner_pid()})，但无法连接: {e}")
+        return None
+
+
 if __name__ == "__main__":
+    # 已有实例在运行时把窗口交给它显示，不再启动第二套闹钟检查和铃声
+    # 正在运行的是无界面的守护进程时，本窗口作为它的客户端连接（attach）
+    instance_lock = InstanceLock()
+    remote = None
+    if not instance_lock.acquire():
+        exit_code = hand_off_to_running_instance(instance_lock, sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+        remote = connect_to_daemon(instance_lock)
+        if remote is None:
+            sys.exit(1)
     try:
         print("[DEBUG] 启动主应用...")
         root = tk.Tk()
         # 确保中文显示正常
         root.option_add("*Font", "SimHei 10")
         
-        app = AlarmClockGUI(root)
+        # --asyncio: 使用 asyncio 运行时代替闹钟引擎线程
+        app = AlarmClockGUI(root, use_asyncio="--asyncio" in sys.argv, remote=remote)
+        app.serve_ipc()
+        app.enable_journal(AlarmJournal())
+        app.enable_history(AlarmHistory())
         
         # 紧急更新循环已在初始化时启动
         
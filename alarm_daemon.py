@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+无界面闹钟守护进程
+
+只运行闹钟引擎、铃声后端和持久化，不导入 Tk，可以在服务器或自助终端上
+长期运行。图形界面可以随时连接（attach）：连接期间到期的闹钟交给界面处理，
+断开（detach）后由守护进程自己响铃。同一进程中的界面（--gui）直接调用
+attach/detach；之后单独启动的界面通过控制接口的 subscribe 连接（见
+alarm_remote.py），关闭窗口即断开。其他程序可以通过 Unix 套接字控制接口
+（见 alarm_ipc.py）增删改查闹钟。同一个控制接口只运行一个实例，重复启动时
+把启动参数交给已运行的实例后退出（见 single_instance.py）。
+
+用法:
+    python alarm_daemon.py [--store PATH] [--no-store] [--socket PATH] [--no-ipc]
+                           [--log-file PATH] [--gui]
+    python alarm_clock.py --daemon [...]
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+
+from alarm_engine import AlarmEngine
+from alarm_ipc import DEFAULT_SOCKET_PATH, AlarmIPCServer
+from alarm_journal import AlarmJournal
+from alarm_sound import ring
+from alarm_store import DEFAULT_STORE_PATH
+from alarm_workers import WorkerPool
+from single_instance import InstanceLock, hand_off, lock_path_for
+
+
+class AlarmDaemon:
+    """闹钟守护进程
+
+    Args:
+        engine: 使用的闹钟引擎，默认新建
+        socket_path: 控制接口的套接字路径，None 表示不提供控制接口
+        journal: AlarmJournal 实例，每次变更追加写入日志，None 表示不保存
+    """
+
+    def __init__(self, engine=None, socket_path=None, journal=None):
+        self.engine = engine or AlarmEngine()
+        self.journal = journal
+        self.socket_path = socket_path
+        self.ipc = None
+        self.workers = WorkerPool(size=1, name="AlarmDaemonSound")
+        self._attached = []  # 已连接的界面（到期回调）
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.engine.add_listener(self._on_alarms_triggered)
+
+    # ---- 界面连接 ----
+
+    def attach(self, listener):
+        """连接界面，之后到期的闹钟交给 listener(alarms) 处理"""
+        with self._lock:
+            self._attached.append(listener)
+        logging.info(f"界面已连接，当前连接数: {len(self._attached)}")
+
+    def detach(self, listener):
+        """断开界面，没有界面连接时由守护进程响铃"""
+        with self._lock:
+            if listener in self._attached:
+                self._attached.remove(listener)
+        logging.info(f"界面已断开，当前连接数: {len(self._attached)}")
+
+    def is_attached(self):
+        with self._lock:
+            return bool(self._attached)
+
+    def _on_alarms_triggered(self, alarms):
+        with self._lock:
+            listeners = list(self._attached)
+        if not listeners:
+            self._ring(alarms)
+            return
+        for listener in listeners:
+            try:
+                listener(alarms)
+            except Exception as e:
+                logging.error(f"界面处理到期闹钟时出错: {e}")
+
+    def _ring(self, alarms):
+        """无界面时的响铃：输出到期闹钟并在工作线程中蜂鸣"""
+        for alarm in alarms:
+            message = f"闹钟时间到: {alarm['time'].strftime('%Y-%m-%d %H:%M')} {alarm['label'] or '无标签'}"
+            logging.info(message)
+            print(message, flush=True)
+        ringtone = alarms[0].get('ringtone') or "默认铃声"
+        self.workers.submit(lambda token: ring(ringtone, token=token))
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """恢复保存的闹钟，启动引擎和控制接口"""
+        if self.journal:
+            self.journal.restore(self.engine)
+        self.engine.start()
+        if self.socket_path:
+            self.ipc = AlarmIPCServer(self.engine, self.socket_path)
+            # 其他进程中的界面通过 subscribe 连接和断开
+            self.ipc.controller.set_attach_handlers(self.attach, self.detach)
+            self.ipc.start()
+
+    def run_forever(self):
+        """在当前线程中运行，直到 stop() 被调用（如收到 SIGTERM）"""
+        logging.info("闹钟守护进程运行中")
+        try:
+            # 闹钟由引擎线程触发、变更由日志写入，这里只需等待退出请求
+            self._stop_event.wait()
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        """请求 run_forever() 退出（可在信号处理函数中调用）"""
+        self._stop_event.set()
+
+    def shutdown(self):
+        """停止控制接口、引擎和铃声，并写入最后的状态"""
+        if self.ipc:
+            self.ipc.stop()
+            self.ipc = None
+        self.engine.stop()
+        self.workers.shutdown()
+        if self.journal:
+            self.journal.close()
+        logging.info("闹钟守护进程已退出")
+
+
+def run_gui(daemon):
+    """在守护进程中打开图形界面（关闭窗口后守护进程继续运行）"""
+    import tkinter as tk
+    from alarm_clock_gui import AlarmClockGUI
+
+    root = tk.Tk()
+    root.option_add("*Font", "SimHei 10")
+    AlarmClockGUI(root, daemon=daemon)
+    root.mainloop()
+
+
+def main(argv=None):
+    """守护进程入口，返回退出码"""
+    parser = argparse.ArgumentParser(description="无界面闹钟守护进程")
+    parser.add_argument("--daemon", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="闹钟保存文件路径")
+    parser.add_argument("--no-store", action="store_true", help="不保存闹钟")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="控制接口的套接字路径")
+    parser.add_argument("--no-ipc", action="store_true", help="不提供控制接口")
+    parser.add_argument("--log-file", help="日志文件路径，默认输出到标准错误")
+    parser.add_argument("--gui", action="store_true", help="同时打开图形界面")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename=args.log_file
+    )
+
+    # 同一个控制接口只允许一个实例；已有实例时把启动参数交给它后退出
+    instance_lock = InstanceLock(lock_path_for(args.socket))
+    if not instance_lock.acquire():
+        return _hand_off_to_running(instance_lock, args.socket, argv)
+
+    daemon = AlarmDaemon(journal=None if args.no_store else AlarmJournal(args.store),
+                         socket_path=None if args.no_ipc else args.socket)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    daemon.start()
+    if args.gui:
+        run_gui(daemon)
+    daemon.run_forever()
+    instance_lock.release()
+    return 0
+
+
+def _hand_off_to_running(instance_lock, socket_path, argv):
+    """已有实例在运行时调用，返回退出码"""
+    try:
+        hand_off([{'op': 'activate', 'argv': list(sys.argv[1:] if argv is None else argv)}], socket_path)
+    except OSError as e:
+        logging.error(f"闹钟程序已在运行 (PID {instance_lock.owner_pid()})，但无法连接其控制接口: {e}")
+        return 1
+    logging.info(f"闹钟程序已在运行 (PID {instance_lock.owner_pid()})，本次启动退出")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+闹钟引擎 - 命令行和两个图形界面共用的调度核心
+
+负责闹钟的存储、按触发时间排序、到期触发和贪睡，不依赖 Tk，
+可以在无界面环境中单独运行和分析性能。界面只需要调用引擎的
+增删改接口，并通过监听器接收到期的闹钟。
+
+重复闹钟在到期时才按规则计算下一次时间，并以同一个ID重新调度。
+贪睡同样只是把同一个闹钟在调度器中改期，不新建闹钟、不重启线程。
+"""
+import datetime
+import logging
+import math
+import threading
+
+from alarm_record import AlarmRecord
+from alarm_scheduler import AlarmScheduler
+from registry import IdRegistry
+
+DEFAULT_SNOOZE_MINUTES = 5
+
+# 下一个闹钟缓存的失效标记
+_STALE = object()
+
+# 引擎维护的字段（其余字段由界面使用，原样保存）
+ENGINE_FIELDS = ('id', 'time', 'label', 'snooze', 'enabled', 'created_at', 'recurrence', 'occurrences',
+                 'snoozed', 'snooze_count', 'resume_time')
+
+
+def next_fire_time(hour, minute, now=None):
+    """计算下一次到达 HH:MM 的时间，今天已过（含当前时刻）则为明天"""
+    now = now or datetime.datetime.now()
+    fire_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if fire_time <= now:
+        fire_time += datetime.timedelta(days=1)
+    return fire_time
+
+
+class AlarmEngine:
+    """闹钟引擎（线程安全）
+
+    闹钟以 AlarmRecord（可以当作字典使用的紧凑记录）表示，包含 ENGINE_FIELDS
+    中的字段，界面相关的字段（铃声、音量等）原样保存。到期的单次闹钟会从引擎中移除，重复闹钟改期到下一次；
+    到期闹钟的快照以列表的形式一次性传给所有监听器（同一时刻到期的闹钟在
+    同一批中）。
+
+    贪睡中的闹钟 snoozed 为 True，snooze_count 记录自上次正常触发以来的
+    贪睡次数；重复闹钟的 resume_time 保存贪睡结束后要回到的规则时间。
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.scheduler = AlarmScheduler()
+        self._alarms = IdRegistry()  # 闹钟ID -> 闹钟记录（保持添加顺序，ID不重复使用）
+        self._listeners = []
+        self._change_listeners = []
+        self._mutation_listeners = []
+        self._next_cache = None  # (触发时间戳, 标签) 或 None，闹钟变化时置为 _STALE
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def __len__(self):
+        with self.lock:
+            return len(self._alarms)
+
+    # ---- 监听器 ----
+
+    def add_listener(self, callback):
+        """注册到期回调 callback(alarms)，在引擎线程中调用"""
+        with self.lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """注销到期回调"""
+        with self.lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def add_change_listener(self, callback):
+        """注册闹钟集合变化回调 callback()（在持有引擎锁时调用，应尽快返回）"""
+        with self.lock:
+            self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        """注销变化回调"""
+        with self.lock:
+            if callback in self._change_listeners:
+                self._change_listeners.remove(callback)
+
+    def add_mutation_listener(self, callback):
+        """注册逐条变更回调 callback(op, alarm_id, alarm)（用于持久化）
+
+        op 为 'add'、'edit'、'snooze'、'fire'、'delete' 或 'clear'；alarm 是变更后
+        引擎中的闹钟，变更后闹钟已不存在（删除、单次闹钟触发）时为 None。
+        回调在持有引擎锁时按变更顺序调用，不能阻塞（如写文件应交给后台线程）。
+        """
+        with self.lock:
+            self._mutation_listeners.append(callback)
+
+    def remove_mutation_listener(self, callback):
+        """注销逐条变更回调"""
+        with self.lock:
+            if callback in self._mutation_listeners:
+                self._mutation_listeners.remove(callback)
+
+    def _record(self, op, alarm_id, alarm):
+        """通知逐条变更回调（调用方持有锁）"""
+        for callback in self._mutation_listeners:
+            try:
+                callback(op, alarm_id, alarm)
+            except Exception as e:
+                logging.error(f"闹钟变更回调出错: {e}")
+
+    def _mark_changed(self):
+        """闹钟集合已变化：使下一个闹钟缓存失效并通知变化回调（调用方持有锁）"""
+        self._next_cache = _STALE
+        for callback in self._change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"闹钟变化回调出错: {e}")
+
+    # ---- 存储 ----
+
+    def load_alarms(self, alarms):
+        """恢复已保存的闹钟（保留原ID），返回恢复的数量
+
+        已过期的单次闹钟被丢弃（禁用的保留但不排期），已过期的重复闹钟顺延到下一次。
+        """
+        now = datetime.datetime.now()
+        restored = 0
+        with self.lock:
+            for alarm in alarms:
+                alarm = AlarmRecord(alarm)
+                alarm.setdefault('recurrence', None)
+                alarm.setdefault('occurrences', 0)
+                alarm.setdefault('enabled', True)
+                alarm.setdefault('snoozed', False)
+                alarm.setdefault('snooze_count', 0)
+                alarm.setdefault('resume_time', None)
+                if alarm['time'] <= now:
+                    next_time = self._next_occurrence(alarm, now)
+                    if next_time is None:
+                        if alarm['enabled']:
+                            continue
+                        self._alarms.put(alarm)
+                        restored += 1
+                        continue
+                    alarm['time'] = next_time
+                self._alarms.put(alarm)
+                self.scheduler.schedule(alarm['id'], alarm['time'], alarm)
+                restored += 1
+            self._mark_changed()
+        return restored
+
+    def add_alarm(self, fire_time, label="", snooze=DEFAULT_SNOOZE_MINUTES, recurrence=None, **fields):
+        """添加闹钟并返回闹钟字典
+
+        Args:
+            fire_time: 触发时间（datetime），重复闹钟会顺延到第一个符合规则的时间
+            label: 闹钟标签
+            snooze: 贪睡分钟数
+            recurrence: 重复规则（RecurrenceRule），None 表示单次闹钟
+            **fields: 其他需要随闹钟保存的字段
+        """
+        if recurrence is not None:
+            fire_time = recurrence.first_on_or_after(fire_time)
+        with self.lock:
+            alarm = AlarmRecord(
+                time=fire_time,
+                label=label,
+                snooze=snooze,
+                enabled=True,
+                created_at=datetime.datetime.now(),
+                recurrence=recurrence,
+                occurrences=0,
+                snoozed=False,
+                snooze_count=0,
+                resume_time=None,
+            )
+            alarm.update(fields)
+            self._alarms.add(alarm)
+            self.scheduler.schedule(alarm['id'], fire_time, alarm)
+            self._record('add', alarm['id'], alarm)
+            self._mark_changed()
+        logging.info(f"引擎添加闹钟: ID={alarm['id']}, 时间={fire_time.strftime('%Y-%m-%d %H:%M')}, 标签='{label or '无'}'")
+        return alarm
+
+    def add_alarms(self, specs):
+        """批量添加闹钟，只加锁、整理调度堆和通知变化各一次，返回闹钟字典列表
+
+        Args:
+            specs: 字典列表，每个字典的键与 add_alarm() 的参数相同
+                （fire_time 也可以写作 time）
+        """
+        now = datetime.datetime.now()
+        prepared = []
+        for spec in specs:
+            spec = dict(spec)
+            # 两个键都先取出，否则同时给出时多余的 time 会被 update() 写回闹钟，覆盖触发时间
+            fire_time, legacy_time = spec.pop('fire_time', None), spec.pop('time', None)
+            if fire_time is None:
+                if legacy_time is None:
+                    raise KeyError('fire_time')
+                fire_time = legacy_time
+            recurrence = spec.pop('recurrence', None)
+            if recurrence is not None:
+                fire_time = recurrence.first_on_or_after(fire_time)
+            alarm = AlarmRecord(
+                time=fire_time,
+                label=spec.pop('label', ""),
+                snooze=spec.pop('snooze', DEFAULT_SNOOZE_MINUTES),
+                enabled=True,
+                created_at=now,
+                recurrence=recurrence,
+                occurrences=0,
+                snoozed=False,
+                snooze_count=0,
+                resume_time=None,
+            )
+            alarm.update(spec)
+            prepared.append(alarm)
+        with self.lock:
+            for alarm in prepared:
+                self._alarms.add(alarm)
+            self.scheduler.schedule_many((alarm['id'], alarm['time'], alarm) for alarm in prepared)
+            for alarm in prepared:
+                self._record('add', alarm['id'], alarm)
+            self._mark_changed()
+        logging.info(f"引擎批量添加 {len(prepared)} 个闹钟")
+        return prepared
+
+    def get_alarm(self, alarm_id):
+        """按ID查找闹钟，不存在时返回 None"""
+        with self.lock:
+            return self._alarms.get(alarm_id)
+
+    def update_alarm(self, alarm_id, **fields):
+        """修改闹钟字段，返回修改后的闹钟或 None
+
+        修改触发时间时自动改期；重新启用闹钟时按它的触发时间重新排期（已过期的
+        禁用单次闹钟在下一次检查时触发）。
+        """
+        with self.lock:
+            alarm = self._alarms.get(alarm_id)
+            if alarm is None:
+                return None
+            alarm.update(fields)
+            if 'time' in fields:
+                # 手动改时间即结束贪睡
+                alarm['snoozed'] = False
+                alarm['resume_time'] = None
+                self.scheduler.schedule(alarm_id, alarm['time'], alarm)
+            elif fields.get('enabled'):
+                self.scheduler.schedule(alarm_id, alarm['time'], alarm)
+            self._record('edit', alarm_id, alarm)
+            self._mark_changed()
+            return alarm
+
+    def remove_alarm(self, alarm_id):
+        """删除闹钟，返回被删除的闹钟或 None"""
+        with self.lock:
+            alarm = self._alarms.remove(alarm_id)
+            if alarm is not None:
+                self.scheduler.cancel(alarm_id)
+                self._record('delete', alarm_id, None)
+                self._mark_changed()
+            return alarm
+
+    def remove_alarms(self, alarm_ids):
+        """批量删除闹钟，返回被删除的闹钟列表"""
+        with self.lock:
+            removed = self._alarms.remove_many(alarm_ids)
+            self.scheduler.cancel_many([alarm['id'] for alarm in removed])
+            for alarm in removed:
+                self._record('delete', alarm['id'], None)
+            self._mark_changed()
+            return removed
+
+    def clear(self):
+        """删除所有闹钟，返回删除的数量"""
+        with self.lock:
+            count = self._alarms.clear()
+            self.scheduler.clear()
+            self._record('clear', None, None)
+            self._mark_changed()
+            return count
+
+    def alarms(self):
+        """返回所有闹钟（按添加顺序）的列表副本"""
+        with self.lock:
+            return self._alarms.values()
+
+    def next_alarm(self):
+        """返回最早触发的闹钟，没有闹钟时返回 None"""
+        head = self.scheduler.peek()
+        return head[2] if head else None
+
+    def next_fire_time(self):
+        """返回最早的触发时间，没有闹钟时返回 None"""
+        return self.scheduler.next_fire_time()
+
+    def next_deadline(self):
+        """返回缓存的下一个闹钟 (触发时间戳（整秒，向上取整）, 标签)，没有闹钟时返回 None
+
+        缓存只在闹钟变化时失效，界面每秒刷新倒计时时无需加锁或遍历闹钟。
+        """
+        cached = self._next_cache
+        if cached is not _STALE:
+            return cached
+        with self.lock:
+            head = self.scheduler.peek()
+            cached = (math.ceil(head[0].timestamp()), head[2]['label']) if head else None
+            self._next_cache = cached
+            return cached
+
+    # ---- 贪睡 ----
+
+    def snooze(self, alarm, minutes=None, now=None):
+        """贪睡：把闹钟以同一个ID改期到 minutes 分钟后，返回引擎中的闹钟
+
+        只改动调度器中的一个条目（O(log n)），不新建闹钟。已触发并移除的
+        单次闹钟按快照以原ID恢复；重复闹钟记住规则的下一次时间，贪睡
+        到期后回到原规则。
+
+        Args:
+            alarm: 已触发的闹钟快照，或引擎中尚未到期的闹钟
+            minutes: 贪睡分钟数，默认使用闹钟自身的 snooze
+            now: 当前时间
+        """
+        minutes = minutes or alarm.get('snooze') or DEFAULT_SNOOZE_MINUTES
+        now = now or datetime.datetime.now()
+        snooze_time = now + datetime.timedelta(minutes=minutes)
+        with self.lock:
+            current = self._alarms.get(alarm['id'])
+            if current is None:
+                # 单次闹钟（或已删除、已结束的重复闹钟）到期后已被移除，以原ID恢复为单次闹钟
+                current = AlarmRecord(alarm, recurrence=None, resume_time=None)
+                current.setdefault('snooze_count', 0)
+                self._alarms.put(current)
+            elif current['recurrence'] is not None and current['resume_time'] is None:
+                current['resume_time'] = current['time']
+            current['time'] = snooze_time
+            current['snoozed'] = True
+            current['snooze_count'] += 1
+            self.scheduler.schedule(current['id'], snooze_time, current)
+            self._record('snooze', current['id'], current)
+            self._mark_changed()
+        logging.info(f"闹钟已贪睡: ID={current['id']}, {minutes}分钟, 第{current['snooze_count']}次")
+        return current
+
+    # ---- 触发 ----
+
+    def run_pending(self, now=None):
+        """触发所有到期的闹钟并通知监听器，返回本次触发的闹钟快照列表"""
+        now = now or datetime.datetime.now()
+        with self.lock:
+            fired = []
+            due = self.scheduler.pop_due(now)
+            for alarm_id, alarm in due:
+                if alarm['snoozed']:
+                    # 贪睡到期不计入规则的触发次数
+                    alarm['snoozed'] = False
+                else:
+                    alarm['occurrences'] += 1
+                    alarm['snooze_count'] = 0
+                if alarm['enabled']:
+                    fired.append(dict(alarm))
+                rescheduled = self._reschedule_or_remove(alarm, now)
+                self._record('fire', alarm_id, alarm if rescheduled else None)
+            if due:
+                self._mark_changed()
+            listeners = list(self._listeners)
+
+        if fired:
+            logging.info(f"引擎触发 {len(fired)} 个闹钟")
+            for callback in listeners:
+                try:
+                    callback(fired)
+                except Exception as e:
+                    logging.error(f"闹钟到期回调出错: {e}")
+        return fired
+
+    def _next_occurrence(self, alarm, now):
+        """闹钟到期（或已错过）后按规则的下一次时间，没有下一次时返回 None
+
+        贪睡中的重复闹钟回到原定的规则时间，该时间也已错过时从它开始顺延。
+        """
+        rule = alarm['recurrence']
+        previous = alarm['resume_time'] or alarm['time']
+        alarm['resume_time'] = None
+        alarm['snoozed'] = False
+        if rule is None:
+            return None
+        if previous > now:
+            return previous
+        return rule.next_after(previous, alarm['occurrences'], now)
+
+    def _reschedule_or_remove(self, alarm, now):
+        """重复闹钟按规则改期到下一次（跳过错过的时间），单次或已结束的闹钟移除
+
+        禁用的闹钟没有下一次时保留但不再排期，重新启用时再排期（见 update_alarm）。
+
+        Returns:
+            闹钟是否仍保留（False 表示已移除）
+        """
+        next_time = self._next_occurrence(alarm, now)
+        if next_time is None:
+            if not alarm['enabled']:
+                return True
+            self._alarms.remove(alarm['id'])
+            return False
+        alarm['time'] = next_time
+        self.scheduler.schedule(alarm['id'], next_time, alarm)
+        return True
+
+    def start(self):
+        """启动引擎的触发线程"""
+        with self.lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="AlarmEngine", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止触发线程"""
+        self._stop_event.set()
+        self.scheduler.wake()
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+
+    def is_running(self):
+        """触发线程是否在运行"""
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        """触发线程：睡眠到最早的触发时间，闹钟变化时被唤醒重新计算"""
+        logging.info("闹钟引擎线程已启动")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.run_pending()
+                except Exception as e:
+                    logging.error(f"闹钟引擎线程中的错误: {e}")
+                if self._stop_event.is_set():
+                    break
+                self.scheduler.wait_for_next()
+        finally:
+            logging.info("闹钟引擎线程已退出")
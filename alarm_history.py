@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+闹钟历史 - 记录每次响铃、停止、贪睡和关闭，按时间或标签查询
+
+每条事件是一个字典:
+    {"seq": 序号, "ts": 发生时间戳, "kind": "fire"/"stop"/"snooze"/"dismiss",
+     "id": 闹钟ID, "label": 标签, "scheduled": 闹钟设定的时间戳, "lateness": ts - scheduled（秒）}
+
+最近的 capacity 条事件保存在内存中的环形缓冲区（deque）里。每攒满
+segment_events 条还没有归档的事件，就写成一个 gzip 压缩的 JSONL 段文件
+history-<序号>.jsonl.gz，并在 index.json 中记下该段的序号范围、时间范围和
+出现过的标签；段文件超过 max_segments 个时删除最旧的段。
+
+查询先用索引跳过时间范围不重叠或不含该标签的段，只解压可能命中的段，
+环形缓冲区中的事件直接在内存中过滤，不需要载入整个归档。
+"""
+import datetime
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from alarm_journal import _fsync_directory
+from alarm_store import DATA_DIR
+
+DEFAULT_HISTORY_DIR = os.path.join(DATA_DIR, "history")
+
+FIRE = "fire"
+STOP = "stop"
+SNOOZE = "snooze"
+DISMISS = "dismiss"
+KINDS = (FIRE, STOP, SNOOZE, DISMISS)
+
+RING_CAPACITY = 4096  # 内存中保留的最近事件数
+SEGMENT_EVENTS = 1024  # 每个归档段的事件数
+MAX_SEGMENTS = 64  # 最多保留的归档段数
+
+_INDEX_NAME = "index.json"
+_SEGMENT_PREFIX = "history-"
+_SEGMENT_SUFFIX = ".jsonl.gz"
+
+
+def _to_timestamp(value):
+    return value.timestamp() if isinstance(value, datetime.datetime) else value
+
+
+def _matches(event, start, end, label, kind):
+    """事件是否在 [start, end) 内且标签、类型相符（None 表示不限）"""
+    return ((start is None or event["ts"] >= start) and (end is None or event["ts"] < end)
+            and (label is None or event["label"] == label) and (kind is None or event["kind"] == kind))
+
+
+class AlarmHistory:
+    """闹钟历史（线程安全）
+
+    Args:
+        directory: 归档段和索引所在的目录
+        capacity: 内存中保留的最近事件数（至少为 segment_events）
+        segment_events: 每个归档段的事件数
+        max_segments: 最多保留的归档段数，超过时删除最旧的段（0 表示不限）
+    """
+
+    def __init__(self, directory=DEFAULT_HISTORY_DIR, capacity=RING_CAPACITY, segment_events=SEGMENT_EVENTS,
+                 max_segments=MAX_SEGMENTS):
+        self.directory = directory
+        self.index_path = os.path.join(directory, _INDEX_NAME)
+        self.segment_events = segment_events
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # 依次写入归档段和索引
+        self._ring = deque(maxlen=max(capacity, segment_events))
+        self._unarchived = []  # 还没有写入归档段的事件
+        self._segments = self._load_index()  # [{"name", "first", "last", "start", "end", "labels"}, ...]
+        self._next_seq = self._segments[-1]["last"] + 1 if self._segments else 0
+        self._preload()
+
+    # ---- 索引和段文件 ----
+
+    def _segment_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_index(self):
+        """读取索引，索引丢失或损坏时扫描段文件重建"""
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)["segments"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logging.warning(f"历史索引损坏，重建索引: {e}")
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX))
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            events = self._read_segment(name)
+            if events:
+                segments.append(self._describe(name, events))
+        return segments
+
+    @staticmethod
+    def _describe(name, events):
+        return {"name": name, "first": events[0]["seq"], "last": events[-1]["seq"],
+                "start": min(event["ts"] for event in events), "end": max(event["ts"] for event in events),
+                "labels": sorted({event["label"] for event in events})}
+
+    def _read_segment(self, name):
+        try:
+            with gzip.open(self._segment_path(name), 'rt', encoding='utf-8') as f:
+                return [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return []
+        except (OSError, EOFError, ValueError) as e:
+            logging.warning(f"跳过损坏的历史段 {name}: {e}")
+            return []
+
+    def _write_index(self, segments):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"segments": segments}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        _fsync_directory(self.directory)
+
+    def _preload(self):
+        """启动时从最新的段载入最近的事件，重启后仍能查询最近的历史"""
+        events = []
+        for segment in reversed(self._segments):
+            events[:0] = self._read_segment(segment["name"])
+            if len(events) >= self._ring.maxlen:
+                break
+        self._ring.extend(events)
+
+    def _archive(self, events):
+        """把一批事件写成一个归档段，更新索引并删除超出数量的旧段"""
+        name = f"{_SEGMENT_PREFIX}{events[0]['seq']:012d}{_SEGMENT_SUFFIX}"
+        with self._write_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._segment_path(name) + ".tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, self._segment_path(name))
+            with self._lock:
+                self._segments.append(self._describe(name, events))
+                # 两批事件同时写入时后写完的可能是较早的段
+                self._segments.sort(key=lambda segment: segment["first"])
+                expired = self._segments[:-self.max_segments] if self.max_segments else []
+                del self._segments[:len(expired)]
+                segments = list(self._segments)
+            self._write_index(segments)
+            for segment in expired:
+                try:
+                    os.remove(self._segment_path(segment["name"]))
+                except FileNotFoundError:
+                    pass
+
+    # ---- 记录 ----
+
+    def record(self, kind, alarm, now=None):
+        """记录一个闹钟事件，返回事件字典
+
+        Args:
+            kind: FIRE、STOP、SNOOZE 或 DISMISS
+            alarm: 闹钟（字典或 AlarmRecord），使用其中的 id、label 和 time
+            now: 发生时间（datetime 或时间戳），默认为当前时间
+        """
+        ts = _to_timestamp(now) if now is not None else time.time()
+        scheduled = alarm.get("time")
+        scheduled = _to_timestamp(scheduled) if scheduled is not None else None
+        batch = None
+        with self._lock:
+            event = {"seq": self._next_seq, "ts": ts, "kind": kind, "id": alarm.get("id"),
+                     "label": alarm.get("label") or "", "scheduled": scheduled,
+                     "lateness": None if scheduled is None else ts - scheduled}
+            self._next_seq += 1
+            self._ring.append(event)
+            self._unarchived.append(event)
+            if len(self._unarchived) >= self.segment_events:
+                batch, self._unarchived = self._unarchived, []
+        if batch:
+            self._spill(batch)
+        return event
+
+    def record_many(self, kind, alarms, now=None):
+        """为一批闹钟（如同时到期的闹钟）记录同一类事件"""
+        return [self.record(kind, alarm, now) for alarm in alarms]
+
+    def _spill(self, batch):
+        try:
+            self._archive(batch)
+        except OSError as e:
+            logging.error(f"写入闹钟历史失败: {e}")
+
+    def flush(self):
+        """把还没有归档的事件写成一个（可能不满的）归档段"""
+        with self._lock:
+            batch, self._unarchived = self._unarchived, []
+        if batch:
+            self._spill(batch)
+
+    def close(self):
+        """程序退出前调用，把剩余的事件写入归档"""
+        self.flush()
+
+    # ---- 查询 ----
+
+    def recent(self, count=None):
+        """返回最近的 count 条事件（默认为内存中的全部），按发生顺序排列"""
+        with self._lock:
+            events = list(self._ring)
+        if count is None:
+            return events
+        return events[-count:] if count > 0 else []
+
+    def query(self, start=None, end=None, label=None, kind=None):
+        """返回发生时间在 [start, end) 内、标签和类型相符的事件，按发生顺序排列
+
+        start、end 为 datetime 或时间戳，None 表示不限。
+        """
+        start = _to_timestamp(start) if start is not None else None
+        end = _to_timestamp(end) if end is not None else None
+        with self._lock:
+            ring = list(self._ring)
+            segments = list(self._segments)
+        # 环形缓冲区中的事件是最新的一段，只需从归档中读取更早的事件
+        first_in_memory = ring[0]["seq"] if ring else self._next_seq
+        events = []
+        for segment in segments:
+            if segment["first"] >= first_in_memory:
+                break
+            if start is not None and segment["end"] < start or end is not None and segment["start"] >= end:
+                continue
+            if label is not None and label not in segment["labels"]:
+                continue
+            events.extend(event for event in self._read_segment(segment["name"])
+                          if event["seq"] < first_in_memory and _matches(event, start, end, label, kind))
+        events.extend(event for event in ring if _matches(event, start, end, label, kind))
+        return events
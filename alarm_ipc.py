@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+闹钟本地控制接口 - 通过本机套接字管理守护进程中的闹钟
+
+协议为 JSON Lines：客户端每行发送一个请求 {"op": ..., ...}，服务端按顺序
+每行返回一个响应 {"ok": true, "result": ...} 或 {"ok": false, "error": ...}。
+同一连接上可以连续发送多个请求而不必等待响应（流水线）。
+
+支持的操作:
+    ping                                  检查连接
+    add     time, label, snooze, repeat   添加一个闹钟
+    add     alarms=[{...}, ...]           批量添加：一次往返、一次索引更新
+    list / get id / next                  查询闹钟
+    edit    id, time/label/...            修改闹钟
+    delete  id 或 ids=[...]               删除（批量删除只整理一次调度堆）
+    clear                                 删除所有闹钟
+    snooze  id, minutes                   贪睡刚响过或未到期的闹钟（同一ID改期）
+    activate argv=[...]                   第二次启动的程序把启动参数交给正在运行的实例
+    batch   ops=[{...}, ...]              在同一把引擎锁内依次执行多个操作
+    subscribe                             界面连接守护进程：该连接此后只接收推送的事件
+                                          {"event": "fired", "alarms": [...]}、
+                                          {"event": "changed"}、{"event": "activate", "argv": [...]}，
+                                          连接断开即断开界面（见 alarm_remote.py）
+
+所有操作都直接调用闹钟引擎，与界面的 set_alarm 使用同一套加锁的数据结构。
+
+默认使用 Unix 套接字（套接字文件权限为 0600）。没有 Unix 套接字的平台
+（Windows）上改为监听 127.0.0.1 的随机端口，套接字路径处写一个地址文件
+{"port": 端口, "token": 随机令牌}；客户端连接后先发送一行 {"token": ...}，
+令牌不符时服务端直接断开，其他用户的进程不能冒充同一用户的客户端。
+时间可以写作 "HH:MM"（下一次到达该时刻）或 ISO 格式；重复规则可以写作
+界面中的重复选项（如 "工作日"）或 RecurrenceRule.to_dict() 的字典。
+"""
+import collections
+import datetime
+import hmac
+import json
+import logging
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import threading
+
+from alarm_engine import next_fire_time
+from alarm_store import DATA_DIR, alarm_to_json
+from recurrence import RecurrenceRule
+
+DEFAULT_SOCKET_PATH = os.path.join(DATA_DIR, "alarm.sock")
+UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')  # Windows 上的 Python 没有 Unix 套接字，改用本机 TCP 端口
+TCP_HOST = "127.0.0.1"
+
+RECENT_FIRED_LIMIT = 100  # 记住最近响过的闹钟数量（用于贪睡）
+
+# 不允许通过 edit 修改的字段
+_READONLY_FIELDS = ('id', 'created_at', 'occurrences')
+
+
+class IPCError(Exception):
+    """服务端返回的错误"""
+
+
+def _write_address(path, port, token):
+    """写入 TCP 控制接口的地址文件（先写临时文件再原子替换）"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'port': port, 'token': token}, f)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+
+def _read_address(path):
+    """读取地址文件，返回 (端口, 令牌)；文件不存在时抛出 FileNotFoundError"""
+    with open(path, encoding='utf-8') as f:
+        try:
+            address = json.load(f)
+            return int(address['port']), address['token']
+        except (ValueError, KeyError, TypeError) as e:
+            raise ConnectionRefusedError(f"无效的控制接口地址文件 {path}: {e}") from e
+
+
+def parse_time(value, now=None):
+    """解析 "HH:MM" 或 ISO 格式的时间"""
+    if isinstance(value, datetime.datetime):
+        return value
+    if len(value) <= 5 and ':' in value:
+        hour, minute = (int(part) for part in value.split(':'))
+        if not (0 <= hour <= 23 and 0 <= minute <= 59):
+            raise ValueError(f"无效的时间: {value}")
+        return next_fire_time(hour, minute, now)
+    return datetime.datetime.fromisoformat(value)
+
+
+def parse_recurrence(value):
+    """解析重复规则：None、界面中的重复选项或 to_dict() 字典"""
+    if not value:
+        return None
+    if isinstance(value, RecurrenceRule):
+        return value
+    if isinstance(value, dict):
+        return RecurrenceRule.from_dict(value)
+    rule = RecurrenceRule.from_choice(value)
+    if rule is None and value != "不重复":
+        raise ValueError(f"未知的重复方式: {value}")
+    return rule
+
+
+def _alarm_spec(request, now=None):
+    """把请求中的闹钟描述转换为 AlarmEngine.add_alarm() 的参数"""
+    spec = {key: value for key, value in request.items() if key not in ('op', 'repeat') + _READONLY_FIELDS}
+    spec['time'] = parse_time(request['time'], now)
+    spec['recurrence'] = parse_recurrence(request.get('repeat', request.get('recurrence')))
+    return spec
+
+
+class AlarmController:
+    """执行控制请求（与传输方式无关，便于测试）
+
+    Args:
+        engine: 被控制的闹钟引擎
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._recent = collections.OrderedDict()  # 最近响过的闹钟 ID -> 快照
+        self._recent_lock = threading.Lock()
+        self._activate_listeners = []
+        self._attach_handlers = None  # (attach, detach)，由守护进程设置
+        engine.add_listener(self._remember_fired)
+
+    def close(self):
+        self.engine.remove_listener(self._remember_fired)
+
+    def add_activate_listener(self, callback):
+        """注册激活回调 callback(argv)（在控制接口线程中调用），如显示已打开的窗口"""
+        self._activate_listeners.append(callback)
+
+    def remove_activate_listener(self, callback):
+        if callback in self._activate_listeners:
+            self._activate_listeners.remove(callback)
+
+    def set_attach_handlers(self, attach, detach):
+        """接受界面订阅：attach(listener)/detach(listener) 连接和断开接收到期闹钟的界面"""
+        self._attach_handlers = (attach, detach)
+
+    def subscribe(self, on_fired, on_changed, on_activate):
+        """连接一个订阅的界面，本实例不接受界面连接时抛出 ValueError"""
+        if self._attach_handlers is None:
+            raise ValueError("本实例不接受界面连接（只有守护进程支持 subscribe）")
+        self._attach_handlers[0](on_fired)
+        self.engine.add_change_listener(on_changed)
+        self.add_activate_listener(on_activate)
+
+    def unsubscribe(self, on_fired, on_changed, on_activate):
+        self.remove_activate_listener(on_activate)
+        self.engine.remove_change_listener(on_changed)
+        self._attach_handlers[1](on_fired)
+
+    def _remember_fired(self, alarms):
+        with self._recent_lock:
+            for alarm in alarms:
+                self._recent[alarm['id']] = alarm
+                self._recent.move_to_end(alarm['id'])
+            while len(self._recent) > RECENT_FIRED_LIMIT:
+                self._recent.popitem(last=False)
+
+    def handle(self, request):
+        """执行一个请求，返回响应字典（不抛出异常）"""
+        try:
+            return {'ok': True, 'result': self.execute(request)}
+        except (KeyError, TypeError, ValueError, LookupError) as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    def execute(self, request):
+        """执行一个请求并返回结果，请求无效时抛出异常"""
+        op = request.get('op')
+        method = getattr(self, f"op_{op}", None) if isinstance(op, str) else None
+        if method is None:
+            raise ValueError(f"未知的操作: {op}")
+        return method(request)
+
+    def _require(self, alarm_id):
+        alarm = self.engine.get_alarm(alarm_id)
+        if alarm is None:
+            raise LookupError(f"闹钟不存在: {alarm_id}")
+        return alarm
+
+    # ---- 操作 ----
+
+    def op_ping(self, request):
+        return "pong"
+
+    def op_add(self, request):
+        if 'alarms' in request:
+            now = datetime.datetime.now()
+            specs = [_alarm_spec(item, now) for item in request['alarms']]
+            return {'ids': [alarm['id'] for alarm in self.engine.add_alarms(specs)]}
+        spec = _alarm_spec(request)
+        return alarm_to_json(self.engine.add_alarm(spec.pop('time'), **spec))
+
+    def op_list(self, request):
+        return [alarm_to_json(alarm) for alarm in self.engine.alarms()]
+
+    def op_get(self, request):
+        return alarm_to_json(self._require(request['id']))
+
+    def op_next(self, request):
+        alarm = self.engine.next_alarm()
+        return alarm_to_json(alarm) if alarm else None
+
+    def op_edit(self, request):
+        fields = {key: value for key, value in request.items() if key not in ('op', 'repeat') + _READONLY_FIELDS}
+        if 'time' in fields:
+            fields['time'] = parse_time(fields['time'])
+        if 'repeat' in request or 'recurrence' in request:
+            fields['recurrence'] = parse_recurrence(request.get('repeat', request.get('recurrence')))
+        with self.engine.lock:
+            self._require(request['id'])
+            return alarm_to_json(self.engine.update_alarm(request['id'], **fields))
+
+    def op_delete(self, request):
+        if 'ids' in request:
+            return {'deleted': len(self.engine.remove_alarms(request['ids']))}
+        if self.engine.remove_alarm(request['id']) is None:
+            raise LookupError(f"闹钟不存在: {request['id']}")
+        return {'deleted': 1}
+
+    def op_clear(self, request):
+        return {'deleted': self.engine.clear()}
+
+    def op_snooze(self, request):
+        alarm_id = request['id']
+        with self._recent_lock:
+            fired = self._recent.pop(alarm_id, None)
+        with self.engine.lock:
+            # 刚响过的单次闹钟已不在引擎中，用快照以原ID恢复
+            alarm = self.engine.get_alarm(alarm_id) or fired or self._require(alarm_id)
+            return alarm_to_json(self.engine.snooze(alarm, request.get('minutes')))
+
+    def op_activate(self, request):
+        argv = list(request.get('argv', ()))
+        logging.info(f"收到其他实例的启动参数: {argv}")
+        listeners = list(self._activate_listeners)
+        for callback in listeners:
+            try:
+                callback(argv)
+            except Exception as e:
+                logging.error(f"激活回调出错: {e}")
+        # activated 为 False 表示本实例没有可以显示的窗口（如无界面的守护进程）
+        return {'pid': os.getpid(), 'activated': bool(listeners)}
+
+    def op_batch(self, request):
+        with self.engine.lock:
+            return [self.handle(item) for item in request['ops']]
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """一个连接：逐行读取请求并按顺序写回响应"""
+
+    def handle(self):
+        controller = self.server.controller
+        token = getattr(self.server, 'token', None)
+        if token is not None and not self._authenticate(token):
+            return
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"无效的 JSON: {e}"}
+            else:
+                if isinstance(request, dict) and request.get('op') == 'subscribe':
+                    self._subscribe(controller)
+                    return
+                if isinstance(request, dict):
+                    response = controller.handle(request)
+                else:
+                    response = {'ok': False, 'error': "请求必须是 JSON 对象"}
+            self._send(response)
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def _subscribe(self, controller):
+        """把连接交给订阅的界面：推送事件直到客户端断开"""
+        events = queue.Queue()
+        changed = threading.Event()  # 还没发出的 changed，连续的变化只推送一次
+
+        def on_fired(alarms):
+            events.put({'event': 'fired', 'alarms': [alarm_to_json(alarm) for alarm in alarms]})
+
+        def on_changed():
+            if not changed.is_set():
+                changed.set()
+                events.put({'event': 'changed'})
+
+        def on_activate(argv):
+            events.put({'event': 'activate', 'argv': argv})
+
+        try:
+            controller.subscribe(on_fired, on_changed, on_activate)
+        except ValueError as e:
+            self._send({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+            return
+        writer = threading.Thread(target=self._push_events, args=(events, changed), name="AlarmIPCEvents",
+                                  daemon=True)
+        try:
+            self._send({'ok': True, 'result': {'pid': os.getpid()}})
+            writer.start()
+            # 订阅的连接上客户端不再发送请求，读到 EOF 说明界面已关闭
+            while self.rfile.readline():
+                pass
+        except OSError:
+            pass
+        finally:
+            controller.unsubscribe(on_fired, on_changed, on_activate)
+            events.put(None)
+            if writer.is_alive():
+                writer.join()
+        logging.info("订阅的界面已断开")
+
+    def _push_events(self, events, changed):
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            if event['event'] == 'changed':
+                changed.clear()
+            try:
+                self._send(event)
+                self.wfile.flush()
+            except OSError:
+                return
+
+    def _authenticate(self, token):
+        """TCP 连接的第一行必须是 {"token": 地址文件中的令牌}"""
+        try:
+            hello = json.loads(self.rfile.readline())
+            return hmac.compare_digest(str(hello.get('token', '')), token)
+        except (ValueError, AttributeError):
+            return False
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+
+
+if UNIX_SOCKETS:
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class AlarmIPCServer:
+    """控制服务
+
+    Args:
+        engine: 被控制的闹钟引擎
+        path: 套接字文件路径（使用 TCP 时为地址文件路径）
+    """
+
+    def __init__(self, engine, path=DEFAULT_SOCKET_PATH):
+        self.path = path
+        self.controller = AlarmController(engine)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """绑定套接字并在后台线程中处理请求"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if UNIX_SOCKETS:
+            if os.path.exists(self.path):
+                # 上次异常退出留下的套接字文件
+                os.unlink(self.path)
+            self._server = _UnixServer(self.path, _RequestHandler)
+            os.chmod(self.path, 0o600)
+        else:
+            self._server = _TCPServer((TCP_HOST, 0), _RequestHandler)
+            self._server.token = secrets.token_hex(16)
+            _write_address(self.path, self._server.server_address[1], self._server.token)
+        self._server.controller = self.controller
+        self._thread = threading.Thread(target=self._server.serve_forever, name="AlarmIPC", daemon=True)
+        self._thread.start()
+        logging.info(f"控制接口已启动: {self.path}")
+
+    def stop(self):
+        """停止服务并删除套接字文件"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.controller.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        logging.info("控制接口已停止")
+
+
+class AlarmIPCClient:
+    """控制接口客户端
+
+    Args:
+        path: 套接字文件路径（使用 TCP 时为地址文件路径）
+        timeout: 套接字超时（秒）
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, timeout=30.0):
+        self.path = path
+        if UNIX_SOCKETS:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(path)
+        else:
+            port, token = _read_address(path)
+            self._sock = socket.create_connection((TCP_HOST, port), timeout)
+            self._sock.sendall(json.dumps({'token': token}).encode('utf-8') + b"\n")
+        self._file = self._sock.makefile('rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def shutdown(self):
+        """关闭连接的读写，使阻塞在 events() 中的线程返回"""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def events(self):
+        """subscribe 之后依次返回服务端推送的事件，连接断开时结束"""
+        while True:
+            try:
+                line = self._file.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning("跳过无效的事件")
+
+    def pipeline(self, requests):
+        """一次发送多个请求，按顺序返回响应字典列表"""
+        payload = b"".join(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n"
+                           for request in requests)
+        self._sock.sendall(payload)
+        responses = []
+        for _ in requests:
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("控制接口连接已断开")
+            responses.append(json.loads(line))
+        return responses
+
+    def call(self, op, **params):
+        """执行一个操作并返回结果，失败时抛出 IPCError"""
+        response = self.pipeline([dict(params, op=op)])[0]
+        if not response['ok']:
+            raise IPCError(response['error'])
+        return response['result']
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+追加写入的闹钟日志 - 每次增删改都持久化，写盘不阻塞界面和触发线程
+
+状态由两部分组成:
+    快照  alarms.json          与 AlarmStore 相同的格式 {"alarms": [...]}
+    日志  alarms.json.journal  每行一条变更 {"op": ..., "id": ..., "alarm": {...} 或 null}
+
+引擎在持锁时通过变更回调把记录的浅拷贝放进按ID索引的脏记录表：同一条
+记录在写盘前的多次修改只保留最后的状态。后台写入线程收到第一条变更后
+再等待 debounce 秒（去抖），把这段时间内的所有变更一次写入并只 fsync
+一次（组提交），因此一次批量修改几千个闹钟只产生一次写盘。日志超过 COMPACT_BYTES 时写入线程把它改名为
+alarms.json.journal.1 并开始新日志，压缩线程在后台把旧日志合并进快照。
+写盘失败时这一批放回脏记录表，RETRY_SECONDS 秒后（或有 flush() 等待时立即）
+重试，等待中的 flush() 抛出该错误。
+
+启动时读取快照，再依次重放 .journal.1 和 .journal。每条记录都是闹钟的
+完整状态，重放是幂等的，压缩中途崩溃重放两次也得到相同的结果；写到一半
+的最后一行被丢弃。
+"""
+import json
+import logging
+import os
+import threading
+
+from alarm_store import DEFAULT_STORE_PATH, alarm_from_json, alarm_to_json
+
+DEBOUNCE_SECONDS = 0.05  # 收到变更后等待合并后续变更的时间（秒）
+COMPACT_BYTES = 1 << 20  # 日志超过该大小时在后台压缩
+RETRY_SECONDS = 1.0  # 写盘失败后重试前等待的时间（秒）
+
+
+def _read_records(path):
+    """读取日志中的记录，丢弃无法解析的行（崩溃时写到一半的最后一行）"""
+    records = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"跳过损坏的日志记录: {path}")
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _apply(state, record):
+    """把一条日志记录应用到 {id: 闹钟JSON} 状态上"""
+    if record['op'] == 'clear':
+        state.clear()
+    elif record.get('alarm') is None:
+        state.pop(record['id'], None)
+    else:
+        state[record['id']] = record['alarm']
+
+
+def _fsync_directory(directory):
+    """使文件改名持久化（不支持目录 fsync 的平台上忽略）"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _truncate_partial_line(path):
+    """截掉文件末尾不完整的一行，避免之后追加的记录与它粘在一起"""
+    try:
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+
+class AlarmJournal:
+    """追加写入的闹钟日志
+
+    Args:
+        path: 快照文件路径，日志文件为 path + ".journal"
+        key: 快照中记录列表的键名
+        to_json: 记录 -> 可 JSON 序列化的字典
+        from_json: to_json() 的逆操作
+        compact_bytes: 日志超过该大小时在后台压缩
+        debounce: 收到变更后等待合并后续变更的时间（秒），flush() 和 close() 不等待
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, key='alarms', to_json=alarm_to_json, from_json=alarm_from_json,
+                 compact_bytes=COMPACT_BYTES, debounce=DEBOUNCE_SECONDS):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.rotated_path = path + ".journal.1"
+        self.key = key
+        self.to_json = to_json
+        self.from_json = from_json
+        self.compact_bytes = compact_bytes
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._dirty = {}  # 等待写入的记录: ID -> (op, 记录浅拷贝)，同一ID只保留最后一次
+        self._cleared = False  # 写入脏记录前是否先写一条 clear
+        self._queued = 0  # 已记录的变更总数
+        self._durable = 0  # 已 fsync 的变更总数
+        self._failures = 0  # 写盘失败的次数
+        self._error = None  # 最近一次写盘失败的错误
+        self._flushing = False  # 有线程在 flush() 中等待，跳过去抖
+        self._closing = False
+        self._file = None
+        self._writer = None
+        self._compactor = None
+        self._engine = None
+
+    # ---- 读取 ----
+
+    def _read_snapshot(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.error(f"读取快照失败: {self.path}: {e}")
+            return {}
+        return {item['id']: item for item in data.get(self.key, [])}
+
+    def _replay(self, *journal_paths):
+        state = self._read_snapshot()
+        for path in journal_paths:
+            for record in _read_records(path):
+                try:
+                    _apply(state, record)
+                except (KeyError, TypeError) as e:
+                    logging.warning(f"跳过无效的日志记录 {record!r}: {e}")
+        return state
+
+    def load(self):
+        """读取快照并重放日志，返回所有记录（按ID顺序）"""
+        _truncate_partial_line(self.journal_path)
+        state = self._replay(self.rotated_path, self.journal_path)
+        records = []
+        for item in sorted(state.values(), key=lambda item: item['id']):
+            try:
+                records.append(self.from_json(item))
+            except (KeyError, TypeError, ValueError) as e:
+                logging.error(f"跳过无法解析的记录 {item!r}: {e}")
+        return records
+
+    # ---- 写入 ----
+
+    def attach(self, engine):
+        """开始记录闹钟引擎的每一次变更"""
+        self._engine = engine
+        engine.add_mutation_listener(self.record)
+
+    def restore(self, engine):
+        """把保存的闹钟恢复到引擎中并开始记录变更，返回恢复的数量
+
+        恢复时被引擎丢弃的过期闹钟会记为删除，不再留在快照中。
+        """
+        alarms = self.load()
+        restored = engine.load_alarms(alarms)
+        self.attach(engine)
+        for alarm in alarms:
+            if engine.get_alarm(alarm['id']) is None:
+                self.record('delete', alarm['id'], None)
+        logging.info(f"已从 {self.path} 恢复 {restored} 个闹钟")
+        return restored
+
+    def record(self, op, record_id, record):
+        """记录一次变更（不阻塞：只标记为脏记录，由后台线程写入）
+
+        Args:
+            op: 变更类型，如 'add'、'edit'、'delete'、'snooze'、'fire'、'clear'
+            record_id: 记录ID
+            record: 变更后的记录，已不存在时为 None
+        """
+        with self._cond:
+            if self._closing:
+                return
+            if self._writer is None:
+                self._start_writer()
+            if op == 'clear':
+                # 清空之前的修改都不必再写
+                self._dirty.clear()
+                self._cleared = True
+            else:
+                self._dirty[record_id] = (op, None if record is None else dict(record))
+            self._queued += 1
+            self._cond.notify()
+
+    @property
+    def pending(self):
+        """尚未写入的脏记录数"""
+        with self._cond:
+            return len(self._dirty)
+
+    def flush(self, timeout=None):
+        """等待已记录的变更全部写入磁盘，返回是否在超时前完成
+
+        Raises:
+            OSError: 写盘失败（变更仍留在脏记录表中，写入线程会继续重试）
+        """
+        with self._cond:
+            target = self._queued
+            failures = self._failures
+            if self._durable < target:
+                self._flushing = True
+                self._cond.notify_all()
+            done = self._cond.wait_for(
+                lambda: self._durable >= target or self._writer is None or self._failures > failures, timeout)
+            if self._durable < target and self._failures > failures:
+                raise self._error
+            return done
+
+    def _start_writer(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _truncate_partial_line(self.journal_path)
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        self._writer = threading.Thread(target=self._run, name="AlarmJournal", daemon=True)
+        self._writer.start()
+
+    def _encode(self, op, record_id, record):
+        alarm = None if record is None else self.to_json(record)
+        return json.dumps({'op': op, 'id': record_id, 'alarm': alarm}, ensure_ascii=False, default=str) + "\n"
+
+    def _run(self):
+        """写入线程：去抖后把所有脏记录一次写入，每批只 fsync 一次"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queued > self._durable or self._closing)
+                # 去抖：等待后续变更，连续的修改合并为一次写入
+                self._cond.wait_for(lambda: self._closing or self._flushing, self.debounce)
+                batch = [(op, record_id, record) for record_id, (op, record) in self._dirty.items()]
+                if self._cleared:
+                    batch.insert(0, ('clear', None, None))
+                self._dirty = {}
+                self._cleared = False
+                target = self._queued
+                closing = self._closing
+            lines = []
+            for item in batch:
+                try:
+                    lines.append(self._encode(*item))
+                except (TypeError, ValueError) as e:
+                    # 重试也无法序列化，丢弃这一条
+                    logging.error(f"无法序列化日志记录 {item[1]!r}: {e}")
+            error = None
+            if lines:
+                try:
+                    self._file.write("".join(lines))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except (OSError, ValueError) as e:
+                    error = e if isinstance(e, OSError) else OSError(str(e))
+                    logging.error(f"写入闹钟日志失败: {e}")
+                    self._reopen()
+            with self._cond:
+                if error is not None:
+                    # 只有写入成功才推进 _durable：这一批放回脏记录表等待重试
+                    self._requeue(batch)
+                    self._error = error
+                    self._failures += 1
+                    self._flushing = False
+                    self._cond.notify_all()
+                    if closing:
+                        logging.error(f"关闭时仍有 {self._queued - self._durable} 条变更未能写入日志")
+                        break
+                    self._cond.wait_for(lambda: self._closing or self._flushing, RETRY_SECONDS)
+                    continue
+                self._durable = target
+                if self._durable >= self._queued:
+                    self._flushing = False
+                self._cond.notify_all()
+            if batch and self._file.tell() >= self.compact_bytes:
+                self._rotate()
+            if closing:
+                with self._cond:
+                    if self._queued <= self._durable:
+                        break
+        try:
+            self._file.close()
+        except OSError as e:
+            logging.error(f"关闭闹钟日志失败: {e}")
+        self._file = None
+
+    def _requeue(self, batch):
+        """把写入失败的一批放回脏记录表（持锁调用），之后的修改和清空优先"""
+        if self._cleared:
+            return  # 之后又清空了，这一批不必再写
+        for op, record_id, record in batch:
+            if op == 'clear':
+                self._cleared = True
+            else:
+                self._dirty.setdefault(record_id, (op, record))
+
+    def _reopen(self):
+        """写入失败后重新打开日志，截掉可能写了一半的最后一行"""
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            _truncate_partial_line(self.journal_path)
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+        except OSError as e:
+            logging.error(f"重新打开闹钟日志失败: {e}")
+
+    # ---- 压缩 ----
+
+    def _rotate(self):
+        """把当前日志改名为 .journal.1 并在后台合并进快照（在写入线程中调用）"""
+        if self._compactor and self._compactor.is_alive():
+            return  # 上一次压缩尚未完成，继续写当前日志
+        if os.path.exists(self.rotated_path):
+            # 上次压缩没有完成（如进程退出），先同步合并
+            self._compact_rotated()
+        self._file.close()
+        os.replace(self.journal_path, self.rotated_path)
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        self._compactor = threading.Thread(target=self._compact_rotated, name="AlarmJournalCompactor", daemon=True)
+        self._compactor.start()
+
+    def _compact_rotated(self):
+        """把 .journal.1 合并进快照：写临时文件、fsync、原子替换，然后删除旧日志"""
+        try:
+            state = self._replay(self.rotated_path)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({self.key: list(state.values())}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_directory(os.path.dirname(self.path))
+            os.remove(self.rotated_path)
+            logging.info(f"闹钟日志已压缩: {len(state)} 条记录")
+        except OSError as e:
+            logging.error(f"压缩闹钟日志失败: {e}")
+
+    def close(self):
+        """写完所有记录，合并日志到快照并停止后台线程"""
+        if self._engine is not None:
+            self._engine.remove_mutation_listener(self.record)
+            self._engine = None
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            writer = self._writer
+        if writer:
+            writer.join()
+        if self._compactor:
+            self._compactor.join()
+        # 退出时把剩余日志也合并进快照，下次启动无需重放
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.rotated_path):
+                self._compact_rotated()
+            os.replace(self.journal_path, self.rotated_path)
+            self._compact_rotated()
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
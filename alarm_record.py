@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+紧凑的闹钟记录 - 用 __slots__ 代替每个闹钟一个字典
+
+引擎中的每个闹钟原来是一个字典，10 万个闹钟时每个闹钟要占七百多字节，
+其中大部分是字典本身的哈希表。AlarmRecord 把常用字段放在 __slots__ 中：
+    - 时间字段直接保存 datetime，读取时不用重新构造（比保存纪元微秒整数
+      每个闹钟多十几字节，但按时间扫描和排序不再每次创建 datetime）
+    - 铃声名称经过 sys.intern()，相同的铃声只保存一份字符串
+    - 不常用的其他字段才放进额外的字典
+
+AlarmRecord 实现了 MutableMapping，alarm['time']、alarm.get()、
+alarm.update()、dict(alarm) 等写法与原来的字典相同，界面和持久化代码
+无需修改；与字典比较时按内容比较。逐个闹钟扫描的热点代码可以直接读取
+属性（alarm.time），省去 __getitem__ 的方法调用。
+"""
+import sys
+from collections.abc import MutableMapping
+
+# 保存在 __slots__ 中的字段（按此顺序遍历）
+SLOT_FIELDS = ('id', 'time', 'label', 'snooze', 'enabled', 'created_at', 'recurrence', 'occurrences',
+               'snoozed', 'snooze_count', 'resume_time', 'ringtone', 'ringtone_path', 'local_music_path',
+               'volume')
+_SLOT_SET = frozenset(SLOT_FIELDS)
+_MISSING = object()
+_intern = sys.intern
+
+
+class AlarmRecord(MutableMapping):
+    """一个闹钟（可以当作字典使用）
+
+    Args:
+        data: 初始字段（字典或其他映射）
+        **fields: 初始字段
+    """
+
+    __slots__ = SLOT_FIELDS + ('_extra',)
+
+    def __init__(self, data=(), **fields):
+        self._extra = None
+        self.update(data, **fields)
+
+    def __getitem__(self, key):
+        if key in _SLOT_SET:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _SLOT_SET:
+            if key == 'ringtone' and type(value) is str:
+                value = _intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _SLOT_SET:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            delattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _SLOT_SET:
+            return getattr(self, key, _MISSING) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in SLOT_FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        count = sum(1 for key in SLOT_FIELDS if getattr(self, key, _MISSING) is not _MISSING)
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self):
+        return f"AlarmRecord({dict(self)!r})"
+
+    def get(self, key, default=None):
+        # 比 MutableMapping.get 少一次异常处理，引擎和界面频繁调用
+        if key in _SLOT_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def update(self, other=(), **fields):
+        # 比 MutableMapping.update 少了 ABC 类型检查，创建记录时会调用
+        if isinstance(other, dict) or type(other) is AlarmRecord:
+            other = other.items()
+        elif hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        for items in (other, fields.items()):
+            for key, value in items:
+                # 与 __setitem__ 相同，内联以减少创建记录时的方法调用
+                if key in _SLOT_SET:
+                    if key == 'ringtone' and type(value) is str:
+                        value = _intern(value)
+                    setattr(self, key, value)
+                else:
+                    if self._extra is None:
+                        self._extra = {}
+                    self._extra[key] = value
+
+    def copy(self):
+        """返回内容相同的新记录"""
+        return AlarmRecord(self)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+连接已运行的守护进程的闹钟引擎 - 图形界面作为控制接口的客户端运行
+
+守护进程持有单实例锁时，再启动的图形界面不自己检查闹钟，而是用
+RemoteAlarmEngine 代替 AlarmEngine：查询从本地的闹钟副本读取，增删改
+和贪睡通过控制接口（alarm_ipc.py）交给守护进程执行。
+
+另开一个连接发送 subscribe 后，守护进程把该连接当作已连接（attach）的
+界面：到期的闹钟推送给界面而不是自己响铃，闹钟变化时推送 changed（本地
+据此刷新副本），再次启动的程序交来的参数推送 activate。界面关闭或进程
+退出时连接断开，守护进程随即断开（detach）该界面，之后到期的闹钟重新
+由守护进程自己响铃。
+"""
+import datetime
+import logging
+import math
+import threading
+
+from alarm_engine import DEFAULT_SNOOZE_MINUTES
+from alarm_ipc import DEFAULT_SOCKET_PATH, AlarmIPCClient, IPCError
+from alarm_store import alarm_from_json
+
+
+def _to_request(fields):
+    """把闹钟字段转换为控制接口请求中的参数"""
+    params = dict(fields)
+    for key, value in fields.items():
+        if isinstance(value, datetime.datetime):
+            params[key] = value.isoformat()
+    if 'recurrence' in params:
+        recurrence = params.pop('recurrence')
+        params['repeat'] = recurrence.to_dict() if recurrence is not None else None
+    return params
+
+
+class RemoteAlarmEngine:
+    """通过控制接口使用守护进程中的闹钟引擎（界面用到的 AlarmEngine 接口）
+
+    Args:
+        socket_path: 守护进程控制接口的套接字路径
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.lock = threading.RLock()  # 保护本地副本和请求连接
+        self._client = AlarmIPCClient(socket_path)
+        self._alarms = {}  # ID -> 闹钟（守护进程中闹钟的副本）
+        self._listeners = []
+        self._change_listeners = []
+        self._activate_listeners = []
+        self._subscription = None
+        self._thread = None
+        self._refresh()
+
+    # ---- 监听器 ----
+
+    def add_listener(self, callback):
+        """注册到期回调 callback(alarms)（在事件线程中调用）"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_change_listener(self, callback):
+        """注册变化回调 callback()（在事件线程中调用）"""
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def add_activate_listener(self, callback):
+        """注册激活回调 callback(argv)：再次启动的程序交给守护进程的参数"""
+        self._activate_listeners.append(callback)
+
+    def remove_activate_listener(self, callback):
+        if callback in self._activate_listeners:
+            self._activate_listeners.remove(callback)
+
+    # ---- 连接 ----
+
+    def start(self):
+        """订阅守护进程的事件，之后到期的闹钟由本界面处理"""
+        if self._thread and self._thread.is_alive():
+            return
+        subscription = AlarmIPCClient(self.socket_path, timeout=None)
+        try:
+            response = subscription.pipeline([{'op': 'subscribe'}])[0]
+        except OSError:
+            subscription.close()
+            raise
+        if not response['ok']:
+            subscription.close()
+            raise IPCError(response['error'])
+        self._subscription = subscription
+        # 订阅之前发生的变化不会推送，重新读取一次
+        self._refresh()
+        self._thread = threading.Thread(target=self._read_events, args=(subscription,),
+                                         name="AlarmRemoteEvents", daemon=True)
+        self._thread.start()
+        logging.info(f"已连接到闹钟守护进程 (PID {response['result']['pid']})")
+
+    def stop(self, timeout=1.0):
+        """断开连接，之后到期的闹钟由守护进程自己响铃"""
+        subscription, self._subscription = self._subscription, None
+        if subscription:
+            subscription.shutdown()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if subscription:
+            subscription.close()
+        with self.lock:
+            self._client.close()
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def _read_events(self, subscription):
+        """事件线程：依次处理守护进程推送的事件，直到连接断开"""
+        for event in subscription.events():
+            try:
+                kind = event.get('event')
+                if kind == 'fired':
+                    self._refresh()
+                    alarms = [alarm_from_json(alarm) for alarm in event['alarms']]
+                    self._notify(self._listeners, alarms)
+                elif kind == 'changed':
+                    self._refresh()
+                    self._notify(self._change_listeners)
+                elif kind == 'activate':
+                    self._notify(self._activate_listeners, event.get('argv', []))
+            except (OSError, IPCError, KeyError, ValueError) as e:
+                logging.error(f"处理守护进程事件失败: {e}")
+        if self._subscription is subscription:
+            logging.warning("与闹钟守护进程的连接已断开")
+
+    @staticmethod
+    def _notify(listeners, *args):
+        for callback in list(listeners):
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"远程引擎回调出错: {e}")
+
+    def _call(self, op, **params):
+        with self.lock:
+            return self._client.call(op, **params)
+
+    def _refresh(self):
+        """重新读取守护进程中的全部闹钟"""
+        with self.lock:
+            alarms = [alarm_from_json(alarm) for alarm in self._client.call('list')]
+            self._alarms = {alarm['id']: alarm for alarm in alarms}
+
+    def _store(self, data):
+        alarm = alarm_from_json(data)
+        with self.lock:
+            self._alarms[alarm['id']] = alarm
+        return alarm
+
+    # ---- 查询（读取本地副本）----
+
+    def alarms(self):
+        """返回所有闹钟（按ID顺序）的列表副本"""
+        with self.lock:
+            return [dict(alarm) for alarm in sorted(self._alarms.values(), key=lambda alarm: alarm['id'])]
+
+    def get_alarm(self, alarm_id):
+        with self.lock:
+            alarm = self._alarms.get(alarm_id)
+            return dict(alarm) if alarm else None
+
+    def next_alarm(self):
+        with self.lock:
+            alarm = min(self._alarms.values(), key=lambda alarm: alarm['time'], default=None)
+            return dict(alarm) if alarm else None
+
+    def next_fire_time(self):
+        alarm = self.next_alarm()
+        return alarm['time'] if alarm else None
+
+    def next_deadline(self):
+        """返回下一个闹钟 (触发时间戳（整秒，向上取整）, 标签)，没有闹钟时返回 None"""
+        alarm = self.next_alarm()
+        return (math.ceil(alarm['time'].timestamp()), alarm['label']) if alarm else None
+
+    def __len__(self):
+        with self.lock:
+            return len(self._alarms)
+
+    # ---- 修改（交给守护进程）----
+
+    def add_alarm(self, fire_time, label="", snooze=DEFAULT_SNOOZE_MINUTES, recurrence=None, **fields):
+        params = _to_request(dict(fields, time=fire_time, label=label, snooze=snooze, recurrence=recurrence))
+        return self._store(self._call('add', **params))
+
+    def update_alarm(self, alarm_id, **fields):
+        try:
+            return self._store(self._call('edit', id=alarm_id, **_to_request(fields)))
+        except IPCError as e:
+            logging.warning(f"修改闹钟失败: {e}")
+            return None
+
+    def remove_alarm(self, alarm_id):
+        with self.lock:
+            alarm = self._alarms.pop(alarm_id, None)
+            try:
+                self._client.call('delete', id=alarm_id)
+            except IPCError:
+                return None
+            return alarm
+
+    def remove_alarms(self, alarm_ids):
+        with self.lock:
+            removed = [self._alarms.pop(alarm_id) for alarm_id in alarm_ids if alarm_id in self._alarms]
+            self._client.call('delete', ids=list(alarm_ids))
+            return removed
+
+    def clear(self):
+        with self.lock:
+            self._alarms = {}
+            return self._client.call('clear')['deleted']
+
+    def snooze(self, alarm, minutes=None, now=None):
+        """贪睡：由守护进程以同一个ID改期（now 参数被忽略，使用守护进程的当前时间）"""
+        return self._store(self._call('snooze', id=alarm['id'], minutes=minutes))
+
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+闹钟调度器 - 基于最小堆的触发时间索引
+
+按触发时间维护一个优先队列，插入和弹出均为 O(log n)。
+取消或改期采用惰性删除：旧的堆条目保留在堆中，
+在弹出时通过序号校验识别为失效条目并丢弃。
+
+检查线程通过 DeadlineWaiter 精确睡眠到最早的截止时间，
+闹钟集合发生变化时被唤醒重新计算，而不是每秒轮询。
+"""
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+
+# 空闲时单次等待的上限（秒），用于应对系统时间调整或休眠唤醒
+MAX_IDLE_WAIT = 60.0
+
+
+def seconds_until(deadline, now=None):
+    """计算距离截止时间的秒数（不小于0）
+
+    Args:
+        deadline: datetime 对象或 time.time() 风格的时间戳
+        now: 当前时间，默认取系统当前时间
+    """
+    if isinstance(deadline, datetime.datetime):
+        now = now or datetime.datetime.now()
+        return max(0.0, (deadline - now).total_seconds())
+    if now is None:
+        now = datetime.datetime.now().timestamp()
+    return max(0.0, deadline - now)
+
+
+class DeadlineWaiter:
+    """截止时间等待器
+
+    wait_until() 睡眠到指定截止时间，或在 notify() 被调用时提前返回。
+    notify() 的通知会保留到下一次等待，因此在计算截止时间与开始等待
+    之间发生的变更不会丢失。不在线程中等待的使用者（如 asyncio 事件循环）
+    可以用 add_callback() 注册通知回调。
+    """
+
+    def __init__(self, max_wait=MAX_IDLE_WAIT):
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._notified = False
+        self._callbacks = []
+
+    def add_callback(self, callback):
+        """注册 notify() 时调用的回调（在调用 notify() 的线程中执行）"""
+        with self._cond:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """注销通知回调"""
+        with self._cond:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def notify(self):
+        """唤醒正在等待的线程（例如闹钟被添加、编辑或删除）"""
+        with self._cond:
+            self._notified = True
+            self._cond.notify_all()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"等待器通知回调出错: {e}")
+
+    def wait_until(self, deadline):
+        """等待到截止时间或被唤醒
+
+        Args:
+            deadline: 截止时间（datetime 或时间戳），None 表示只等待唤醒
+
+        Returns:
+            被 notify() 唤醒时返回 True，超时返回 False
+        """
+        with self._cond:
+            if not self._notified:
+                timeout = self.max_wait
+                if deadline is not None:
+                    timeout = min(timeout, seconds_until(deadline))
+                if timeout > 0:
+                    self._cond.wait(timeout)
+            notified = self._notified
+            self._notified = False
+            return notified
+
+
+class AlarmScheduler:
+    """按触发时间排序的闹钟调度器（线程安全）"""
+
+    # 失效条目超过有效条目的倍数时重建堆
+    COMPACT_RATIO = 2
+
+    def __init__(self):
+        self._heap = []  # (触发时间, 序号, 闹钟ID)
+        self._entries = {}  # 闹钟ID -> (触发时间, 序号, 闹钟对象)
+        self._counter = itertools.count()
+        self._lock = threading.RLock()
+        self.waiter = DeadlineWaiter()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, alarm_id):
+        with self._lock:
+            return alarm_id in self._entries
+
+    def schedule(self, alarm_id, fire_time, alarm=None):
+        """加入或改期一个闹钟
+
+        Args:
+            alarm_id: 闹钟ID
+            fire_time: 触发时间（可比较的对象，如 datetime 或时间戳）
+            alarm: 与该ID关联的闹钟对象，弹出时一并返回
+        """
+        with self._lock:
+            seq = next(self._counter)
+            self._entries[alarm_id] = (fire_time, seq, alarm)
+            heapq.heappush(self._heap, (fire_time, seq, alarm_id))
+            self._maybe_compact()
+        self.waiter.notify()
+
+    def schedule_many(self, items):
+        """批量加入或改期闹钟，只整理一次堆、唤醒一次
+
+        Args:
+            items: (闹钟ID, 触发时间, 闹钟对象) 的可迭代对象
+        """
+        with self._lock:
+            entries = []
+            for alarm_id, fire_time, alarm in items:
+                seq = next(self._counter)
+                self._entries[alarm_id] = (fire_time, seq, alarm)
+                entries.append((fire_time, seq, alarm_id))
+            if len(entries) > len(self._heap):
+                # 批量较大时整体建堆（O(n)）比逐个 heappush（O(k log n)）更快
+                self._heap.extend(entries)
+                heapq.heapify(self._heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(self._heap, entry)
+            self._maybe_compact()
+        if entries:
+            self.waiter.notify()
+        return len(entries)
+
+    def cancel(self, alarm_id):
+        """取消一个闹钟（惰性删除），返回是否存在该闹钟"""
+        with self._lock:
+            if self._entries.pop(alarm_id, None) is None:
+                return False
+            self._maybe_compact()
+        self.waiter.notify()
+        return True
+
+    def cancel_many(self, alarm_ids):
+        """批量取消闹钟，只压缩和唤醒一次，返回实际取消的数量"""
+        with self._lock:
+            count = 0
+            for alarm_id in alarm_ids:
+                if self._entries.pop(alarm_id, None) is not None:
+                    count += 1
+            self._maybe_compact()
+        if count:
+            self.waiter.notify()
+        return count
+
+    def clear(self):
+        """清空所有闹钟"""
+        with self._lock:
+            self._heap.clear()
+            self._entries.clear()
+        self.waiter.notify()
+
+    def wake(self):
+        """唤醒等待中的检查线程（例如需要退出时）"""
+        self.waiter.notify()
+
+    def wait_for_next(self):
+        """睡眠到最早的触发时间，闹钟集合变化时提前返回"""
+        return self.waiter.wait_until(self.next_fire_time())
+
+    def get(self, alarm_id):
+        """返回闹钟ID关联的闹钟对象，不存在时返回 None"""
+        with self._lock:
+            entry = self._entries.get(alarm_id)
+            return entry[2] if entry else None
+
+    def peek(self):
+        """返回最早的 (触发时间, 闹钟ID, 闹钟对象)，没有闹钟时返回 None"""
+        with self._lock:
+            self._discard_stale()
+            if not self._heap:
+                return None
+            fire_time, _, alarm_id = self._heap[0]
+            return fire_time, alarm_id, self._entries[alarm_id][2]
+
+    def next_fire_time(self):
+        """返回最早的触发时间，没有闹钟时返回 None"""
+        head = self.peek()
+        return head[0] if head else None
+
+    def pop_due(self, now):
+        """弹出所有触发时间不晚于 now 的闹钟
+
+        Returns:
+            按触发时间排序的 (闹钟ID, 闹钟对象) 列表
+        """
+        due = []
+        with self._lock:
+            while self._heap:
+                fire_time, seq, alarm_id = self._heap[0]
+                entry = self._entries.get(alarm_id)
+                if entry is None or entry[1] != seq:
+                    heapq.heappop(self._heap)
+                    continue
+                if fire_time > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._entries[alarm_id]
+                due.append((alarm_id, entry[2]))
+        return due
+
+    def _discard_stale(self):
+        """丢弃堆顶的失效条目"""
+        while self._heap:
+            _, seq, alarm_id = self._heap[0]
+            entry = self._entries.get(alarm_id)
+            if entry is not None and entry[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _maybe_compact(self):
+        """失效条目过多时重建堆，避免内存随改期次数增长"""
+        live = len(self._entries)
+        if len(self._heap) <= self.COMPACT_RATIO * live + 64:
+            return
+        self._heap = [(fire_time, seq, alarm_id)
+                      for alarm_id, (fire_time, seq, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+        logging.debug(f"调度器堆已重建，当前 {live} 个闹钟")
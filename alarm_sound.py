@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+无界面的铃声后端
+
+Windows 上使用 winsound 蜂鸣，其他平台退化为终端响铃字符，
+因此命令行和守护进程不再强制依赖 winsound。
+"""
+import sys
+import time
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+# 铃声名称 -> (频率Hz, 持续时间ms)，与图形界面的铃声类型一致
+RINGTONE_TYPES = {
+    "默认铃声": (1000, 800),
+    "蜂鸣提醒": (1500, 400),
+    "系统提示音": (800, 600),
+    "轻柔铃声": (600, 1000),
+}
+DEFAULT_TONE = RINGTONE_TYPES["默认铃声"]
+
+
+def beep(frequency, duration_ms):
+    """播放一次蜂鸣（阻塞 duration_ms 毫秒）"""
+    if winsound is not None:
+        winsound.Beep(frequency, duration_ms)
+        return
+    sys.stdout.write("\a")
+    sys.stdout.flush()
+    time.sleep(duration_ms / 1000)
+
+
+def ring(ringtone="默认铃声", times=3, pause=0.2, token=None):
+    """按铃声类型蜂鸣若干次
+
+    Args:
+        ringtone: 铃声名称，未知的名称（如本地音乐）使用默认铃声
+        times: 蜂鸣次数
+        pause: 两次蜂鸣之间的间隔（秒）
+        token: 可选的取消令牌（alarm_workers.CancelToken），被取消时提前结束
+    """
+    frequency, duration = RINGTONE_TYPES.get(ringtone, DEFAULT_TONE)
+    for _ in range(times):
+        if token is not None and token.cancelled:
+            return
+        beep(frequency, duration)
+        if token is not None:
+            token.wait(pause)
+        else:
+            time.sleep(pause)
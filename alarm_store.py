@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+闹钟持久化 - 把闹钟引擎中的闹钟保存为 JSON 文件
+
+闹钟字典中的 datetime 和重复规则在保存时转换为字符串/字典，
+其他字段（铃声、音量等）原样保存。写入先写临时文件再替换，
+进程在写入途中退出也不会留下半个文件。
+"""
+import datetime
+import json
+import logging
+import os
+
+from recurrence import RecurrenceRule
+
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".alarm_clock")
+DEFAULT_STORE_PATH = os.path.join(DATA_DIR, "alarms.json")
+
+_DATETIME_FIELDS = ('time', 'created_at', 'resume_time')
+
+
+def alarm_to_json(alarm):
+    """把闹钟字典转换为可 JSON 序列化的字典"""
+    data = dict(alarm)
+    for field in _DATETIME_FIELDS:
+        if isinstance(data.get(field), datetime.datetime):
+            data[field] = data[field].isoformat()
+    if data.get('recurrence') is not None:
+        data['recurrence'] = data['recurrence'].to_dict()
+    return data
+
+
+def alarm_from_json(data):
+    """alarm_to_json() 的逆操作"""
+    alarm = dict(data)
+    for field in _DATETIME_FIELDS:
+        if alarm.get(field):
+            alarm[field] = datetime.datetime.fromisoformat(alarm[field])
+    if alarm.get('recurrence'):
+        alarm['recurrence'] = RecurrenceRule.from_dict(alarm['recurrence'])
+    return alarm
+
+
+class AlarmStore:
+    """JSON 文件闹钟存储
+
+    Args:
+        path: 文件路径，默认保存在用户目录下的 .alarm_clock/alarms.json
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+
+    def load(self):
+        """读取所有闹钟，文件不存在或损坏时返回空列表"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logging.error(f"读取闹钟文件失败: {self.path}: {e}")
+            return []
+        alarms = []
+        for item in data.get('alarms', []):
+            try:
+                alarms.append(alarm_from_json(item))
+            except (KeyError, TypeError, ValueError) as e:
+                logging.error(f"跳过无法解析的闹钟 {item!r}: {e}")
+        return alarms
+
+    def save(self, alarms):
+        """保存所有闹钟（整体替换文件）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'alarms': [alarm_to_json(alarm) for alarm in alarms]}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
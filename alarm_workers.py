@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+固定大小的工作线程池 - 用于铃声播放、铃声预览和闹钟触发后的回调
+
+启动一项任务只是一次队列写入，不会新建线程。每个任务带有一个取消令牌，
+任务在循环或等待时检查令牌即可被及时停止；shutdown() 会取消所有未完成的
+任务并等待工作线程退出。
+"""
+import logging
+import queue
+import threading
+
+DEFAULT_POOL_SIZE = 3
+
+
+class CancelToken:
+    """任务的取消令牌"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消任务"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        """代替 time.sleep() 的可中断等待，返回期间是否被取消"""
+        return self._event.wait(timeout)
+
+
+class WorkerPool:
+    """固定大小的工作线程池（线程安全）
+
+    任务以 func(token, *args, **kwargs) 的形式调用，第一个参数是取消令牌。
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, name="AlarmWorker"):
+        if size < 1:
+            raise ValueError("线程池大小必须大于0")
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}  # 已提交但尚未完成的任务令牌 -> 任务数
+        self._closed = False
+        self._threads = []
+        for index in range(size):
+            thread = threading.Thread(target=self._worker, name=f"{name}-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def size(self):
+        return len(self._threads)
+
+    def pending(self):
+        """未完成（排队中或运行中）的任务数量"""
+        with self._lock:
+            return sum(self._pending.values())
+
+    def submit(self, func, *args, token=None, **kwargs):
+        """提交任务并返回其取消令牌
+
+        Args:
+            func: 任务函数，以 func(token, *args, **kwargs) 调用
+            token: 使用已有的取消令牌（可让多个任务一起取消），默认新建
+        Raises:
+            RuntimeError: 线程池已关闭
+        """
+        token = token or CancelToken()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("线程池已关闭")
+            self._pending[token] = self._pending.get(token, 0) + 1
+        self._queue.put((token, func, args, kwargs))
+        return token
+
+    def cancel_all(self):
+        """取消所有未完成的任务"""
+        with self._lock:
+            tokens = list(self._pending)
+        for token in tokens:
+            token.cancel()
+
+    def shutdown(self, cancel_pending=True, timeout=1.0):
+        """关闭线程池
+
+        Args:
+            cancel_pending: 是否取消未完成的任务，否则等待排队的任务执行完
+            timeout: 每个工作线程的最长等待时间（秒）
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if cancel_pending:
+            self.cancel_all()
+        for _ in self._threads:
+            self._queue.put(None)
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current:
+                thread.join(timeout=timeout)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            token, func, args, kwargs = item
+            try:
+                if not token.cancelled:
+                    func(token, *args, **kwargs)
+            except Exception as e:
+                logging.error(f"工作线程任务 {getattr(func, '__name__', func)} 出错: {e}")
+            finally:
+                with self._lock:
+                    if self._pending[token] > 1:
+                        self._pending[token] -= 1
+                    else:
+                        del self._pending[token]
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+alarmctl - 非交互式闹钟命令行客户端
+
+守护进程在运行时通过控制接口（alarm_ipc.py）操作其中的闹钟；没有守护进程
+时直接读写保存的闹钟文件，下次启动守护进程时生效。脚本可以用它批量管理
+大量闹钟，而不需要为每个闹钟常驻一个 Python 进程。
+
+用法:
+    python alarmctl.py add 07:30 -l 起床 -r 工作日
+    python alarmctl.py list [--json]
+    python alarmctl.py rm 3 4 5
+    python alarmctl.py snooze 3 -m 10
+    python alarmctl.py next
+    python alarmctl.py import alarms.csv      # 或 JSON 文件，"-" 表示标准输入
+    python alarm_clock.py list                # 同上，由 alarm_clock.py 转发
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+
+from alarm_engine import AlarmEngine
+from alarm_ipc import DEFAULT_SOCKET_PATH, AlarmController, AlarmIPCClient, IPCError
+from alarm_journal import AlarmJournal
+from alarm_store import DEFAULT_STORE_PATH, alarm_from_json
+
+COMMANDS = ('add', 'list', 'rm', 'snooze', 'next', 'import')
+
+class DaemonBackend:
+    """通过控制接口操作运行中的守护进程"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def call(self, op, **params):
+        return self.client.call(op, **params)
+
+    def close(self):
+        self.client.close()
+
+
+class StoreBackend:
+    """没有守护进程时直接操作闹钟文件（通过与守护进程相同的日志）"""
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.engine = AlarmEngine()
+        journal.restore(self.engine)
+        self.controller = AlarmController(self.engine)
+
+    def call(self, op, **params):
+        try:
+            return self.controller.execute(dict(params, op=op))
+        except (KeyError, TypeError, ValueError, LookupError) as e:
+            raise IPCError(f"{type(e).__name__}: {e}") from e
+
+    def close(self):
+        self.controller.close()
+        self.journal.close()
+
+
+def connect(socket_path=DEFAULT_SOCKET_PATH, store_path=DEFAULT_STORE_PATH, offline=False):
+    """连接守护进程，守护进程未运行（或 offline=True）时退回到闹钟文件"""
+    if not offline:
+        try:
+            return DaemonBackend(AlarmIPCClient(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+    return StoreBackend(AlarmJournal(store_path))
+
+
+def read_import_file(path, fmt="auto"):
+    """读取要导入的闹钟描述列表
+
+    JSON 可以是闹钟列表或闹钟文件格式 {"alarms": [...]}；CSV 需要表头，
+    至少包含 time 列，可选 label、repeat、snooze 列。
+    """
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path, encoding='utf-8-sig') as f:
+            text = f.read()
+    if fmt == "auto":
+        fmt = "json" if text.lstrip()[:1] in ('[', '{') else "csv"
+    if fmt == "json":
+        data = json.loads(text)
+        return data['alarms'] if isinstance(data, dict) else data
+    alarms = []
+    for row in csv.DictReader(io.StringIO(text)):
+        alarm = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        if 'snooze' in alarm:
+            alarm['snooze'] = int(alarm['snooze'])
+        alarms.append(alarm)
+    return alarms
+
+
+def format_alarm(data):
+    """把控制接口返回的闹钟格式化为一行文本"""
+    alarm = alarm_from_json(data)
+    repeat = alarm['recurrence'].describe() if alarm.get('recurrence') else "不重复"
+    state = "" if alarm.get('enabled', True) else "  (已停用)"
+    return f"#{alarm['id']:<6} {alarm['time'].strftime('%Y-%m-%d %H:%M')}  {repeat:<8} {alarm['label'] or '无标签'}{state}"
+
+
+def build_parser():
+    # 公共选项既可以写在子命令前，也可以写在子命令后
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="守护进程控制接口的套接字路径")
+    common.add_argument("--store", default=DEFAULT_STORE_PATH, help="守护进程未运行时使用的闹钟文件")
+    common.add_argument("--offline", action="store_true", help="不连接守护进程，直接修改闹钟文件")
+    after = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    after.add_argument("--socket")
+    after.add_argument("--store")
+    after.add_argument("--offline", action="store_true")
+
+    parser = argparse.ArgumentParser(prog="alarmctl", description="非交互式闹钟命令行客户端", parents=[common])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_parser(name, **kwargs):
+        return commands.add_parser(name, parents=[after], **kwargs)
+
+    add = add_parser("add", help="添加闹钟")
+    add.add_argument("time", help="HH:MM（下一次到达该时刻）或 ISO 时间，如 2024-05-01T07:30")
+    add.add_argument("-l", "--label", default="", help="闹钟标签")
+    add.add_argument("-r", "--repeat", help="重复方式：每天、工作日、周末、每小时")
+    add.add_argument("-s", "--snooze", type=int, help="贪睡分钟数")
+
+    listing = add_parser("list", help="列出所有闹钟")
+    listing.add_argument("--json", action="store_true", help="输出 JSON")
+
+    rm = add_parser("rm", help="删除闹钟")
+    rm.add_argument("ids", type=int, nargs="+", help="闹钟ID")
+
+    snooze = add_parser("snooze", help="贪睡刚响过的闹钟，或推迟未到期的闹钟")
+    snooze.add_argument("id", type=int, help="闹钟ID")
+    snooze.add_argument("-m", "--minutes", type=int, help="贪睡分钟数，默认使用闹钟自己的设置")
+
+    add_parser("next", help="显示下一个闹钟")
+
+    imp = add_parser("import", help="从 JSON 或 CSV 文件批量导入闹钟")
+    imp.add_argument("file", help="文件路径，- 表示标准输入")
+    imp.add_argument("--format", choices=("auto", "json", "csv"), default="auto", help="文件格式")
+    return parser
+
+
+def run(backend, args):
+    """执行子命令，返回退出码"""
+    if args.command == "add":
+        params = {'time': args.time, 'label': args.label}
+        if args.repeat:
+            params['repeat'] = args.repeat
+        if args.snooze:
+            params['snooze'] = args.snooze
+        print(f"已添加 {format_alarm(backend.call('add', **params))}")
+    elif args.command == "list":
+        alarms = backend.call('list')
+        if args.json:
+            print(json.dumps(alarms, ensure_ascii=False, indent=2))
+        elif not alarms:
+            print("没有闹钟")
+        else:
+            for alarm in sorted(alarms, key=lambda item: item['time']):
+                print(format_alarm(alarm))
+    elif args.command == "rm":
+        deleted = backend.call('delete', ids=args.ids)['deleted']
+        print(f"已删除 {deleted} 个闹钟")
+        if deleted < len(args.ids):
+            return 1
+    elif args.command == "snooze":
+        print(f"已贪睡 {format_alarm(backend.call('snooze', id=args.id, minutes=args.minutes))}")
+    elif args.command == "next":
+        alarm = backend.call('next')
+        print(format_alarm(alarm) if alarm else "没有闹钟")
+    elif args.command == "import":
+        alarms = read_import_file(args.file, args.format)
+        ids = backend.call('add', alarms=alarms)['ids']
+        print(f"已导入 {len(ids)} 个闹钟")
+    return 0
+
+
+def main(argv=None):
+    """alarmctl 入口，返回退出码"""
+    args = build_parser().parse_args(argv)
+    try:
+        backend = connect(args.socket, args.store, args.offline)
+    except OSError as e:
+        print(f"alarmctl: 无法连接守护进程: {e}", file=sys.stderr)
+        return 1
+    try:
+        return run(backend, args)
+    except IPCError as e:
+        print(f"alarmctl: {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, KeyError) as e:
+        print(f"alarmctl: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
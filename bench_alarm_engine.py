@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+闹钟引擎操作耗时：有大量闹钟时的贪睡和批量删除
+
+用法: python bench_alarm_engine.py [闹钟数量 ...]
+默认测量 1k、50k、200k 个闹钟。test_alarm_engine.py 和 test_registry.py
+只检查操作次数，耗时在这里测量。
+"""
+import sys
+import os
+import time
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_engine import AlarmEngine
+
+DEFAULT_SIZES = (1_000, 50_000, 200_000)
+SNOOZES = 1000  # 每种数量下贪睡的次数
+
+
+def bench(count):
+    base = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+    engine = AlarmEngine()
+    begin = time.perf_counter()
+    engine.add_alarms([{"time": base + datetime.timedelta(seconds=i)} for i in range(1, count + 1)])
+    build_ms = (time.perf_counter() - begin) * 1000
+
+    engine.add_alarm(base)
+    fired = engine.run_pending(base)[0]
+    begin = time.perf_counter()
+    for _ in range(SNOOZES):
+        engine.snooze(fired, 1, now=base)
+    snooze_us = (time.perf_counter() - begin) * 1_000_000 / SNOOZES
+
+    # 删除一半闹钟（与界面中多选删除相同）
+    victims = [alarm["id"] for alarm in engine.alarms()[::2]]
+    begin = time.perf_counter()
+    engine.remove_alarms(victims)
+    delete_ms = (time.perf_counter() - begin) * 1000
+
+    print(f"{count:>10,} | {build_ms:>10.1f} | {snooze_us:>10.2f} | {delete_ms:>10.1f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("闹钟数量   | 批量添加ms | 贪睡us     | 删一半ms")
+    print("-" * 52)
+    for count in sizes:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
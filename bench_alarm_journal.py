@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+闹钟日志写入耗时：修改闹钟时记录变更的开销和写盘（fsync）次数
+
+用法: python bench_alarm_journal.py [变更数量 ...]
+默认测量 1k、10k、50k 次添加。test_alarm_journal.py 只检查 fsync 的次数
+和所在线程，耗时在这里测量。
+"""
+import sys
+import os
+import time
+import datetime
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alarm_journal
+from alarm_engine import AlarmEngine
+from alarm_journal import AlarmJournal
+
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+
+
+def measure_adds(engine, base, count):
+    """逐个添加闹钟，返回耗时毫秒"""
+    begin = time.perf_counter()
+    for i in range(count):
+        engine.add_alarm(base + datetime.timedelta(seconds=i), label=str(i))
+    return (time.perf_counter() - begin) * 1000
+
+
+def bench(count):
+    base = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+    original_fsync = alarm_journal.os.fsync
+    calls = []
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        original_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine()
+        bare_ms = measure_adds(engine, base, count)
+
+        engine = AlarmEngine()
+        journal = AlarmJournal(os.path.join(tmp, "alarms.json"), compact_bytes=1 << 30)
+        journal.attach(engine)
+        alarm_journal.os.fsync = counting_fsync
+        try:
+            journal_ms = measure_adds(engine, base, count)
+            begin = time.perf_counter()
+            journal.flush()
+            flush_ms = (time.perf_counter() - begin) * 1000
+        finally:
+            alarm_journal.os.fsync = original_fsync
+        journal.close()
+
+    print(f"{count:>9,} | {bare_ms:>10.1f} | {journal_ms:>10.1f} | {flush_ms:>9.1f} | {len(calls):>6}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("变更数量  | 无日志ms   | 有日志ms   | 刷盘ms    | fsync")
+    print("-" * 58)
+    for count in sizes:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+闹钟内存占用对比：每个闹钟一个字典 vs AlarmRecord（__slots__）
+
+用法: python bench_alarm_record.py [闹钟数量 ...]
+默认对比 10k、100k 个闹钟，分别按 AlarmClockGUI.set_alarm 和
+VisualAlarmClock._set_alarm 添加的字段生成。
+"""
+import sys
+import os
+import time
+import random
+import datetime
+import tracemalloc
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_record import AlarmRecord
+
+DEFAULT_SIZES = (10_000, 100_000)
+HORIZON_DAYS = 60  # 闹钟分布在未来多少天内
+RINGTONES = ("默认铃声", "闹钟铃声1", "闹钟铃声2", "本地音乐")
+
+
+def gui_fields(i, fire_time, created_at, rng):
+    """AlarmClockGUI.set_alarm 交给引擎的字段"""
+    ringtone = rng.choice(RINGTONES)
+    return {
+        "id": i + 1, "time": fire_time, "label": f"闹钟{i}", "snooze": 5, "enabled": True,
+        "created_at": created_at, "recurrence": None, "occurrences": 0, "snoozed": False,
+        "snooze_count": 0, "resume_time": None,
+        # 界面从下拉框取铃声名称，每个闹钟都是一个新的字符串对象
+        "ringtone": "".join(ringtone),
+        "local_music_path": "/home/user/音乐/起床.mp3" if ringtone == "本地音乐" else None,
+    }
+
+
+def visual_fields(i, fire_time, created_at, rng):
+    """VisualAlarmClock._set_alarm 交给引擎的字段"""
+    fields = gui_fields(i, fire_time, created_at, rng)
+    del fields["local_music_path"]
+    fields["ringtone_path"] = None
+    fields["volume"] = rng.random()
+    return fields
+
+
+def measure(build):
+    """返回 (build() 的结果, 新分配的字节数, 耗时毫秒)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    begin = time.perf_counter()
+    result = build()
+    elapsed = (time.perf_counter() - begin) * 1000
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before, elapsed
+
+
+def bench(count, layout, make_fields):
+    rng = random.Random(count)
+    start = datetime.datetime.now().replace(microsecond=0)
+
+    def specs():
+        # 每个闹钟有自己的 datetime 对象（与界面逐个创建闹钟时相同）
+        for i in range(count):
+            fire_time = start + datetime.timedelta(seconds=rng.randint(60, HORIZON_DAYS * 86400))
+            created_at = datetime.datetime.now()
+            yield make_fields(i, fire_time, created_at, rng)
+
+    dicts, dict_bytes, dict_ms = measure(lambda: list(specs()))
+    records, record_bytes, record_ms = measure(lambda: [AlarmRecord(fields) for fields in specs()])
+
+    begin = time.perf_counter()
+    earliest = min(alarm["time"] for alarm in dicts)
+    dict_scan_ms = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    assert min(alarm["time"] for alarm in records) >= earliest - datetime.timedelta(days=HORIZON_DAYS)
+    record_scan_ms = (time.perf_counter() - begin) * 1000
+
+    print(f"{count:>9,} | {layout:<6} | {dict_bytes / count:>9.0f} | {record_bytes / count:>9.0f} | "
+          f"{dict_bytes / record_bytes:>5.1f}x | {dict_ms:>9.1f} | {record_ms:>9.1f} | "
+          f"{dict_scan_ms:>9.1f} | {record_scan_ms:>9.1f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("闹钟数量  | 界面   | 字典B/个  | 记录B/个  | 节省   | 字典建ms  | 记录建ms  | 字典扫ms  | 记录扫ms")
+    print("-" * 100)
+    for count in sizes:
+        bench(count, "gui", gui_fields)
+        bench(count, "visual", visual_fields)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+日程提醒查询对比：线性扫描 vs 时间轮 vs 列式索引（ColumnStore）
+
+用法: python bench_column_store.py [提醒数量 ...]
+默认对比 10k、100k、1M 个提醒：批量载入、到期检查（advance）、接下来 10 个、
+某一天内的提醒。线性扫描即原来逐个比较日程 reminder_time 的写法。
+"""
+import sys
+import os
+import time
+import random
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from column_store import ColumnStore
+from timing_wheel import TimingWheel
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+HORIZON_DAYS = 365  # 提醒分布在未来多少天内
+CHECKS = 100  # 每种查询重复的次数
+NEXT_COUNT = 10
+
+
+def timed(func, repeat=1):
+    """返回 (最后一次的结果, 平均耗时毫秒)"""
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - begin) * 1000 / repeat
+
+
+def bench(count):
+    rng = random.Random(count)
+    start = int(time.time())
+    deadlines = {key: start + rng.randint(60, HORIZON_DAYS * 86400) for key in range(count)}
+    day = (datetime.datetime.fromtimestamp(start) + datetime.timedelta(days=30)).date()
+    day_start = datetime.datetime.combine(day, datetime.time()).timestamp()
+    day_end = day_start + 86400
+    now = start  # 没有到期的提醒，与大多数检查相同
+
+    def load_wheel():
+        wheel = TimingWheel(start)
+        for key, deadline in deadlines.items():
+            wheel.add(key, deadline, key)
+        return wheel
+
+    def load_store():
+        store = ColumnStore()
+        store.extend((key, deadline, key) for key, deadline in deadlines.items())
+        return store
+
+    wheel, wheel_load = timed(load_wheel)
+    store, store_load = timed(load_store)
+
+    _, scan_due = timed(lambda: [key for key, deadline in deadlines.items() if deadline <= now], CHECKS)
+    _, wheel_due = timed(lambda: wheel.advance(now), CHECKS)
+    _, store_due = timed(lambda: store.advance(now), CHECKS)
+
+    scan_next, scan_next_ms = timed(lambda: sorted(deadlines.values())[:NEXT_COUNT], 3)
+    store_next, store_next_ms = timed(lambda: store.upcoming(NEXT_COUNT), CHECKS)
+    assert [when for when, _, _ in store_next] == scan_next
+
+    scan_day, scan_day_ms = timed(
+        lambda: sorted(key for key, deadline in deadlines.items() if day_start <= deadline < day_end), 3)
+    store_day, store_day_ms = timed(lambda: store.on_day(day), CHECKS)
+    assert sorted(key for _, key, _ in store_day) == scan_day
+
+    print(f"{count:>9,} | {wheel_load:>9.1f} | {store_load:>9.1f} | {scan_due:>9.3f} | {wheel_due:>9.3f} | "
+          f"{store_due:>9.3f} | {scan_next_ms:>9.2f} | {store_next_ms:>9.3f} | {scan_day_ms:>9.2f} | "
+          f"{store_day_ms:>9.3f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("提醒数量  | 轮载入ms  | 列载入ms  | 扫到期ms  | 轮到期ms  | 列到期ms  | 扫前10ms  | 列前10ms  "
+          "| 扫某天ms  | 列某天ms")
+    print("-" * 110)
+    for count in sizes:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
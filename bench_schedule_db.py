@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+SQLite 日程存储查询耗时：最近的提醒和按页读取
+
+用法: python bench_schedule_db.py [日程数量 ...]
+默认测量 10k、100k、1M 个日程。test_schedule_db.py 只检查查询计划使用
+索引，耗时在这里测量。
+"""
+import sys
+import os
+import time
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_db import ScheduleDB
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 100  # 每种查询重复的次数
+WINDOW = 256  # 与 VisualAlarmClock 的 SCHEDULE_WINDOW 相同
+PAGE_SIZE = 100
+
+
+def timed(func, repeat):
+    """返回 func 的平均耗时（毫秒）"""
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def bench(count):
+    base = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+    db = ScheduleDB(":memory:")
+    schedules = []
+    for minutes in range(count):
+        schedule_time = base + datetime.timedelta(minutes=minutes)
+        schedules.append({"time": schedule_time, "title": f"日程{minutes}", "content": "", "reminder": "1分钟前",
+                          "reminder_time": schedule_time - datetime.timedelta(minutes=1)})
+    begin = time.perf_counter()
+    db.add_many(schedules)
+    load_ms = (time.perf_counter() - begin) * 1000
+
+    upcoming_ms = timed(lambda: db.upcoming(WINDOW), QUERIES)
+    first_page_ms = timed(lambda: db.page(0, PAGE_SIZE), QUERIES)
+    middle_page_ms = timed(lambda: db.page(count // 2, PAGE_SIZE), QUERIES)
+    db.close()
+
+    print(f"{count:>10,} | {load_ms:>10.1f} | {upcoming_ms:>10.3f} | {first_page_ms:>10.3f} | {middle_page_ms:>10.3f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("日程数量   | 写入ms     | 最近提醒ms | 首页ms     | 中间页ms")
+    print("-" * 64)
+    for count in sizes:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
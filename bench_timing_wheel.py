@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+日程提醒检查性能对比：线性扫描 vs 分层时间轮
+
+用法: python bench_timing_wheel.py [日程数量 ...]
+默认对比 1k、100k、1M 条日程。
+"""
+import sys
+import os
+import time
+import random
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from timing_wheel import TimingWheel
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+HORIZON_DAYS = 60  # 日程分布在未来多少天内
+
+
+def make_schedules(count, start, rng):
+    """按 VisualAlarmClock._add_schedule 的结构生成日程"""
+    schedules = []
+    for i in range(count):
+        schedule_time = start + datetime.timedelta(seconds=rng.randint(600, HORIZON_DAYS * 86400))
+        schedules.append({
+            "id": i + 1,
+            "time": schedule_time,
+            "title": f"日程{i}",
+            "content": "",
+            "reminder": "5分钟前",
+            "reminder_time": schedule_time - datetime.timedelta(minutes=5),
+        })
+    return schedules
+
+
+def scan_tick(schedules, now):
+    """原 _check_schedules 每秒执行的线性扫描"""
+    for schedule in schedules:
+        if schedule["reminder_time"] and now >= schedule["reminder_time"]:
+            return schedule
+    return None
+
+
+def scan_next(schedules, now):
+    """原 _update_next_schedule 的实现"""
+    upcoming = [s["reminder_time"] for s in schedules if s["reminder_time"] and s["reminder_time"] > now]
+    return min(upcoming) if upcoming else None
+
+
+def timed(func, repeat):
+    """返回 func 的平均耗时（毫秒）"""
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - begin) * 1000 / repeat
+
+
+def bench(count):
+    rng = random.Random(count)
+    start = datetime.datetime.now().replace(microsecond=0)
+    start_ts = start.timestamp()
+    schedules = make_schedules(count, start, rng)
+    repeat = max(3, 100_000 // count)
+
+    scan_tick_ms = timed(lambda: scan_tick(schedules, start), repeat)
+    scan_next_ms = timed(lambda: scan_next(schedules, start), repeat)
+
+    begin = time.perf_counter()
+    wheel = TimingWheel(start_ts)
+    for schedule in schedules:
+        wheel.add(id(schedule), schedule["reminder_time"].timestamp(), schedule)
+    build_ms = (time.perf_counter() - begin) * 1000
+
+    # 连续推进一小时，每秒一次，统计单个刻度的平均耗时
+    ticks = 3600
+    begin = time.perf_counter()
+    fired = 0
+    for second in range(1, ticks + 1):
+        fired += len(wheel.advance(start_ts + second))
+    wheel_tick_ms = (time.perf_counter() - begin) * 1000 / ticks
+    wheel_next_ms = timed(wheel.next_expiry, repeat)
+
+    victims = rng.sample(schedules, min(1000, count))
+    begin = time.perf_counter()
+    for schedule in victims:
+        wheel.cancel(id(schedule))
+    cancel_us = (time.perf_counter() - begin) * 1_000_000 / len(victims)
+
+    print(f"{count:>10,} | {scan_tick_ms:>10.3f} | {wheel_tick_ms:>10.4f} | "
+          f"{scan_next_ms:>10.3f} | {wheel_next_ms:>10.4f} | {build_ms:>10.1f} | "
+          f"{cancel_us:>8.2f} | {fired:>6}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("日程数量   | 扫描/秒ms  | 时间轮/秒ms | 扫描求下次ms | 时间轮下次ms | 建轮ms     | 取消us   | 1h触发")
+    print("-" * 100)
+    for count in sizes:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+列式提醒索引 - 用 NumPy 数组按到期时间查询大量闹钟或日程（需要 numpy）
+
+每一行是一个提醒，各字段分别保存在数组中：
+    _times   datetime64[us] 到期时间（time.time() 风格时间戳的微秒）
+    _flags   uint8 位掩码：FLAG_ALIVE（未删除）、FLAG_ENABLED（启用）
+    _order   已排序部分的行号按到期时间排列的索引数组
+键和随提醒返回的对象保存在与行号对应的列表中。
+
+行写入后不再移动：改期是删除旧行再追加新行，删除只清除 FLAG_ALIVE。
+新追加的行先留在未排序的尾部，查询时与已排序部分（searchsorted）一起
+用向量化的掩码运算处理；尾部超过已排序部分的 1/MERGE_FRACTION 时重新
+排序，已删除的行超过一半时压缩数组，两者的代价都均摊到每次追加上。
+
+add / cancel / clear / advance / next_expiry 与 TimingWheel 相同，可以
+直接替换日程提醒的时间轮；另外提供批量追加、"接下来 N 个"和按时间
+范围（如某一天）查询。
+"""
+import datetime
+import threading
+
+import numpy as np
+
+FLAG_ALIVE = 0x1
+FLAG_ENABLED = 0x2
+_VALID = FLAG_ALIVE | FLAG_ENABLED
+
+MIN_CAPACITY = 1024
+MIN_MERGE = 1024  # 未排序的尾部至少有这么多行才重新排序
+MERGE_FRACTION = 8  # 未排序的尾部超过已排序部分的 1/MERGE_FRACTION 时重新排序
+
+_US = 1_000_000
+
+
+def _to_us(timestamp):
+    return np.datetime64(int(round(timestamp * _US)), 'us')
+
+
+def _to_timestamp(value):
+    return value.astype(np.int64) / _US
+
+
+class ColumnStore:
+    """列式提醒索引（线程安全）
+
+    Args:
+        capacity: 初始容量（行数），不够时自动翻倍
+    """
+
+    def __init__(self, capacity=MIN_CAPACITY):
+        self._lock = threading.RLock()
+        self._reset(max(capacity, MIN_CAPACITY))
+
+    def _reset(self, capacity):
+        self._times = np.empty(capacity, dtype='datetime64[us]')
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._keys = []  # 行号 -> 键
+        self._payloads = []  # 行号 -> 对象
+        self._rows = {}  # 键 -> 行号（只包含未删除的行）
+        self._size = 0  # 已使用的行数（包括已删除的行）
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_times = np.empty(0, dtype='datetime64[us]')
+        self._sorted = 0  # 行号小于该值的行都在 _order 中
+        self._deleted = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._rows
+
+    # ---- 写入 ----
+
+    def _reserve(self, count):
+        needed = self._size + count
+        capacity = len(self._times)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        times = np.empty(capacity, dtype='datetime64[us]')
+        flags = np.zeros(capacity, dtype=np.uint8)
+        times[:self._size] = self._times[:self._size]
+        flags[:self._size] = self._flags[:self._size]
+        self._times, self._flags = times, flags
+
+    def _kill(self, row):
+        self._flags[row] &= ~np.uint8(FLAG_ALIVE)
+        self._payloads[row] = None
+        self._deleted += 1
+
+    def add(self, key, deadline, payload=None, enabled=True):
+        """加入或改期一个提醒
+
+        Args:
+            key: 提醒的唯一键（如日程ID）
+            deadline: 到期时间戳
+            payload: 到期时随键一起返回的对象
+            enabled: 是否启用，未启用的提醒保留在索引中但不会到期
+        """
+        self.extend([(key, deadline, payload)], enabled)
+
+    def extend(self, items, enabled=True):
+        """批量加入或改期提醒 [(键, 到期时间戳, 对象), ...]，返回加入的数量"""
+        items = list(items)
+        if not items:
+            return 0
+        keys, deadlines, payloads = zip(*items)
+        times = (np.asarray(deadlines, dtype=np.float64) * _US).round().astype(np.int64).astype('datetime64[us]')
+        with self._lock:
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is not None:
+                    self._kill(row)
+            self._reserve(len(items))
+            start = self._size
+            end = start + len(items)
+            self._times[start:end] = times
+            self._flags[start:end] = _VALID if enabled else FLAG_ALIVE
+            self._keys.extend(keys)
+            self._payloads.extend(payloads)
+            for row, key in enumerate(keys, start):
+                if key in self._rows:
+                    # 同一批中重复的键只保留最后一个
+                    self._kill(self._rows[key])
+                self._rows[key] = row
+            self._size = end
+            self._maintain()
+        return len(items)
+
+    def set_enabled(self, key, enabled):
+        """启用或停用一个提醒，返回是否存在"""
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return False
+            if enabled:
+                self._flags[row] |= np.uint8(FLAG_ENABLED)
+            else:
+                self._flags[row] &= ~np.uint8(FLAG_ENABLED)
+            return True
+
+    def cancel(self, key):
+        """取消一个提醒，返回是否存在"""
+        return self.cancel_many([key]) == 1
+
+    def cancel_many(self, keys):
+        """批量取消提醒，返回取消的数量"""
+        with self._lock:
+            count = 0
+            for key in keys:
+                row = self._rows.pop(key, None)
+                if row is not None:
+                    self._kill(row)
+                    count += 1
+            if count:
+                self._maintain()
+            return count
+
+    def clear(self):
+        """清空所有提醒"""
+        with self._lock:
+            self._reset(MIN_CAPACITY)
+
+    def get(self, key, default=None):
+        """返回提醒的对象，不存在时返回 default"""
+        with self._lock:
+            row = self._rows.get(key)
+            return default if row is None else self._payloads[row]
+
+    # ---- 维护 ----
+
+    def _maintain(self):
+        """已删除的行过多时压缩，未排序的尾部过长时重新排序（调用方持有锁）"""
+        if self._deleted * 2 > self._size:
+            self._compact()
+        elif self._size - self._sorted > max(MIN_MERGE, self._sorted // MERGE_FRACTION):
+            self._sort()
+
+    def _sort(self):
+        self._order = np.argsort(self._times[:self._size], kind='stable')
+        self._sorted_times = self._times[self._order]
+        self._sorted = self._size
+
+    def _compact(self):
+        """丢弃已删除的行，剩余的行按到期时间重新编号"""
+        live = np.flatnonzero(self._flags[:self._size] & FLAG_ALIVE)
+        live = live[np.argsort(self._times[live], kind='stable')]
+        times = self._times[live]
+        flags = self._flags[live]
+        keys = [self._keys[row] for row in live]
+        payloads = [self._payloads[row] for row in live]
+        self._reset(max(MIN_CAPACITY, 2 * len(live)))
+        count = len(live)
+        self._times[:count] = times
+        self._flags[:count] = flags
+        self._keys = keys
+        self._payloads = payloads
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._size = count
+        self._order = np.arange(count, dtype=np.int64)
+        self._sorted_times = times
+        self._sorted = count
+
+    # ---- 查询 ----
+
+    def _tail(self):
+        """未排序尾部的 (行号, 到期时间)"""
+        return np.arange(self._sorted, self._size), self._times[self._sorted:self._size]
+
+    def _select(self, rows):
+        """过滤出有效（未删除且启用）的行并按到期时间排序"""
+        rows = rows[self._flags[rows] == _VALID]
+        return rows[np.argsort(self._times[rows], kind='stable')]
+
+    def _range(self, start=None, end=None):
+        """到期时间在 (start, end] 内的有效行（None 表示不限），按到期时间排序"""
+        low = 0 if start is None else np.searchsorted(self._sorted_times, start, 'right')
+        high = len(self._order) if end is None else np.searchsorted(self._sorted_times, end, 'right')
+        tail_rows, tail_times = self._tail()
+        mask = np.ones(len(tail_rows), dtype=bool)
+        if start is not None:
+            mask &= tail_times > start
+        if end is not None:
+            mask &= tail_times <= end
+        return self._select(np.concatenate((self._order[low:high], tail_rows[mask])))
+
+    def _items(self, rows):
+        times = _to_timestamp(self._times[rows])
+        return [(float(when), self._keys[row], self._payloads[row]) for when, row in zip(times, rows)]
+
+    def due(self, now):
+        """返回到期时间不晚于 now 的 (到期时间戳, 键, 对象) 列表（按到期时间排序）"""
+        with self._lock:
+            return self._items(self._range(end=_to_us(now)))
+
+    def advance(self, now):
+        """取出到期时间不晚于 now 的提醒，返回 (键, 对象) 列表（按到期时间排序）"""
+        with self._lock:
+            rows = self._range(end=_to_us(now))
+            expired = [(self._keys[row], self._payloads[row]) for row in rows]
+            self.cancel_many(key for key, _ in expired)
+            return expired
+
+    def upcoming(self, count, after=None):
+        """返回 after 之后最早的 count 个提醒 [(到期时间戳, 键, 对象), ...]"""
+        with self._lock:
+            start = None if after is None else _to_us(after)
+            low = 0 if start is None else np.searchsorted(self._sorted_times, start, 'right')
+            # 已排序部分：从 low 开始逐段取，直到凑够 count 个有效行
+            picked = np.empty(0, dtype=np.int64)
+            window = max(count, 64)
+            while len(picked) < count and low < len(self._order):
+                rows = self._order[low:low + window]
+                picked = np.concatenate((picked, rows[self._flags[rows] == _VALID]))
+                low += window
+                window *= 2
+            picked = picked[:count]
+            # 未排序的尾部：掩码后只对前 count 个做部分排序
+            tail_rows, tail_times = self._tail()
+            mask = self._flags[self._sorted:self._size] == _VALID
+            if start is not None:
+                mask &= tail_times > start
+            tail_rows = tail_rows[mask]
+            if len(tail_rows) > count:
+                nearest = np.argpartition(self._times[tail_rows], count - 1)[:count]
+                tail_rows = tail_rows[nearest]
+            rows = np.concatenate((picked, tail_rows))
+            rows = rows[np.argsort(self._times[rows], kind='stable')][:count]
+            return self._items(rows)
+
+    def next_expiry(self):
+        """返回最早的到期时间戳，没有提醒时返回 None"""
+        nearest = self.upcoming(1)
+        return nearest[0][0] if nearest else None
+
+    def between(self, start, end):
+        """返回到期时间在 [start, end) 内的 (到期时间戳, 键, 对象) 列表（按到期时间排序）"""
+        with self._lock:
+            # (start - 1us, end - 1us] 即 [start, end)
+            low = _to_us(start) - np.timedelta64(1, 'us')
+            high = _to_us(end) - np.timedelta64(1, 'us')
+            return self._items(self._range(low, high))
+
+    def on_day(self, day):
+        """返回本地时间某一天（date）内到期的提醒"""
+        start = datetime.datetime.combine(day, datetime.time())
+        return self.between(start.timestamp(), (start + datetime.timedelta(days=1)).timestamp())
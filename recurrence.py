@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+闹钟重复规则 - 惰性计算下一次触发时间
+
+规则只描述"下一次在什么时候"，不会预先生成未来的每一次触发。
+闹钟引擎在闹钟到期时调用 next_after() 计算下一次时间，并用同一个ID
+重新调度，因此无论重复多少次，调度器中每条规则始终只有一个条目。
+"""
+import calendar
+import datetime
+import math
+
+WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+# 界面中可选的重复方式
+REPEAT_CHOICES = ("不重复", "每天", "工作日", "周末", "每小时")
+
+
+class RecurrenceRule:
+    """重复规则
+
+    Args:
+        kind: 'daily'、'weekly'、'interval' 或 'monthly'
+        interval: 间隔（daily 为天数，interval 为分钟数）
+        weekdays: weekly 规则的星期几集合（0=周一）
+        day: monthly 规则的日期（1-31，当月没有这一天时取月末）
+        until: 最后允许的触发时间（含），None 表示不限
+        count: 总触发次数（含第一次），None 表示不限
+    """
+
+    KINDS = ('daily', 'weekly', 'interval', 'monthly')
+
+    def __init__(self, kind, interval=1, weekdays=None, day=None, until=None, count=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的重复类型: {kind}")
+        if interval < 1:
+            raise ValueError("重复间隔必须大于0")
+        if kind == 'weekly' and not weekdays:
+            raise ValueError("按周重复必须指定星期")
+        if kind == 'monthly' and not (day and 1 <= day <= 31):
+            raise ValueError("按月重复的日期必须在1-31之间")
+        if count is not None and count < 1:
+            raise ValueError("重复次数必须大于0")
+        self.kind = kind
+        self.interval = interval
+        self.weekdays = frozenset(weekdays or ())
+        self.day = day
+        self.until = until
+        self.count = count
+
+    # ---- 常用规则 ----
+
+    @classmethod
+    def daily(cls, **limits):
+        return cls('daily', **limits)
+
+    @classmethod
+    def weekdays_only(cls, **limits):
+        return cls('weekly', weekdays=range(5), **limits)
+
+    @classmethod
+    def weekends(cls, **limits):
+        return cls('weekly', weekdays=(5, 6), **limits)
+
+    @classmethod
+    def every_minutes(cls, minutes, **limits):
+        return cls('interval', interval=minutes, **limits)
+
+    @classmethod
+    def monthly(cls, day, **limits):
+        return cls('monthly', day=day, **limits)
+
+    @classmethod
+    def from_choice(cls, choice):
+        """按界面中的重复选项创建规则，"不重复"返回 None"""
+        rules = {
+            "每天": cls.daily,
+            "工作日": cls.weekdays_only,
+            "周末": cls.weekends,
+            "每小时": lambda: cls.every_minutes(60),
+        }
+        factory = rules.get(choice)
+        return factory() if factory else None
+
+    def to_dict(self):
+        """转换为可 JSON 序列化的字典"""
+        return {
+            'kind': self.kind,
+            'interval': self.interval,
+            'weekdays': sorted(self.weekdays),
+            'day': self.day,
+            'until': self.until.isoformat() if self.until else None,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict() 的结果恢复规则"""
+        until = data.get('until')
+        return cls(data['kind'], interval=data.get('interval', 1), weekdays=data.get('weekdays'),
+                   day=data.get('day'), until=datetime.datetime.fromisoformat(until) if until else None,
+                   count=data.get('count'))
+
+    def __eq__(self, other):
+        return isinstance(other, RecurrenceRule) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"RecurrenceRule({self.describe()})"
+
+    def _key(self):
+        return (self.kind, self.interval, self.weekdays, self.day, self.until, self.count)
+
+    def describe(self):
+        """返回规则的中文描述"""
+        if self.kind == 'daily':
+            text = "每天" if self.interval == 1 else f"每{self.interval}天"
+        elif self.kind == 'weekly':
+            if self.weekdays == frozenset(range(5)):
+                text = "工作日"
+            elif self.weekdays == frozenset((5, 6)):
+                text = "周末"
+            else:
+                text = "每" + "、".join(WEEKDAY_NAMES[d] for d in sorted(self.weekdays))
+        elif self.kind == 'interval':
+            if self.interval % 60 == 0:
+                hours = self.interval // 60
+                text = "每小时" if hours == 1 else f"每{hours}小时"
+            else:
+                text = f"每{self.interval}分钟"
+        else:
+            text = f"每月{self.day}日"
+        if self.count is not None:
+            text += f"，共{self.count}次"
+        if self.until is not None:
+            text += f"，至{self.until.strftime('%Y-%m-%d %H:%M')}"
+        return text
+
+    # ---- 计算下一次触发 ----
+
+    def first_on_or_after(self, start):
+        """返回不早于 start 的第一次符合规则的时间（用于对齐起始时间）"""
+        if self.kind == 'weekly':
+            for offset in range(7):
+                candidate = start + datetime.timedelta(days=offset)
+                if candidate.weekday() in self.weekdays:
+                    return candidate
+        if self.kind == 'monthly':
+            candidate = _month_day(start.year, start.month, self.day, start)
+            if candidate < start:
+                candidate = self._next_month(candidate)
+            return candidate
+        return start
+
+    def next_after(self, previous, occurrences=1, now=None):
+        """计算 previous 之后的下一次触发时间
+
+        Args:
+            previous: 上一次的触发时间
+            occurrences: 到目前为止已经触发的次数
+            now: 当前时间；错过的触发（如休眠期间）会被跳过，只返回晚于 now 的时间
+        Returns:
+            下一次触发时间，规则已结束时返回 None
+        """
+        if self.count is not None and occurrences >= self.count:
+            return None
+        after = max(previous, now) if now else previous
+
+        if self.kind == 'interval':
+            step = datetime.timedelta(minutes=self.interval)
+            steps = math.floor((after - previous) / step) + 1
+            candidate = previous + step * steps
+        elif self.kind == 'daily':
+            step = datetime.timedelta(days=self.interval)
+            steps = (after - previous) // step + 1
+            candidate = previous + step * steps
+        elif self.kind == 'weekly':
+            # 先整周跳过错过的时间，再在一周内找下一个符合的星期
+            weeks = max(0, (after - previous).days // 7)
+            candidate = previous + datetime.timedelta(weeks=weeks, days=1)
+            while candidate <= after or candidate.weekday() not in self.weekdays:
+                candidate += datetime.timedelta(days=1)
+        else:
+            candidate = self._next_month(previous)
+            while candidate <= after:
+                candidate = self._next_month(candidate)
+
+        if self.until is not None and candidate > self.until:
+            return None
+        return candidate
+
+    def _next_month(self, moment):
+        year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+        return _month_day(year, month, self.day, moment)
+
+
+def _month_day(year, month, day, moment):
+    """返回 year-month 的第 day 天（超出当月天数时取月末），时刻沿用 moment"""
+    last_day = calendar.monthrange(year, month)[1]
+    return moment.replace(year=year, month=month, day=min(day, last_day))
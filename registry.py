@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+按ID索引的记录表 - 闹钟和日程共用
+
+记录（字典）按ID保存在字典中，查找、修改和删除都是 O(1)；
+ID 由单调递增的分配器生成，删除后不会被重复使用。
+按时间排序的索引（堆或时间轮）由使用者单独维护，以ID为键。
+"""
+import threading
+
+
+class IdRegistry:
+    """以ID为键的记录表（线程安全，保持添加顺序）
+
+    Args:
+        id_field: 记录中保存ID的字段名
+        first_id: 第一个分配的ID
+    """
+
+    def __init__(self, id_field="id", first_id=1):
+        self.id_field = id_field
+        self._records = {}
+        self._next_id = first_id
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def __contains__(self, record_id):
+        with self._lock:
+            return record_id in self._records
+
+    def __iter__(self):
+        return iter(self.values())
+
+    @property
+    def next_id(self):
+        """下一个将要分配的ID"""
+        return self._next_id
+
+    def allocate(self):
+        """分配一个新的ID"""
+        with self._lock:
+            record_id = self._next_id
+            self._next_id += 1
+            return record_id
+
+    def add(self, record):
+        """为记录分配ID并保存，返回记录"""
+        with self._lock:
+            record[self.id_field] = self.allocate()
+            self._records[record[self.id_field]] = record
+            return record
+
+    def put(self, record):
+        """按记录自带的ID保存（如从文件恢复），分配器会跳过已使用的ID"""
+        with self._lock:
+            record_id = record[self.id_field]
+            self._records[record_id] = record
+            if record_id >= self._next_id:
+                self._next_id = record_id + 1
+            return record
+
+    def get(self, record_id):
+        """按ID查找记录，不存在时返回 None"""
+        with self._lock:
+            return self._records.get(record_id)
+
+    def remove(self, record_id):
+        """删除记录，返回被删除的记录或 None"""
+        with self._lock:
+            return self._records.pop(record_id, None)
+
+    def remove_many(self, record_ids):
+        """批量删除记录，返回被删除的记录列表（忽略不存在的ID）"""
+        with self._lock:
+            removed = []
+            for record_id in record_ids:
+                record = self._records.pop(record_id, None)
+                if record is not None:
+                    removed.append(record)
+            return removed
+
+    def clear(self):
+        """删除所有记录（ID分配器不回退），返回删除的数量"""
+        with self._lock:
+            count = len(self._records)
+            self._records.clear()
+            return count
+
+    def values(self):
+        """返回所有记录（按添加顺序）的列表副本"""
+        with self._lock:
+            return list(self._records.values())
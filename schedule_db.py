@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+SQLite 日程存储 - 大量日程时只把最近的提醒放进内存
+
+日程保存在 SQLite 数据库中，time 和 reminder_time 上建有索引：
+    - 提醒线程只查询接下来的 N 个提醒（upcoming），放进时间轮
+    - 列表按时间分页读取（page），不需要一次加载所有日程
+因此日程数量达到几十万时，内存占用和启动时间都与总数无关。
+
+时间以 time.time() 风格的时间戳保存，与时间轮一致；已提醒的日程
+reminder_time 为 NULL，不在提醒索引中。
+"""
+import datetime
+import os
+import sqlite3
+import threading
+
+from alarm_store import DATA_DIR
+
+DEFAULT_SCHEDULE_DB_PATH = os.path.join(DATA_DIR, "schedules.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL DEFAULT '',
+    reminder TEXT NOT NULL DEFAULT '',
+    reminder_time REAL
+);
+CREATE INDEX IF NOT EXISTS schedules_time ON schedules (time, id);
+CREATE INDEX IF NOT EXISTS schedules_reminder_time ON schedules (reminder_time, id)
+    WHERE reminder_time IS NOT NULL;
+"""
+
+_COLUMNS = ("id", "time", "title", "content", "reminder", "reminder_time")
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM schedules"
+_DATETIME_FIELDS = ("time", "reminder_time")
+
+
+def schedule_to_json(schedule):
+    """把日程转换为可 JSON 序列化的字典"""
+    data = dict(schedule)
+    for field in _DATETIME_FIELDS:
+        if data.get(field):
+            data[field] = data[field].isoformat()
+    return data
+
+
+def schedule_from_json(data):
+    """schedule_to_json() 的逆操作"""
+    schedule = dict(data)
+    for field in _DATETIME_FIELDS:
+        if schedule.get(field):
+            schedule[field] = datetime.datetime.fromisoformat(schedule[field])
+    return schedule
+
+
+def _to_timestamp(value):
+    return value.timestamp() if isinstance(value, datetime.datetime) else value
+
+
+def _row_to_schedule(row):
+    """数据库行 -> 日程字典（时间转换为 datetime）"""
+    schedule = dict(zip(_COLUMNS, row))
+    schedule["time"] = datetime.datetime.fromtimestamp(schedule["time"])
+    if schedule["reminder_time"] is not None:
+        schedule["reminder_time"] = datetime.datetime.fromtimestamp(schedule["reminder_time"])
+    return schedule
+
+
+class ScheduleDB:
+    """SQLite 日程存储（线程安全）
+
+    Args:
+        path: 数据库文件路径，":memory:" 表示内存数据库
+    """
+
+    def __init__(self, path=DEFAULT_SCHEDULE_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0]
+
+    # ---- 增删改 ----
+
+    def add(self, schedule):
+        """保存新日程，分配ID并写回 schedule['id']，返回ID"""
+        self.add_many([schedule])
+        return schedule["id"]
+
+    def add_many(self, schedules):
+        """在一个事务中批量保存日程，返回保存的数量"""
+        with self._lock, self._conn:
+            for schedule in schedules:
+                cursor = self._conn.execute(
+                    "INSERT INTO schedules (time, title, content, reminder, reminder_time) VALUES (?, ?, ?, ?, ?)",
+                    (_to_timestamp(schedule["time"]), schedule.get("title", ""), schedule.get("content", ""),
+                     schedule.get("reminder", ""), _to_timestamp(schedule.get("reminder_time"))))
+                schedule["id"] = cursor.lastrowid
+            return len(schedules)
+
+    def update(self, schedule_id, **fields):
+        """修改日程字段，返回是否存在该日程"""
+        unknown = set(fields) - set(_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"未知的日程字段: {', '.join(sorted(unknown))}")
+        if not fields:
+            return self.get(schedule_id) is not None
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        values = [_to_timestamp(value) for value in fields.values()]
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f"UPDATE schedules SET {assignments} WHERE id = ?", (*values, schedule_id))
+            return cursor.rowcount > 0
+
+    def remove_many(self, schedule_ids):
+        """批量删除日程，返回被删除的ID列表"""
+        ids = list(schedule_ids)
+        if not ids:
+            return []
+        with self._lock, self._conn:
+            removed = []
+            # 分批以免超过 SQLite 的参数个数上限
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ", ".join("?" * len(chunk))
+                removed += [row[0] for row in self._conn.execute(
+                    f"SELECT id FROM schedules WHERE id IN ({marks})", chunk)]
+                self._conn.execute(f"DELETE FROM schedules WHERE id IN ({marks})", chunk)
+            return removed
+
+    def clear(self):
+        """删除所有日程，返回删除的数量"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM schedules").rowcount
+
+    # ---- 查询 ----
+
+    def get(self, schedule_id):
+        """按ID读取日程，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(f"{_SELECT} WHERE id = ?", (schedule_id,)).fetchone()
+        return _row_to_schedule(row) if row else None
+
+    def upcoming(self, limit):
+        """按提醒时间返回最近的 limit 个待提醒日程（走 reminder_time 索引）"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT} WHERE reminder_time IS NOT NULL ORDER BY reminder_time, id LIMIT ?", (limit,)).fetchall()
+        return [_row_to_schedule(row) for row in rows]
+
+    def page(self, offset, limit):
+        """按日程时间排序分页读取（走 time 索引）"""
+        with self._lock:
+            rows = self._conn.execute(f"{_SELECT} ORDER BY time, id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [_row_to_schedule(row) for row in rows]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+单实例协调 - 保证同一用户只有一个进程在检查闹钟和响铃
+
+第一个启动的程序（图形界面或守护进程）持有锁文件，并通过控制接口
+（alarm_ipc.py）对外服务。之后再启动的程序拿不到锁，就把启动参数或
+要设置的闹钟交给正在运行的实例，然后退出，不会再开一套检查线程和铃声。
+
+锁由操作系统在进程退出（包括崩溃）时自动释放，不会留下失效的锁。
+"""
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from alarm_ipc import DEFAULT_SOCKET_PATH, AlarmIPCClient
+
+HANDOFF_TIMEOUT = 5.0  # 等待正在启动的实例开始监听的最长时间（秒）
+
+
+def lock_path_for(socket_path=DEFAULT_SOCKET_PATH):
+    """控制接口对应的锁文件路径（同一个套接字只允许一个实例）"""
+    return socket_path + ".lock"
+
+
+class InstanceLock:
+    """非阻塞的进程间排他锁
+
+    Args:
+        path: 锁文件路径
+    """
+
+    def __init__(self, path=None):
+        self.path = path or lock_path_for()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """尝试获取锁，已被其他进程持有时立即返回 False"""
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        # 记录持有者的进程号，便于排查
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        logging.info(f"已获取单实例锁: {self.path}")
+        return True
+
+    def release(self):
+        """释放锁（进程退出时也会自动释放）"""
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def owner_pid(self):
+        """返回锁文件中记录的进程号，无法读取时返回 None"""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+def hand_off(requests, socket_path=DEFAULT_SOCKET_PATH, timeout=HANDOFF_TIMEOUT):
+    """把请求交给正在运行的实例，返回响应列表
+
+    正在运行的实例可能刚拿到锁、还没开始监听，因此连接失败时在 timeout
+    秒内重试；超时后抛出最后一次连接错误。
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with AlarmIPCClient(socket_path) as client:
+                return client.pipeline(requests)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
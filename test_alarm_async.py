@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试 asyncio 闹钟运行时
+"""
+import sys
+import os
+import asyncio
+import datetime
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alarm_async
+from alarm_async import AsyncAlarmRuntime, TkLoopPump
+from alarm_engine import AlarmEngine
+
+
+def test_scheduler_coroutine_fires_alarm():
+    """调度协程在触发时间调用引擎监听器"""
+    engine = AlarmEngine()
+    fired = []
+    engine.add_listener(fired.extend)
+    runtime = AsyncAlarmRuntime(engine)
+    runtime.start()
+    engine.add_alarm(datetime.datetime.now() + datetime.timedelta(seconds=0.1), label="async")
+    runtime.loop.run_until_complete(asyncio.sleep(0.5))
+    runtime.stop()
+    assert [alarm["label"] for alarm in fired] == ["async"]
+
+
+def test_change_from_other_thread_wakes_scheduler():
+    """在其他线程中添加闹钟会唤醒后台事件循环"""
+    engine = AlarmEngine()
+    fired = threading.Event()
+    engine.add_listener(lambda alarms: fired.set())
+    runtime = AsyncAlarmRuntime(engine)
+    runtime.run_in_thread()
+    try:
+        time.sleep(0.05)  # 调度协程进入空闲等待
+        engine.add_alarm(datetime.datetime.now() + datetime.timedelta(seconds=0.1))
+        assert fired.wait(5)
+    finally:
+        runtime.stop()
+
+
+def test_thousands_of_timers_without_threads():
+    """上千个定时器只使用事件循环，不新建线程"""
+    engine = AlarmEngine()
+    runtime = AsyncAlarmRuntime(engine)
+    threads_before = threading.active_count()
+    calls = []
+    for i in range(5000):
+        runtime.call_later(0.01 + i / 1_000_000, calls.append, i)
+    runtime.loop.run_until_complete(asyncio.sleep(0.2))
+    assert len(calls) == 5000
+    assert threading.active_count() == threads_before
+    runtime.stop()
+
+
+class _FakeRoot:
+    """记录 after() 调用的 Tk 根窗口替身"""
+
+    def __init__(self):
+        self.jobs = {}
+        self._next_id = 0
+
+    def after(self, delay_ms, callback):
+        self._next_id += 1
+        job = f"after#{self._next_id}"
+        self.jobs[job] = (delay_ms, callback)
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def settle(self):
+        """执行所有立即推进，返回剩下的那次推进安排的延迟（毫秒）"""
+        while any(delay_ms == 0 for delay_ms, _ in self.jobs.values()):
+            job = next(job for job, (delay_ms, _) in self.jobs.items() if delay_ms == 0)
+            self.jobs.pop(job)[1]()
+        assert len(self.jobs) == 1, self.jobs
+        return next(iter(self.jobs.values()))[0]
+
+
+def test_pump_sleeps_until_next_timer():
+    """空闲时 TkLoopPump 按最早的定时器安排下一次推进，而不是周期性轮询"""
+    engine = AlarmEngine()
+    runtime = AsyncAlarmRuntime(engine)
+    runtime.start()
+    root = _FakeRoot()
+    pump = TkLoopPump(root, runtime.loop)
+    runtime.wakeup = pump.wake
+    pump.start()
+    # 调度协程进入空闲等待后，下一次推进在最长间隔之后
+    assert root.settle() > alarm_async.MAX_PUMP_DELAY_MS - 100
+
+    # 新的定时器和闹钟都立即唤醒推进，之后按最早的时间安排
+    calls = []
+    runtime.call_later(5, calls.append, 1)
+    assert 4900 <= root.settle() <= 5000
+    engine.add_alarm(datetime.datetime.now() + datetime.timedelta(seconds=2))
+    assert 1900 <= root.settle() <= 2000
+
+    pump.stop()
+    pump.wake()
+    assert root.jobs == {} and calls == []
+    runtime.stop()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_scheduler_coroutine_fires_alarm,
+        test_change_from_other_thread_wakes_scheduler,
+        test_thousands_of_timers_without_threads,
+        test_pump_sleeps_until_next_timer,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试无界面闹钟守护进程和闹钟持久化
+"""
+import sys
+import os
+import datetime
+import signal
+import subprocess
+import tempfile
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_daemon import AlarmDaemon
+from alarm_engine import AlarmEngine
+from alarm_store import AlarmStore
+from recurrence import RecurrenceRule
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_store_round_trip():
+    """闹钟（含重复规则和界面字段）保存后可以原样恢复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AlarmStore(os.path.join(tmp, "alarms.json"))
+        assert store.load() == []
+        engine = AlarmEngine()
+        future = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+        engine.add_alarm(future, label="起床", recurrence=RecurrenceRule.weekdays_only(), volume=0.5)
+        store.save(engine.alarms())
+
+        restored = AlarmEngine()
+        assert restored.load_alarms(store.load()) == 1
+        alarm = restored.alarms()[0]
+        assert alarm["label"] == "起床"
+        assert alarm["volume"] == 0.5
+        assert alarm["recurrence"] == RecurrenceRule.weekdays_only()
+        assert restored.add_alarm(future)["id"] == alarm["id"] + 1
+
+
+def test_load_skips_expired_single_alarms():
+    """恢复时丢弃已过期的单次闹钟（禁用的保留），重复闹钟顺延到将来"""
+    engine = AlarmEngine()
+    past = datetime.datetime.now() - datetime.timedelta(days=3)
+    count = engine.load_alarms([
+        {"id": 1, "time": past, "label": "过期", "snooze": 5},
+        {"id": 2, "time": past, "label": "每天", "snooze": 5, "recurrence": RecurrenceRule.daily()},
+        {"id": 3, "time": past, "label": "禁用", "snooze": 5, "enabled": False},
+    ])
+    assert count == 2
+    assert engine.get_alarm(2)["time"] > datetime.datetime.now()
+    assert engine.get_alarm(3)["enabled"] is False
+    assert engine.next_alarm()["id"] == 2
+
+
+def test_attached_gui_receives_alarms():
+    """界面连接时到期闹钟交给界面，断开后由守护进程响铃"""
+    daemon = AlarmDaemon()
+    received = []
+    rung = []
+    daemon._ring = rung.append
+    daemon.attach(received.append)
+    now = datetime.datetime.now()
+    daemon.engine.add_alarm(now, label="a")
+    daemon.engine.run_pending(now)
+    daemon.detach(received.append)
+    daemon.engine.add_alarm(now, label="b")
+    daemon.engine.run_pending(now)
+    assert [[alarm["label"] for alarm in batch] for batch in received] == [["a"]]
+    assert [[alarm["label"] for alarm in batch] for batch in rung] == [["b"]]
+    daemon.workers.shutdown()
+
+
+def test_daemon_does_not_import_tk():
+    """守护进程模块不导入 Tk"""
+    code = "import sys, alarm_daemon; sys.exit('tkinter' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=HERE).returncode == 0
+
+
+def test_daemon_saves_on_sigterm():
+    """守护进程收到 SIGTERM 时保存闹钟并退出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.json")
+        future = datetime.datetime.now() + datetime.timedelta(hours=1)
+        engine = AlarmEngine()
+        engine.add_alarm(future, label="保留")
+        AlarmStore(path).save(engine.alarms())
+
+        process = subprocess.Popen([sys.executable, "alarm_daemon.py", "--store", path,
+                                    "--socket", os.path.join(tmp, "alarm.sock")], cwd=HERE)
+        time.sleep(1)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
+        assert [alarm["label"] for alarm in AlarmStore(path).load()] == ["保留"]
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_store_round_trip,
+        test_load_skips_expired_single_alarms,
+        test_attached_gui_receives_alarms,
+        test_daemon_does_not_import_tk,
+        test_daemon_saves_on_sigterm,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
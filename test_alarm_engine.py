@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+测试闹钟引擎（无界面）
+"""
+import sys
+import os
+import collections
+import datetime
+import heapq
+import threading
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alarm_scheduler
+from alarm_engine import AlarmEngine, next_fire_time
+
+BASE = datetime.datetime(2024, 1, 1, 8, 0, 0)
+
+
+class _CountingHeapq:
+    """代替调度器使用的 heapq 模块，记录每种堆操作的次数"""
+
+    def __init__(self):
+        self.calls = collections.Counter()
+
+    def __getattr__(self, name):
+        func = getattr(heapq, name)
+
+        def counted(*args):
+            self.calls[name] += 1
+            return func(*args)
+        return counted
+
+
+def test_next_fire_time_rolls_over():
+    """今天已过（含当前时刻）的时间顺延到明天"""
+    assert next_fire_time(9, 0, BASE) == BASE.replace(hour=9)
+    assert next_fire_time(8, 0, BASE) == BASE + datetime.timedelta(days=1)
+    assert next_fire_time(7, 30, BASE) == BASE.replace(hour=7, minute=30) + datetime.timedelta(days=1)
+
+
+def test_run_pending_fires_batch_and_removes():
+    """同一时刻到期的闹钟作为一批传给监听器，并从引擎中移除"""
+    engine = AlarmEngine()
+    batches = []
+    engine.add_listener(batches.append)
+    first = engine.add_alarm(BASE, label="a")
+    second = engine.add_alarm(BASE, label="b")
+    later = engine.add_alarm(BASE + datetime.timedelta(hours=1), label="c")
+
+    assert engine.run_pending(BASE - datetime.timedelta(seconds=1)) == []
+    fired = engine.run_pending(BASE)
+    assert [alarm["id"] for alarm in fired] == [first["id"], second["id"]]
+    assert batches == [fired]
+    assert engine.alarms() == [later]
+    assert engine.next_fire_time() == later["time"]
+
+
+def test_disabled_alarm_is_kept_silently():
+    """禁用的闹钟到期后不通知监听器，闹钟保留且仍为禁用，重新启用后触发"""
+    engine = AlarmEngine()
+    batches = []
+    engine.add_listener(batches.append)
+    alarm = engine.add_alarm(BASE)
+    engine.update_alarm(alarm["id"], enabled=False)
+    assert engine.run_pending(BASE) == []
+    assert batches == []
+    assert len(engine) == 1
+    assert engine.get_alarm(alarm["id"])["enabled"] is False
+    assert engine.next_alarm() is None
+    assert engine.run_pending(BASE + datetime.timedelta(hours=1)) == []
+
+    engine.update_alarm(alarm["id"], enabled=True)
+    fired = engine.run_pending(BASE + datetime.timedelta(hours=1))
+    assert [item["id"] for item in fired] == [alarm["id"]]
+    assert len(engine) == 0
+
+
+def test_update_and_remove():
+    """修改时间会改期，删除后不再触发"""
+    engine = AlarmEngine()
+    alarm = engine.add_alarm(BASE, ringtone="默认铃声")
+    engine.update_alarm(alarm["id"], time=BASE + datetime.timedelta(minutes=30))
+    assert engine.run_pending(BASE) == []
+    assert engine.next_alarm()["ringtone"] == "默认铃声"
+    assert engine.remove_alarm(alarm["id"]) is alarm
+    assert engine.remove_alarm(alarm["id"]) is None
+    assert engine.run_pending(BASE + datetime.timedelta(days=1)) == []
+
+
+def test_snooze_reschedules_same_alarm():
+    """贪睡以原ID改期并累计贪睡次数，铃声等字段保持不变"""
+    engine = AlarmEngine()
+    alarm = engine.add_alarm(BASE, label="起床", snooze=10, volume=0.5)
+    fired = engine.run_pending(BASE)
+    assert engine.get_alarm(alarm["id"]) is None
+    snoozed = engine.snooze(fired[0], now=BASE)
+    assert snoozed["id"] == alarm["id"]
+    assert snoozed["time"] == BASE + datetime.timedelta(minutes=10)
+    assert snoozed["volume"] == 0.5 and snoozed["label"] == "起床"
+    assert snoozed["snoozed"] and snoozed["snooze_count"] == 1
+    assert engine.next_alarm() is snoozed
+    assert len(engine) == 1 and len(engine.scheduler) == 1
+
+    again = engine.run_pending(BASE + datetime.timedelta(minutes=10))
+    assert again[0]["snooze_count"] == 1 and again[0]["occurrences"] == 1
+    assert engine.snooze(again[0], 5, now=BASE)["snooze_count"] == 2
+    assert len(engine) == 1
+
+
+def test_snooze_is_one_heap_push():
+    """有大量闹钟时每次贪睡只向堆中压入一个条目，不重建堆（耗时见 bench_alarm_engine.py）"""
+    engine = AlarmEngine()
+    engine.add_alarms([{"time": BASE + datetime.timedelta(seconds=i)} for i in range(1, 50001)])
+    alarm = engine.add_alarm(BASE)
+    fired = engine.run_pending(BASE)[0]
+    counting = _CountingHeapq()
+    alarm_scheduler.heapq = counting
+    try:
+        for _ in range(100):
+            engine.snooze(fired, 1, now=BASE)
+    finally:
+        alarm_scheduler.heapq = heapq
+    assert counting.calls == {"heappush": 100}, dict(counting.calls)
+    assert engine.get_alarm(alarm["id"])["snooze_count"] == 100
+    assert len(engine) == 50001
+
+
+def test_add_alarms_prefers_fire_time():
+    """批量添加时同时给出 fire_time 和 time 以 fire_time 为准，不留下过期的 time"""
+    engine = AlarmEngine()
+    later = BASE + datetime.timedelta(hours=2)
+    alarms = engine.add_alarms([{"fire_time": later, "time": BASE, "label": "both"}, {"time": BASE}])
+    assert [alarm["time"] for alarm in alarms] == [later, BASE]
+    assert engine.get_alarm(alarms[0]["id"])["time"] == later
+    assert engine.next_fire_time() == BASE
+    try:
+        engine.add_alarms([{"label": "无时间"}])
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("缺少触发时间时应当抛出 KeyError")
+
+
+def test_next_deadline_cache():
+    """下一个闹钟的缓存在闹钟变化时失效，未变化时不重新计算"""
+    engine = AlarmEngine()
+    assert engine.next_deadline() is None
+    later = engine.add_alarm(BASE + datetime.timedelta(hours=1), label="later")
+    assert engine.next_deadline() == (int((BASE + datetime.timedelta(hours=1)).timestamp()), "later")
+    engine.add_alarm(BASE, label="first")
+    assert engine.next_deadline()[1] == "first"
+    engine.scheduler.peek = None  # 缓存命中时不应访问调度器
+    assert engine.next_deadline()[1] == "first"
+    del engine.scheduler.peek
+    engine.update_alarm(later["id"], label="renamed")
+    engine.run_pending(BASE)
+    assert engine.next_deadline()[1] == "renamed"
+    engine.clear()
+    assert engine.next_deadline() is None
+
+
+def test_engine_thread_fires_listener():
+    """引擎线程在闹钟到期时调用监听器，stop() 后线程退出"""
+    engine = AlarmEngine()
+    fired = threading.Event()
+    engine.add_listener(lambda alarms: fired.set())
+    engine.start()
+    try:
+        engine.add_alarm(datetime.datetime.now() + datetime.timedelta(seconds=0.1))
+        assert fired.wait(5)
+    finally:
+        engine.stop()
+    assert not engine.is_running()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_next_fire_time_rolls_over,
+        test_run_pending_fires_batch_and_removes,
+        test_disabled_alarm_is_kept_silently,
+        test_update_and_remove,
+        test_snooze_reschedules_same_alarm,
+        test_snooze_is_one_heap_push,
+        test_add_alarms_prefers_fire_time,
+        test_next_deadline_cache,
+        test_engine_thread_fires_listener,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -49,7 +49,7 @@ class TestAlarmClockGUI(unittest.TestCase):
             self.patcher.stop()
             self.root.destroy()
     
-    @patch.object(AlarmClockGUI, 'alarm_thread_func')
+    @patch.object(AlarmClockGUI, '_on_alarms_triggered')
     def test_set_alarm_valid_time(self, mock_thread_func):
         """测试设置有效的闹钟时间"""
         # 设置测试输入
@@ -115,6 +115,23 @@ class TestAlarmClockGUI(unittest.TestCase):
         # 验证锁对象存在
         self.assertIsInstance(self.app.lock, threading.RLock)
 
+    def test_batched_trigger_dispatch(self):
+        """测试同时到期的闹钟只派发一次、只响铃一次"""
+        now = datetime.datetime.now()
+        alarms = [{'id': i, 'time': now, 'label': f"提醒{i}", 'snooze': 5} for i in range(500)]
+
+        with patch.object(self.app.root, 'after') as mock_after:
+            self.app._on_alarms_triggered(alarms)
+        mock_after.assert_called_once_with(0, self.app._dispatch_triggered_alarms, alarms)
+
+        with patch.object(self.app, 'play_alarm_sound') as mock_play, \
+                patch.object(self.app, 'update_alarm_list_display') as mock_refresh:
+            self.app._dispatch_triggered_alarms(alarms)
+        mock_play.assert_called_once()
+        mock_refresh.assert_called_once()
+        self.assertEqual(len(self.app.ringing_alarms), 500)
+        self.assertIs(self.app.current_alarm, alarms[0])
+
 # 简单的命令行测试函数
 def run_quick_tests():
     """运行简单的命令行测试"""
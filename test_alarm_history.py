@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+测试闹钟历史（环形缓冲区、压缩归档段、轮转、按时间和标签查询）
+"""
+import sys
+import os
+import json
+import datetime
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alarm_history
+from alarm_history import DISMISS, FIRE, SNOOZE, STOP, AlarmHistory
+
+BASE = datetime.datetime(2024, 3, 10, 7, 0)
+
+
+def _alarm(alarm_id, label):
+    return {"id": alarm_id, "time": BASE, "label": label}
+
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".jsonl.gz"))
+
+
+def test_records_lateness():
+    """事件记录发生时间和相对设定时间的延迟"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AlarmHistory(tmp)
+        fired = history.record(FIRE, _alarm(1, "起床"), now=BASE + datetime.timedelta(seconds=2))
+        assert fired["kind"] == FIRE and fired["id"] == 1 and fired["label"] == "起床"
+        assert fired["lateness"] == 2.0
+        history.record(SNOOZE, _alarm(1, "起床"), now=BASE + datetime.timedelta(minutes=1))
+        history.record(STOP, {"id": 2, "label": None})
+        assert [event["kind"] for event in history.recent()] == [FIRE, SNOOZE, STOP]
+        assert history.recent(1)[0]["lateness"] is None and history.recent(0) == []
+        assert _segments(tmp) == []  # 不满一段时只在内存中
+
+
+def test_spills_compressed_segments_and_rotates():
+    """攒满一段就写入压缩段，超过段数时删除最旧的段，内存中只保留最近的事件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AlarmHistory(tmp, capacity=20, segment_events=10, max_segments=3)
+        for i in range(55):
+            history.record(FIRE, _alarm(i, f"闹钟{i % 5}"), now=BASE + datetime.timedelta(minutes=i))
+        assert len(_segments(tmp)) == 3
+        assert [event["seq"] for event in history.recent()] == list(range(35, 55))
+        with open(os.path.join(tmp, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)["segments"]
+        assert [(segment["first"], segment["last"]) for segment in index] == [(20, 29), (30, 39), (40, 49)]
+
+        # 早于最旧段的事件已被删除，其余按时间从归档和内存中取回
+        events = history.query()
+        assert [event["seq"] for event in events] == list(range(20, 55))
+        history.close()
+        assert len(_segments(tmp)) == 3 and not os.path.exists(os.path.join(tmp, "index.json.tmp"))
+
+
+def test_range_and_label_queries_skip_segments():
+    """按时间和标签查询只读取可能命中的段"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AlarmHistory(tmp, capacity=10, segment_events=10, max_segments=0)
+        for i in range(100):
+            label = "吃药" if i == 15 else f"闹钟{i // 10}"
+            history.record(FIRE if i % 2 else DISMISS, _alarm(i, label), now=BASE + datetime.timedelta(hours=i))
+
+        reads = []
+        read_segment = history._read_segment
+        history._read_segment = lambda name: reads.append(name) or read_segment(name)
+
+        start = BASE + datetime.timedelta(hours=30)
+        events = history.query(start, start + datetime.timedelta(hours=5))
+        assert [event["id"] for event in events] == [30, 31, 32, 33, 34]
+        assert len(reads) == 1
+
+        reads.clear()
+        assert [event["id"] for event in history.query(label="吃药")] == [15]
+        assert len(reads) == 1
+        assert [event["id"] for event in history.query(label="闹钟3", kind=FIRE)] == [31, 33, 35, 37, 39]
+
+        reads.clear()
+        assert [event["id"] for event in history.query(start=BASE + datetime.timedelta(hours=95))] == list(range(95, 100))
+        assert reads == []  # 最近的事件都在内存中
+
+
+def test_reload_and_rebuild_index():
+    """重启后载入最近的事件并接着编号，索引损坏时扫描段文件重建"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AlarmHistory(tmp, capacity=10, segment_events=10)
+        for i in range(25):
+            history.record(STOP, _alarm(i, "a"), now=BASE + datetime.timedelta(minutes=i))
+        history.close()
+
+        with open(os.path.join(tmp, "index.json"), "w", encoding="utf-8") as f:
+            f.write("{损坏")
+        reopened = AlarmHistory(tmp, capacity=10, segment_events=10)
+        assert [event["seq"] for event in reopened.recent()] == list(range(15, 25))
+        assert len(reopened.query(label="a")) == 25
+        assert reopened.record(FIRE, _alarm(99, "b"))["seq"] == 25
+
+
+def test_records_from_multiple_threads():
+    """多个线程同时记录时序号不重复、事件不丢失"""
+    with tempfile.TemporaryDirectory() as tmp:
+        history = AlarmHistory(tmp, capacity=alarm_history.SEGMENT_EVENTS, segment_events=50, max_segments=0)
+        threads = [threading.Thread(target=lambda n=n: [history.record(FIRE, _alarm(n, str(n))) for _ in range(200)])
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        history.flush()
+        events = history.query()
+        assert sorted(event["seq"] for event in events) == list(range(800))
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_records_lateness,
+        test_spills_compressed_segments_and_rotates,
+        test_range_and_label_queries_skip_segments,
+        test_reload_and_rebuild_index,
+        test_records_from_multiple_threads,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
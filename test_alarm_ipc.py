@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+测试闹钟本地控制接口（Unix 套接字 + JSON Lines）
+"""
+import sys
+import os
+import datetime
+import tempfile
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_daemon import AlarmDaemon
+from alarm_engine import AlarmEngine
+from alarm_ipc import AlarmController, AlarmIPCClient, IPCError, parse_time
+from recurrence import RecurrenceRule
+
+
+def _future(hours=1):
+    return (datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=hours)).isoformat()
+
+
+def test_parse_time():
+    """HH:MM 解析为下一次到达该时刻，ISO 时间原样解析"""
+    now = datetime.datetime(2024, 1, 1, 12, 0)
+    assert parse_time("07:30", now) == datetime.datetime(2024, 1, 2, 7, 30)
+    assert parse_time("13:05", now) == datetime.datetime(2024, 1, 1, 13, 5)
+    assert parse_time("2024-03-01T08:00:00") == datetime.datetime(2024, 3, 1, 8, 0)
+    try:
+        parse_time("25:00", now)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("无效时间应抛出 ValueError")
+
+
+def test_controller_crud():
+    """添加、修改、查询、删除闹钟，错误以响应返回而不抛出"""
+    engine = AlarmEngine()
+    controller = AlarmController(engine)
+    added = controller.execute({'op': 'add', 'time': _future(), 'label': "起床", 'repeat': "工作日"})
+    assert engine.get_alarm(added['id'])['recurrence'] == RecurrenceRule.weekdays_only()
+    edited = controller.execute({'op': 'edit', 'id': added['id'], 'label': "上班", 'repeat': "不重复"})
+    assert edited['label'] == "上班" and edited['recurrence'] is None
+    assert controller.execute({'op': 'next'})['id'] == added['id']
+    assert controller.handle({'op': 'get', 'id': 999})['ok'] is False
+    assert controller.handle({'op': 'fly'})['ok'] is False
+    assert controller.execute({'op': 'delete', 'id': added['id']}) == {'deleted': 1}
+    assert controller.execute({'op': 'list'}) == []
+
+
+def test_snooze_fired_and_pending():
+    """贪睡刚响过的闹钟以原ID恢复，贪睡未到期的闹钟以原ID推迟"""
+    engine = AlarmEngine()
+    controller = AlarmController(engine)
+    now = datetime.datetime.now()
+    fired = engine.add_alarm(now, label="到期")
+    engine.run_pending(now)
+    snoozed = controller.execute({'op': 'snooze', 'id': fired['id'], 'minutes': 3})
+    assert snoozed['label'] == "到期" and snoozed['id'] == fired['id']
+    assert snoozed['snooze_count'] == 1
+
+    pending = engine.add_alarm(now + datetime.timedelta(minutes=1), label="未到期")
+    result = controller.execute({'op': 'snooze', 'id': pending['id'], 'minutes': 10})
+    assert result['id'] == pending['id']
+    assert engine.get_alarm(pending['id'])['time'] > now + datetime.timedelta(minutes=9)
+    assert len(engine) == 2
+    assert controller.handle({'op': 'snooze', 'id': 999})['ok'] is False
+
+
+def test_batch_insert_over_socket():
+    """通过套接字一次往返插入 10000 个闹钟，调度器只整理一次、变化只通知一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        daemon = AlarmDaemon(socket_path=path)
+        changes = []
+        daemon.engine.add_change_listener(lambda: changes.append(1))
+        daemon.start()
+        try:
+            base = datetime.datetime.now() + datetime.timedelta(hours=1)
+            alarms = [{'time': (base + datetime.timedelta(seconds=i)).isoformat(), 'label': f"批量{i}"}
+                      for i in range(10000)]
+            started = time.perf_counter()
+            with AlarmIPCClient(path) as client:
+                result = client.call('add', alarms=alarms)
+                elapsed = time.perf_counter() - started
+                assert len(result['ids']) == 10000
+                assert len(changes) == 1
+                assert client.call('next')['label'] == "批量0"
+                deleted = client.call('delete', ids=result['ids'][:5000])
+                assert deleted == {'deleted': 5000}
+                assert len(changes) == 2
+                try:
+                    client.call('get', id=result['ids'][0])
+                except IPCError:
+                    pass
+                else:
+                    raise AssertionError("已删除的闹钟应返回错误")
+            assert len(daemon.engine) == 5000
+            print(f"  插入 10000 个闹钟耗时 {elapsed * 1000:.1f} ms")
+        finally:
+            daemon.stop()
+            daemon.shutdown()
+        assert not os.path.exists(path)
+
+
+def test_pipeline_and_batch():
+    """同一连接上流水线发送多个请求，batch 在一把锁内依次执行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        daemon = AlarmDaemon(socket_path=path)
+        daemon.start()
+        try:
+            with AlarmIPCClient(path) as client:
+                responses = client.pipeline([{'op': 'ping'}, {'op': 'add', 'time': _future(), 'label': "a"},
+                                             {'op': 'list'}])
+                assert [response['ok'] for response in responses] == [True, True, True]
+                assert len(responses[2]['result']) == 1
+                results = client.call('batch', ops=[
+                    {'op': 'add', 'time': _future(2), 'label': "b"},
+                    {'op': 'delete', 'id': 12345},
+                    {'op': 'edit', 'id': responses[1]['result']['id'], 'label': "A"},
+                ])
+                assert [item['ok'] for item in results] == [True, False, True]
+                assert sorted(alarm['label'] for alarm in client.call('list')) == ["A", "b"]
+        finally:
+            daemon.stop()
+            daemon.shutdown()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_parse_time,
+        test_controller_crud,
+        test_snooze_fired_and_pending,
+        test_batch_insert_over_socket,
+        test_pipeline_and_batch,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+测试追加写入的闹钟日志（组提交、重放、后台压缩）
+"""
+import sys
+import os
+import datetime
+import json
+import tempfile
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import alarm_journal
+from alarm_engine import AlarmEngine
+from alarm_journal import AlarmJournal
+from alarm_store import AlarmStore
+from recurrence import RecurrenceRule
+
+BASE = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+
+
+def _summary(alarms):
+    return sorted((alarm["id"], alarm["time"], alarm["label"], alarm["snooze_count"]) for alarm in alarms)
+
+
+def test_replay_restores_every_mutation():
+    """增、改、删、贪睡、触发都写入日志，重启后重放得到相同的闹钟"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.json")
+        engine = AlarmEngine()
+        journal = AlarmJournal(path)
+        assert journal.restore(engine) == 0
+        now = datetime.datetime.now()
+        keep = engine.add_alarm(BASE, label="保留", recurrence=RecurrenceRule.daily())
+        edited = engine.add_alarm(BASE, label="旧")
+        engine.update_alarm(edited["id"], label="新")
+        gone = engine.add_alarm(BASE, label="删除")
+        engine.remove_alarm(gone["id"])
+        fired = engine.add_alarm(now, label="到期")
+        engine.run_pending(now)
+        engine.snooze(engine.get_alarm(keep["id"]), 5)
+        engine.add_alarm(now, label="触发后移除")
+        engine.run_pending(now)
+        assert journal.flush(timeout=5)
+
+        restored = AlarmJournal(path).load()
+        assert _summary(restored) == _summary(engine.alarms())
+        assert engine.get_alarm(fired["id"]) is None
+        assert restored[0]["recurrence"] == RecurrenceRule.daily()
+        journal.close()
+
+
+def test_fsync_is_batched_and_non_blocking():
+    """大量变更合并为少数几次 fsync，记录变更时不等待磁盘"""
+    original_fsync = alarm_journal.os.fsync
+    calls = []
+
+    def slow_fsync(fd):
+        calls.append(threading.current_thread())
+        time.sleep(0.05)
+        original_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine()
+        journal = AlarmJournal(os.path.join(tmp, "alarms.json"))
+        journal.attach(engine)
+        alarm_journal.os.fsync = slow_fsync
+        try:
+            for i in range(2000):
+                engine.add_alarm(BASE + datetime.timedelta(seconds=i), label=str(i))
+            assert journal.flush(timeout=10)
+        finally:
+            alarm_journal.os.fsync = original_fsync
+        assert len(calls) < 50, len(calls)
+        # 所有 fsync 都在写入线程中完成，修改闹钟的线程从不等待磁盘
+        assert {thread.name for thread in calls} == {"AlarmJournal"}
+        assert len(AlarmJournal(journal.path).load()) == 2000
+        journal.close()
+
+
+def test_bulk_edit_is_one_write():
+    """去抖窗口内批量修改 5000 个闹钟（每个改两次）只写盘一次，每个闹钟只写一行"""
+    original_fsync = alarm_journal.os.fsync
+    calls = []
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        original_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = AlarmEngine()
+        journal = AlarmJournal(os.path.join(tmp, "alarms.json"), debounce=5.0, compact_bytes=1 << 30)
+        journal.attach(engine)
+        alarms = engine.add_alarms([{"time": BASE + datetime.timedelta(seconds=i)} for i in range(5000)])
+        assert journal.flush(timeout=5)
+        size = os.path.getsize(journal.journal_path)
+        alarm_journal.os.fsync = counting_fsync
+        try:
+            for alarm in alarms:
+                engine.update_alarm(alarm["id"], label="一")
+                engine.update_alarm(alarm["id"], label="二")
+            assert journal.pending == 5000
+            assert journal.flush(timeout=5)
+        finally:
+            alarm_journal.os.fsync = original_fsync
+        assert len(calls) == 1, len(calls)
+        with open(journal.journal_path, encoding='utf-8') as f:
+            f.seek(size)
+            assert len(f.readlines()) == 5000
+        assert {alarm["label"] for alarm in AlarmJournal(journal.path).load()} == {"二"}
+        journal.close()
+
+
+def test_background_compaction():
+    """日志超过阈值时在后台合并进快照，关闭时剩余日志也被合并"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.json")
+        engine = AlarmEngine()
+        journal = AlarmJournal(path, compact_bytes=4096)
+        journal.attach(engine)
+        for round_ in range(20):
+            for i in range(20):
+                engine.add_alarm(BASE + datetime.timedelta(minutes=i), label=f"{round_}-{i}")
+            assert journal.flush(timeout=5)
+        assert os.path.getsize(journal.journal_path) < 20 * 4096
+        journal.close()
+        assert not os.path.exists(journal.journal_path)
+        assert not os.path.exists(journal.rotated_path)
+        assert len(AlarmStore(path).load()) == 400
+
+
+def test_torn_write_and_repeated_replay():
+    """崩溃时写到一半的最后一行被丢弃；压缩中途崩溃留下的旧日志重放两次结果不变"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.json")
+        a = {"id": 1, "time": BASE.isoformat(), "label": "a", "snooze": 5}
+        b = {"id": 2, "time": BASE.isoformat(), "label": "b", "snooze": 5}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"alarms": [a, b]}, f)
+        with open(path + ".journal.1", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "add", "id": 1, "alarm": a}) + "\n")
+            f.write(json.dumps({"op": "add", "id": 2, "alarm": b}) + "\n")
+        with open(path + ".journal", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "delete", "id": 1, "alarm": None}) + "\n")
+            f.write('{"op": "add", "id": 3, "ala')
+        journal = AlarmJournal(path)
+        assert [alarm["label"] for alarm in journal.load()] == ["b"]
+        journal.record("edit", 2, dict(b, label="B"))
+        assert journal.flush(timeout=5)
+        assert [alarm["label"] for alarm in AlarmJournal(path).load()] == ["B"]
+        journal.close()
+        assert [alarm["label"] for alarm in AlarmStore(path).load()] == ["B"]
+
+
+def test_failed_write_is_retried():
+    """写盘失败时不算已写入：flush() 抛出错误，变更留待重试，之后的修改优先"""
+    original_fsync = alarm_journal.os.fsync
+    failures = [OSError(5, "模拟的磁盘错误")]
+
+    def failing_fsync(fd):
+        if failures:
+            raise failures.pop()
+        original_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarms.json")
+        engine = AlarmEngine()
+        journal = AlarmJournal(path)
+        journal.attach(engine)
+        alarm_journal.os.fsync = failing_fsync
+        try:
+            alarm = engine.add_alarm(BASE, label="失败")
+            try:
+                journal.flush(timeout=5)
+            except OSError as e:
+                assert e.errno == 5
+            else:
+                raise AssertionError("写盘失败时 flush() 应当抛出错误")
+            assert journal._durable < journal._queued
+            assert journal.pending == 1
+            engine.update_alarm(alarm["id"], label="重试")
+            assert journal.flush(timeout=5)
+        finally:
+            alarm_journal.os.fsync = original_fsync
+        assert journal.pending == 0
+        assert [item["label"] for item in AlarmJournal(path).load()] == ["重试"]
+        journal.close()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_replay_restores_every_mutation,
+        test_fsync_is_batched_and_non_blocking,
+        test_bulk_edit_is_one_write,
+        test_background_compaction,
+        test_torn_write_and_repeated_replay,
+        test_failed_write_is_retried,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试紧凑的闹钟记录（字典写法兼容、时间字段不重建、内存占用）
+"""
+import sys
+import os
+import datetime
+import tracemalloc
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_engine import AlarmEngine
+from alarm_record import AlarmRecord
+from alarm_store import alarm_from_json, alarm_to_json
+from recurrence import RecurrenceRule
+
+BASE = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+
+
+def test_behaves_like_dict():
+    """读写、删除、遍历、比较和复制与字典相同"""
+    fields = {"id": 7, "time": BASE, "label": "起床", "snooze": 5, "enabled": True,
+              "created_at": datetime.datetime(2024, 3, 10, 2, 30, 15, 123456), "recurrence": None,
+              "resume_time": None, "ringtone": "默认铃声", "volume": 0.5, "color": "红色"}
+    record = AlarmRecord(fields)
+    assert record == fields and fields == record
+    assert dict(record) == fields
+    assert set(record) == set(fields) and len(record) == len(fields)
+    assert record["created_at"] == fields["created_at"]
+    assert record.get("missing", 1) == 1 and "missing" not in record
+    assert "resume_time" in record and record["resume_time"] is None
+
+    record["label"] = "出门"
+    record.update({"snooze": 10}, color="蓝色")
+    assert (record["label"], record["snooze"], record["color"]) == ("出门", 10, "蓝色")
+    assert record.setdefault("occurrences", 0) == 0 and record["occurrences"] == 0
+    del record["color"], record["volume"]
+    assert "color" not in record and "volume" not in record
+    try:
+        record["volume"]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("删除的字段仍然存在")
+
+    copy = record.copy()
+    copy["label"] = "副本"
+    assert record["label"] == "出门"
+    assert alarm_from_json(alarm_to_json(record)) == record
+
+
+def test_times_are_kept_and_ringtones_shared():
+    """读取时间字段返回保存的 datetime 本身（不重新构造），铃声名称只保存一份"""
+    moment = datetime.datetime(1969, 12, 31, 23, 59, 59, 999999)
+    first = AlarmRecord(ringtone="".join(["默认", "铃声"]), time=BASE, created_at=moment)
+    second = AlarmRecord(ringtone="".join(["默认铃", "声"]), time=BASE)
+    assert first["ringtone"] is second["ringtone"]
+    assert first["time"] is BASE and first.get("time") is BASE and first.time is BASE
+    assert first["created_at"] is moment
+    first["resume_time"] = moment
+    assert first["resume_time"] is moment
+    assert second.get("created_at") is None and second.get("created_at", 1) == 1
+
+
+def test_engine_stores_records():
+    """引擎中的闹钟是 AlarmRecord，触发快照仍是字典"""
+    engine = AlarmEngine()
+    alarm = engine.add_alarm(BASE, label="a", recurrence=RecurrenceRule.daily(), ringtone="默认铃声")
+    batch = engine.add_alarms([{"time": BASE, "label": "b"}])
+    engine.load_alarms([{"id": 100, "time": BASE, "label": "c", "snooze": 5}])
+    assert all(type(item) is AlarmRecord for item in engine.alarms())
+    assert type(batch[0]) is AlarmRecord
+
+    fired = engine.run_pending(BASE)
+    assert sorted(item["label"] for item in fired) == ["a", "b", "c"]
+    assert all(type(item) is dict for item in fired)
+    assert engine.get_alarm(alarm["id"])["time"] == BASE + datetime.timedelta(days=1)
+    snoozed = engine.snooze(fired[1], 5, now=BASE)
+    assert type(snoozed) is AlarmRecord and snoozed["snoozed"]
+
+
+def test_uses_less_memory_than_dicts():
+    """大量闹钟时记录占用的内存约为字典的一半"""
+    count = 20000
+
+    def build(factory):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        created_at = datetime.datetime.now()
+        alarms = [factory({"id": i, "time": BASE + datetime.timedelta(seconds=i), "label": "", "snooze": 5,
+                           "enabled": True, "created_at": created_at + datetime.timedelta(microseconds=i),
+                           "recurrence": None, "occurrences": 0, "snoozed": False, "snooze_count": 0,
+                           "resume_time": None, "ringtone": "默认铃声", "local_music_path": None})
+                  for i in range(count)]
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del alarms
+        return used / count
+
+    dict_bytes = build(dict)
+    record_bytes = build(AlarmRecord)
+    assert record_bytes < dict_bytes * 0.6, f"{record_bytes:.0f} vs {dict_bytes:.0f} 字节/个"
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_behaves_like_dict,
+        test_times_are_kept_and_ringtones_shared,
+        test_engine_stores_records,
+        test_uses_less_memory_than_dicts,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+测试单独启动的界面作为客户端连接守护进程（subscribe、到期推送、断开后守护进程响铃）
+"""
+import sys
+import os
+import datetime
+import tempfile
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_daemon import AlarmDaemon
+from alarm_engine import AlarmEngine
+from alarm_ipc import AlarmIPCServer, IPCError
+from alarm_remote import RemoteAlarmEngine
+from recurrence import RecurrenceRule
+from single_instance import hand_off
+
+
+def _wait(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_attached_client_receives_alarms():
+    """订阅的界面收到到期的闹钟，守护进程不自己响铃；断开后重新由守护进程响铃"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        daemon = AlarmDaemon(socket_path=path)
+        rung = []
+        daemon._ring = rung.append
+        daemon.start()
+        remote = RemoteAlarmEngine(path)
+        try:
+            fired = []
+            received = threading.Event()
+            remote.add_listener(lambda alarms: fired.extend(alarms) or received.set())
+            remote.start()
+            assert _wait(daemon.is_attached)
+
+            alarm = remote.add_alarm(datetime.datetime.now() + datetime.timedelta(seconds=0.2), label="界面",
+                                     ringtone="默认铃声")
+            assert received.wait(5)
+            assert [(item['id'], item['label'], item['ringtone']) for item in fired] == [(alarm['id'], "界面", "默认铃声")]
+            assert rung == []
+
+            # 贪睡由守护进程以同一个ID改期，本地副本随之更新
+            snoozed = remote.snooze(fired[0], 5)
+            assert snoozed['id'] == alarm['id'] and snoozed['snoozed']
+            assert remote.get_alarm(alarm['id'])['snooze_count'] == 1
+
+            remote.stop()
+            assert _wait(lambda: not daemon.is_attached())
+            daemon.engine.add_alarm(datetime.datetime.now(), label="守护")
+            assert _wait(lambda: rung)
+            assert [item['label'] for item in rung[0]] == ["守护"]
+        finally:
+            remote.stop()
+            daemon.stop()
+            daemon.shutdown()
+
+
+def test_mirror_follows_changes_and_activate():
+    """其他客户端的修改推送给界面刷新副本，再次启动的程序激活已连接的界面"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        daemon = AlarmDaemon(socket_path=path)
+        daemon.start()
+        remote = RemoteAlarmEngine(path)
+        try:
+            changed = threading.Event()
+            activated = []
+            remote.add_change_listener(changed.set)
+            remote.add_activate_listener(activated.append)
+            remote.start()
+
+            later = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=2)
+            daemon.engine.add_alarm(later, label="外部", recurrence=RecurrenceRule.daily())
+            assert changed.wait(5)
+            assert _wait(lambda: len(remote) == 1)
+            assert remote.next_deadline() == (int(later.timestamp()), "外部")
+            assert remote.alarms()[0]['recurrence'] == RecurrenceRule.daily()
+
+            alarm_id = remote.alarms()[0]['id']
+            edited = remote.update_alarm(alarm_id, label="改名", recurrence=None)
+            assert edited['label'] == "改名" and edited['recurrence'] is None
+            assert daemon.engine.get_alarm(alarm_id)['label'] == "改名"
+            assert remote.update_alarm(999, label="x") is None
+            assert remote.remove_alarm(alarm_id)['id'] == alarm_id
+            assert remote.remove_alarm(alarm_id) is None
+            remote.add_alarm(later, label="a")
+            remote.add_alarm(later, label="b")
+            assert remote.clear() == 2 and len(daemon.engine) == 0
+
+            response = hand_off([{'op': 'activate', 'argv': ["--asyncio"]}], path, timeout=5)[0]
+            assert response['result']['activated'] is True
+            assert _wait(lambda: activated == [["--asyncio"]])
+        finally:
+            remote.stop()
+            daemon.stop()
+            daemon.shutdown()
+
+
+def test_subscribe_requires_daemon():
+    """图形界面自己提供的控制接口不接受订阅"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        server = AlarmIPCServer(AlarmEngine(), path)
+        server.start()
+        remote = RemoteAlarmEngine(path)
+        try:
+            remote.start()
+        except IPCError:
+            pass
+        else:
+            raise AssertionError("没有守护进程时订阅应当失败")
+        finally:
+            remote.stop()
+            server.stop()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_attached_client_receives_alarms,
+        test_mirror_follows_changes_and_activate,
+        test_subscribe_requires_daemon,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+测试闹钟调度器（最小堆 + 惰性删除）
+"""
+import sys
+import os
+import datetime
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_scheduler import AlarmScheduler, DeadlineWaiter, seconds_until
+
+BASE = datetime.datetime(2024, 1, 1, 8, 0, 0)
+
+
+def test_pop_due_in_time_order():
+    """到期闹钟按触发时间顺序弹出，未到期的保留"""
+    scheduler = AlarmScheduler()
+    scheduler.schedule(1, BASE + datetime.timedelta(minutes=10), {"id": 1})
+    scheduler.schedule(2, BASE + datetime.timedelta(minutes=5), {"id": 2})
+    scheduler.schedule(3, BASE + datetime.timedelta(hours=2), {"id": 3})
+
+    due = scheduler.pop_due(BASE + datetime.timedelta(minutes=30))
+    assert [alarm_id for alarm_id, _ in due] == [2, 1]
+    assert len(scheduler) == 1
+    assert scheduler.next_fire_time() == BASE + datetime.timedelta(hours=2)
+
+
+def test_cancel_is_lazy_and_skipped():
+    """取消的闹钟不会被弹出，也不会出现在堆顶"""
+    scheduler = AlarmScheduler()
+    scheduler.schedule(1, BASE, {"id": 1})
+    scheduler.schedule(2, BASE + datetime.timedelta(minutes=1), {"id": 2})
+
+    assert scheduler.cancel(1)
+    assert not scheduler.cancel(1)
+    assert 1 not in scheduler
+    assert scheduler.peek()[1] == 2
+    assert [alarm_id for alarm_id, _ in scheduler.pop_due(BASE + datetime.timedelta(days=1))] == [2]
+
+
+def test_reschedule_replaces_entry():
+    """同一ID重新调度后只保留最新的触发时间"""
+    scheduler = AlarmScheduler()
+    scheduler.schedule(1, BASE, {"id": 1})
+    scheduler.schedule(1, BASE + datetime.timedelta(hours=1), {"id": 1})
+
+    assert scheduler.pop_due(BASE + datetime.timedelta(minutes=1)) == []
+    assert len(scheduler) == 1
+    assert scheduler.next_fire_time() == BASE + datetime.timedelta(hours=1)
+
+
+def test_schedule_many_keeps_heap_order():
+    """批量调度与逐个调度结果一致，可以替换已有条目"""
+    scheduler = AlarmScheduler()
+    scheduler.schedule(1, BASE + datetime.timedelta(minutes=30), {"id": 1})
+    count = scheduler.schedule_many((i, BASE + datetime.timedelta(minutes=100 - i), {"id": i}) for i in range(1, 101))
+    assert count == 100
+    assert len(scheduler) == 100
+    due = scheduler.pop_due(BASE + datetime.timedelta(days=1))
+    assert [alarm_id for alarm_id, _ in due] == list(range(100, 0, -1))
+
+
+def test_compaction_bounds_heap_size():
+    """反复改期后堆大小保持在有效条目的常数倍以内"""
+    scheduler = AlarmScheduler()
+    for i in range(1000):
+        scheduler.schedule(1, BASE + datetime.timedelta(seconds=i))
+    assert len(scheduler) == 1
+    assert len(scheduler._heap) <= AlarmScheduler.COMPACT_RATIO + 64 + 1
+
+
+def test_waiter_times_out_at_deadline():
+    """等待器在截止时间到达时返回 False"""
+    waiter = DeadlineWaiter()
+    start = time.monotonic()
+    assert waiter.wait_until(datetime.datetime.now() + datetime.timedelta(seconds=0.1)) is False
+    assert 0.05 <= time.monotonic() - start < 1.0
+
+
+def test_waiter_wakes_on_notify():
+    """其他线程调用 notify() 时等待立即返回 True"""
+    waiter = DeadlineWaiter()
+    timer = threading.Timer(0.05, waiter.notify)
+    timer.start()
+    start = time.monotonic()
+    assert waiter.wait_until(None) is True
+    assert time.monotonic() - start < 5
+    timer.join()
+
+
+def test_waiter_keeps_early_notification():
+    """等待开始前的通知不会丢失"""
+    waiter = DeadlineWaiter()
+    waiter.notify()
+    assert waiter.wait_until(datetime.datetime.now() + datetime.timedelta(hours=1)) is True
+    assert seconds_until(datetime.datetime.now() - datetime.timedelta(seconds=5)) == 0.0
+
+
+def test_scheduler_changes_wake_waiter():
+    """调度器的增删会唤醒 wait_for_next()"""
+    scheduler = AlarmScheduler()
+    scheduler.schedule(1, datetime.datetime.now() + datetime.timedelta(hours=1))
+    scheduler.wait_for_next()  # 消费 schedule() 产生的通知
+    timer = threading.Timer(0.05, scheduler.cancel, args=(1,))
+    timer.start()
+    assert scheduler.wait_for_next() is True
+    timer.join()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_pop_due_in_time_order,
+        test_cancel_is_lazy_and_skipped,
+        test_reschedule_replaces_entry,
+        test_schedule_many_keeps_heap_order,
+        test_compaction_bounds_heap_size,
+        test_waiter_times_out_at_deadline,
+        test_waiter_wakes_on_notify,
+        test_waiter_keeps_early_notification,
+        test_scheduler_changes_wake_waiter,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
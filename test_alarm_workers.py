@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+测试固定大小的工作线程池
+"""
+import sys
+import os
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_workers import CancelToken, WorkerPool
+
+
+def test_tasks_run_on_fixed_threads():
+    """大量任务只在固定数量的工作线程上执行"""
+    pool = WorkerPool(size=2)
+    names = set()
+    done = threading.Event()
+    lock = threading.Lock()
+    count = [0]
+
+    def task(token):
+        with lock:
+            names.add(threading.current_thread().name)
+            count[0] += 1
+            if count[0] == 200:
+                done.set()
+
+    for _ in range(200):
+        pool.submit(task)
+    assert done.wait(5)
+    assert len(names) <= 2
+    pool.shutdown()
+
+
+def test_cancel_stops_running_task():
+    """取消令牌让正在等待的任务立即结束"""
+    pool = WorkerPool(size=1)
+    started = threading.Event()
+    finished = threading.Event()
+
+    def ring(token):
+        started.set()
+        while not token.cancelled:
+            token.wait(300)
+        finished.set()
+
+    token = pool.submit(ring)
+    assert started.wait(5)
+    begin = time.monotonic()
+    token.cancel()
+    assert finished.wait(5)
+    assert time.monotonic() - begin < 1
+    pool.shutdown()
+
+
+def test_cancelled_before_start_is_skipped():
+    """排队中被取消的任务不会执行"""
+    pool = WorkerPool(size=1)
+    gate = threading.Event()
+    ran = []
+    pool.submit(lambda token: gate.wait(5))
+    token = pool.submit(lambda token: ran.append(True))
+    token.cancel()
+    gate.set()
+    pool.shutdown(cancel_pending=False)
+    assert ran == []
+    assert pool.pending() == 0
+
+
+def test_shutdown_is_deterministic():
+    """shutdown() 取消未完成的任务并等待线程退出，之后不能再提交"""
+    pool = WorkerPool(size=2)
+    for _ in range(4):
+        pool.submit(lambda token: token.wait(300))
+    begin = time.monotonic()
+    pool.shutdown(timeout=5)
+    assert time.monotonic() - begin < 2
+    assert not any(thread.is_alive() for thread in pool._threads)
+    try:
+        pool.submit(lambda token: None)
+    except RuntimeError:
+        pass
+    else:
+        assert False, "关闭后提交任务应抛出 RuntimeError"
+
+
+def test_shared_token_and_errors():
+    """共享令牌可一起取消多个任务，任务异常不影响工作线程"""
+    pool = WorkerPool(size=1)
+    token = CancelToken()
+    results = []
+    pool.submit(lambda token: 1 / 0)
+    pool.submit(lambda token: results.append("ok"), token=token)
+    pool.shutdown(cancel_pending=False)
+    assert results == ["ok"]
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_tasks_run_on_fixed_threads,
+        test_cancel_stops_running_task,
+        test_cancelled_before_start_is_skipped,
+        test_shutdown_is_deterministic,
+        test_shared_token_and_errors,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
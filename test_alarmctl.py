@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+测试 alarmctl 非交互式命令行客户端
+"""
+import sys
+import os
+import contextlib
+import datetime
+import io
+import subprocess
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_daemon import AlarmDaemon
+from alarm_store import AlarmStore
+from alarmctl import main as alarmctl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run(*argv):
+    """运行 alarmctl，返回 (退出码, 标准输出)"""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+        code = alarmctl(list(argv))
+    return code, out.getvalue()
+
+
+def test_offline_edits_store():
+    """守护进程未运行时直接修改闹钟文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "alarms.json")
+        common = ["--socket", os.path.join(tmp, "missing.sock"), "--store", store]
+        code, out = _run(*common, "add", "07:30", "-l", "起床", "-r", "工作日")
+        assert code == 0 and "起床" in out and "工作日" in out
+        assert _run(*common, "add", "23:59", "-l", "睡觉")[0] == 0
+        assert [alarm['label'] for alarm in AlarmStore(store).load()] == ["起床", "睡觉"]
+        code, out = _run(*common, "list")
+        assert out.count("\n") == 2
+        assert _run(*common, "rm", "1")[0] == 0
+        assert [alarm['label'] for alarm in AlarmStore(store).load()] == ["睡觉"]
+        assert _run(*common, "rm", "1")[0] == 1
+
+
+def test_daemon_import_csv():
+    """守护进程运行时通过控制接口批量导入，next 显示最早的闹钟"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sock = os.path.join(tmp, "alarm.sock")
+        store = os.path.join(tmp, "alarms.json")
+        csv_path = os.path.join(tmp, "alarms.csv")
+        base = datetime.datetime.now().replace(second=0, microsecond=0) + datetime.timedelta(hours=1)
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("time,label,repeat,snooze\n")
+            for i in range(1000):
+                f.write(f"{(base + datetime.timedelta(minutes=i)).isoformat()},导入{i},,3\n")
+        daemon = AlarmDaemon(socket_path=sock)
+        daemon.start()
+        try:
+            code, out = _run("--socket", sock, "--store", store, "import", csv_path)
+            assert code == 0 and "1000" in out, out
+            assert len(daemon.engine) == 1000
+            assert daemon.engine.get_alarm(1)['snooze'] == 3
+            assert "导入0" in _run("--socket", sock, "next")[1]
+            assert not os.path.exists(store)
+        finally:
+            daemon.stop()
+            daemon.shutdown()
+
+
+def test_alarm_clock_forwards_subcommands():
+    """alarm_clock.py 把子命令转发给 alarmctl，不进入交互模式"""
+    with tempfile.TemporaryDirectory() as tmp:
+        args = ["--socket", os.path.join(tmp, "missing.sock"), "--store", os.path.join(tmp, "alarms.json")]
+        result = subprocess.run([sys.executable, "alarm_clock.py", "list", *args], cwd=HERE,
+                                capture_output=True, text=True, timeout=30, stdin=subprocess.DEVNULL)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "没有闹钟"
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_offline_edits_store,
+        test_daemon_import_csv,
+        test_alarm_clock_forwards_subcommands,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
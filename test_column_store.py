@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+测试列式提醒索引（与时间轮行为一致、批量追加、压缩、接下来 N 个、按天查询）
+"""
+import sys
+import os
+import random
+import datetime
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import column_store
+from column_store import ColumnStore
+from timing_wheel import TimingWheel
+from visual_alarm_clock import COLUMN_STORE_THRESHOLD, make_schedule_index
+
+START = 1_700_000_000
+
+
+def test_matches_timing_wheel_behaviour():
+    """到期按时间顺序返回，取消和改期与时间轮相同"""
+    store = ColumnStore()
+    store.add("day", START + 86400, "d")
+    store.add("sec", START + 5, "s")
+    store.add("min", START + 600, "m")
+    assert store.next_expiry() == START + 5
+    assert store.advance(START + 4) == []
+    assert store.advance(START + 600) == [("sec", "s"), ("min", "m")]
+    assert "day" in store and "sec" not in store and len(store) == 1
+
+    store.add(1, START + 30)
+    assert store.cancel(1) and not store.cancel(1)
+    store.add("day", START + 10, "d2")
+    assert store.get("day") == "d2"
+    assert store.advance(START + 100) == [("day", "d2")]
+    assert store.next_expiry() is None
+
+    store.add("late", START - 60)
+    store.clear()
+    assert len(store) == 0 and store.advance(START) == []
+
+
+def test_matches_linear_scan():
+    """随机批量追加、取消和推进时与逐个比较的线性扫描结果一致"""
+    rng = random.Random(7)
+    store = ColumnStore()
+    pending = {}
+    for batch in range(5):
+        items = [(key, START + rng.randint(1000, 40 * 86400 * 1000) / 1000, key)
+                 for key in range(batch * 3000, (batch + 1) * 3000)]
+        # 同一批中重复的键只保留最后一个
+        items.append((items[0][0], START + 7, items[0][0]))
+        assert store.extend(items) == len(items)
+        pending.update((key, deadline) for key, deadline, _ in items)
+    removed = rng.sample(sorted(pending), 4000)
+    assert store.cancel_many(removed) == len(removed)
+    for key in removed:
+        del pending[key]
+    assert len(store) == len(pending)
+
+    now = START
+    while pending:
+        assert store.next_expiry() == min(pending.values())
+        now += rng.randint(0, 3 * 86400)
+        expected = sorted((deadline, key) for key, deadline in pending.items() if deadline <= now)
+        assert [(when, key) for when, key, _ in store.due(now)] == expected
+        assert [key for key, _ in store.advance(now)] == [key for _, key in expected]
+        for _, key in expected:
+            del pending[key]
+
+
+def test_compacts_deleted_rows():
+    """删除的行超过一半时压缩，数组不随反复改期无限增长"""
+    store = ColumnStore()
+    for round_ in range(50):
+        store.extend((key, START + round_ * 60 + key, round_) for key in range(1000))
+    assert len(store) == 1000
+    assert store._size <= 2 * len(store)
+    assert store.get(999) == 49
+    assert store.next_expiry() == START + 49 * 60
+
+
+def test_upcoming_and_enabled_mask():
+    """接下来 N 个按时间排序并跳过停用的提醒"""
+    store = ColumnStore()
+    store.extend((key, START + key * 10, None) for key in range(5000))
+    # 追加的行还在未排序的尾部
+    store.extend([("tail", START + 15, None), ("off", START + 1, None)])
+    store.set_enabled("off", False)
+    for key in range(0, 200, 2):
+        store.set_enabled(key, False)
+    upcoming = [key for _, key, _ in store.upcoming(5)]
+    assert upcoming == [1, "tail", 3, 5, 7]
+    assert [key for _, key, _ in store.upcoming(2, after=START + 70)] == [9, 11]
+    assert store.advance(START + 5) == []
+    assert "off" in store and not store.set_enabled("missing", True)
+    store.set_enabled("off", True)
+    assert store.advance(START + 5) == [("off", None)]
+
+
+def test_day_range():
+    """按本地日期查询当天到期的提醒，不包括次日零点"""
+    day = datetime.date(2024, 3, 10)
+    midnight = datetime.datetime.combine(day, datetime.time())
+    store = ColumnStore()
+    for key, offset in (("before", -1), ("start", 0), ("noon", 12 * 3600), ("next", 86400)):
+        store.add(key, (midnight + datetime.timedelta(seconds=offset)).timestamp())
+    assert [key for _, key, _ in store.on_day(day)] == ["start", "noon"]
+
+
+def test_merges_unsorted_tail():
+    """未排序的尾部变长后并入已排序部分"""
+    store = ColumnStore()
+    store.extend((key, START - key, None) for key in range(column_store.MIN_MERGE + 1))
+    assert store._sorted == store._size
+    assert store.next_expiry() == START - column_store.MIN_MERGE
+
+
+def test_schedule_index_choice():
+    """日程提醒按数量或设置选择时间轮或列式索引"""
+    assert isinstance(make_schedule_index(), TimingWheel)
+    assert isinstance(make_schedule_index(COLUMN_STORE_THRESHOLD - 1), TimingWheel)
+    assert isinstance(make_schedule_index(COLUMN_STORE_THRESHOLD), ColumnStore)
+    assert isinstance(make_schedule_index(column_store=True), ColumnStore)
+    assert isinstance(make_schedule_index(COLUMN_STORE_THRESHOLD, column_store=False), TimingWheel)
+
+
+def test_schedule_index_paths_agree():
+    """两种日程索引对同样的增删改期返回相同的到期提醒"""
+    now = int(time.time())
+    results = []
+    for column_store_setting in (False, True):
+        index = make_schedule_index(column_store=column_store_setting)
+        for key in range(50):
+            index.add(key, now + 10 + key * 7 % 30, f"日程{key}")
+        for key in range(0, 50, 5):
+            index.cancel(key)
+        index.add(3, now + 100, "改期")
+        first = index.next_expiry()
+        due = index.advance(now + 40) + index.advance(now + 120)
+        results.append((int(first), sorted(due), len(index)))
+    assert results[0] == results[1]
+    assert results[0][2] == 0
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_matches_timing_wheel_behaviour,
+        test_matches_linear_scan,
+        test_compacts_deleted_rows,
+        test_upcoming_and_enabled_mask,
+        test_day_range,
+        test_merges_unsorted_tail,
+        test_schedule_index_choice,
+        test_schedule_index_paths_agree,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+测试闹钟重复规则和引擎中的重复闹钟
+"""
+import sys
+import os
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_engine import AlarmEngine
+from recurrence import RecurrenceRule
+
+FRIDAY = datetime.datetime(2024, 1, 5, 7, 30)  # 2024-01-05 是周五
+
+
+def test_daily_and_interval():
+    """每天和每N分钟的规则按固定步长前进"""
+    assert RecurrenceRule.daily().next_after(FRIDAY) == FRIDAY + datetime.timedelta(days=1)
+    rule = RecurrenceRule.every_minutes(15)
+    assert rule.next_after(FRIDAY) == FRIDAY + datetime.timedelta(minutes=15)
+
+
+def test_weekdays_skip_weekend():
+    """工作日规则从周五跳到下周一，周末规则从周日跳到下周六"""
+    assert RecurrenceRule.weekdays_only().next_after(FRIDAY) == FRIDAY + datetime.timedelta(days=3)
+    sunday = FRIDAY + datetime.timedelta(days=2)
+    assert RecurrenceRule.weekends().next_after(sunday) == sunday + datetime.timedelta(days=6)
+    assert RecurrenceRule.weekdays_only().first_on_or_after(sunday) == sunday + datetime.timedelta(days=1)
+
+
+def test_monthly_clamps_to_month_end():
+    """按月规则在当月没有该日期时取月末，之后恢复原日期"""
+    rule = RecurrenceRule.monthly(31)
+    jan = datetime.datetime(2024, 1, 31, 9, 0)
+    feb = rule.next_after(jan)
+    assert feb == datetime.datetime(2024, 2, 29, 9, 0)
+    assert rule.next_after(feb) == datetime.datetime(2024, 3, 31, 9, 0)
+    assert rule.first_on_or_after(datetime.datetime(2024, 4, 2, 9, 0)) == datetime.datetime(2024, 4, 30, 9, 0)
+
+
+def test_count_and_until_end_series():
+    """达到次数或超过结束时间后返回 None"""
+    rule = RecurrenceRule.daily(count=2)
+    assert rule.next_after(FRIDAY, occurrences=1) is not None
+    assert rule.next_after(FRIDAY, occurrences=2) is None
+    rule = RecurrenceRule.daily(until=FRIDAY + datetime.timedelta(days=1))
+    assert rule.next_after(FRIDAY) == FRIDAY + datetime.timedelta(days=1)
+    assert rule.next_after(FRIDAY + datetime.timedelta(days=1)) is None
+
+
+def test_missed_occurrences_are_skipped():
+    """错过的触发被跳过，直接返回晚于当前时间的下一次"""
+    now = FRIDAY + datetime.timedelta(days=10, minutes=1)
+    assert RecurrenceRule.daily().next_after(FRIDAY, now=now) == FRIDAY + datetime.timedelta(days=11)
+    assert RecurrenceRule.every_minutes(60).next_after(FRIDAY, now=now) == FRIDAY + datetime.timedelta(days=10, hours=1)
+    assert RecurrenceRule.weekdays_only().next_after(FRIDAY, now=now) == FRIDAY + datetime.timedelta(days=11)
+
+
+def test_engine_keeps_one_entry_per_rule():
+    """重复闹钟触发后以同一ID改期，调度器中只保留一个条目"""
+    engine = AlarmEngine()
+    alarm = engine.add_alarm(FRIDAY, label="交班", recurrence=RecurrenceRule.every_minutes(30, count=3))
+    times = []
+    now = FRIDAY
+    while len(engine):
+        fired = engine.run_pending(now)
+        times.extend(item["time"] for item in fired)
+        assert len(engine.scheduler) == len(engine)
+        now += datetime.timedelta(minutes=30)
+    assert times == [FRIDAY + datetime.timedelta(minutes=30 * i) for i in range(3)]
+    assert engine.get_alarm(alarm["id"]) is None
+
+
+def test_snooze_of_recurring_alarm_resumes_rule():
+    """重复闹钟贪睡后以原ID响一次，然后回到规则原定的下一次，不计入次数"""
+    engine = AlarmEngine()
+    alarm = engine.add_alarm(FRIDAY, recurrence=RecurrenceRule.daily(count=3))
+    fired = engine.run_pending(FRIDAY)
+    snoozed = engine.snooze(fired[0], 5, now=FRIDAY)
+    assert snoozed is engine.get_alarm(alarm["id"])
+    assert snoozed["time"] == FRIDAY + datetime.timedelta(minutes=5)
+    assert snoozed["resume_time"] == FRIDAY + datetime.timedelta(days=1)
+    engine.run_pending(FRIDAY + datetime.timedelta(minutes=5))
+    resumed = engine.get_alarm(alarm["id"])
+    assert resumed["time"] == FRIDAY + datetime.timedelta(days=1)
+    assert resumed["occurrences"] == 1 and not resumed["snoozed"]
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_daily_and_interval,
+        test_weekdays_skip_weekend,
+        test_monthly_clamps_to_month_end,
+        test_count_and_until_end_series,
+        test_missed_occurrences_are_skipped,
+        test_engine_keeps_one_entry_per_rule,
+        test_snooze_of_recurring_alarm_resumes_rule,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
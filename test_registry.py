@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试按ID索引的记录表和闹钟引擎的批量删除
+"""
+import sys
+import os
+import datetime
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_engine import AlarmEngine
+from registry import IdRegistry
+
+BASE = datetime.datetime(2024, 1, 1, 8, 0, 0)
+
+
+def test_ids_are_never_reused():
+    """删除后新记录的ID不会与已删除的ID重复"""
+    registry = IdRegistry()
+    first = registry.add({"title": "a"})
+    second = registry.add({"title": "b"})
+    registry.remove(second["id"])
+    registry.clear()
+    third = registry.add({"title": "c"})
+    assert (first["id"], second["id"], third["id"]) == (1, 2, 3)
+
+
+def test_put_advances_allocator():
+    """按已有ID恢复的记录不会与之后分配的ID冲突"""
+    registry = IdRegistry()
+    registry.put({"id": 10, "title": "restored"})
+    assert registry.add({"title": "new"})["id"] == 11
+    assert registry.get(10)["title"] == "restored"
+
+
+def test_remove_many_keeps_order_of_rest():
+    """批量删除忽略不存在的ID，其余记录保持添加顺序"""
+    registry = IdRegistry()
+    for i in range(10):
+        registry.add({"n": i})
+    removed = registry.remove_many([2, 4, 6, 99])
+    assert [record["id"] for record in removed] == [2, 4, 6]
+    assert [record["n"] for record in registry] == [0, 2, 4, 6, 7, 8, 9]
+
+
+def test_engine_bulk_delete_is_lazy():
+    """引擎批量删除数千个闹钟不逐个整理堆、只唤醒一次，且不会再触发（耗时见 bench_alarm_engine.py）"""
+    engine = AlarmEngine()
+    alarms = [engine.add_alarm(BASE + datetime.timedelta(seconds=i)) for i in range(20000)]
+    victims = [alarm["id"] for alarm in alarms[::2]]
+    scheduler = engine.scheduler
+    heap_size = len(scheduler._heap)
+    wakeups = []
+    notify = scheduler.waiter.notify
+    scheduler.waiter.notify = lambda: wakeups.append(1) or notify()
+    removed = engine.remove_alarms(victims)
+    assert len(removed) == 10000
+    # 惰性删除：堆中的条目原样保留，只从索引中移除
+    assert len(scheduler._heap) == heap_size
+    assert len(scheduler) == 10000
+    assert len(wakeups) == 1
+    fired = engine.run_pending(BASE + datetime.timedelta(days=1))
+    assert [alarm["id"] for alarm in fired] == [alarm["id"] for alarm in alarms[1::2]]
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_ids_are_never_reused,
+        test_put_advances_allocator,
+        test_remove_many_keeps_order_of_rest,
+        test_engine_bulk_delete_is_lazy,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
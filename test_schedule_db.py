@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+测试 SQLite 日程存储（增删改、按提醒时间查询、分页）
+"""
+import sys
+import os
+import datetime
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_db import ScheduleDB
+
+BASE = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+
+
+def _schedule(minutes, title="", reminder_minutes=None):
+    schedule_time = BASE + datetime.timedelta(minutes=minutes)
+    reminder_time = None
+    if reminder_minutes is not None:
+        reminder_time = schedule_time - datetime.timedelta(minutes=reminder_minutes)
+    return {"time": schedule_time, "title": title, "content": "", "reminder": "", "reminder_time": reminder_time}
+
+
+def test_crud_round_trip():
+    """添加、修改、删除日程，重新打开数据库后内容不变"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedules.db")
+        db = ScheduleDB(path)
+        first = db.add(_schedule(10, "会议", reminder_minutes=5))
+        second = db.add(_schedule(20, "午饭"))
+        assert (first, second) == (1, 2)
+        assert db.update(first, title="周会")
+        assert not db.update(99, title="不存在")
+        assert db.remove_many([second, 99]) == [second]
+        db.close()
+
+        db = ScheduleDB(path)
+        assert len(db) == 1
+        schedule = db.get(first)
+        assert schedule["title"] == "周会"
+        assert schedule["time"] == BASE + datetime.timedelta(minutes=10)
+        assert schedule["reminder_time"] == BASE + datetime.timedelta(minutes=5)
+        assert db.get(second) is None
+        # 删除后ID不会重复
+        assert db.add(_schedule(30)) == 3
+        assert db.clear() == 2
+        assert len(db) == 0
+        db.close()
+
+
+def test_upcoming_orders_by_reminder_time():
+    """upcoming 只返回待提醒的日程，并按提醒时间排序"""
+    db = ScheduleDB(":memory:")
+    db.add_many([_schedule(30, "c", reminder_minutes=0), _schedule(10, "a", reminder_minutes=0),
+                 _schedule(5, "不提醒"), _schedule(20, "b", reminder_minutes=0)])
+    assert [schedule["title"] for schedule in db.upcoming(10)] == ["a", "b", "c"]
+    assert [schedule["title"] for schedule in db.upcoming(2)] == ["a", "b"]
+    # 已提醒的日程不再出现
+    db.update(db.upcoming(1)[0]["id"], reminder_time=None)
+    assert [schedule["title"] for schedule in db.upcoming(10)] == ["b", "c"]
+    db.close()
+
+
+def test_page_orders_by_time():
+    """page 按日程时间分页读取"""
+    db = ScheduleDB(":memory:")
+    db.add_many([_schedule(minutes, str(minutes)) for minutes in range(25, 0, -1)])
+    pages = [[schedule["title"] for schedule in db.page(offset, 10)] for offset in (0, 10, 20)]
+    assert pages[0] == [str(minutes) for minutes in range(1, 11)]
+    assert pages[2] == [str(minutes) for minutes in range(21, 26)]
+    assert db.page(30, 10) == []
+    db.close()
+
+
+def test_many_schedules():
+    """十万个日程：查询最近提醒和读取一页都按索引顺序读取，不扫描排序全表（耗时见 bench_schedule_db.py）"""
+    db = ScheduleDB(":memory:")
+    count = 100000
+    db.add_many([_schedule(minutes, reminder_minutes=1) for minutes in range(count)])
+    assert len(db) == count
+    assert len(db.remove_many(range(1, 1001))) == 1000
+
+    statements = []
+    db._conn.set_trace_callback(statements.append)
+    upcoming = db.upcoming(256)
+    page = db.page(50000, 100)
+    db._conn.set_trace_callback(None)
+    assert upcoming[0]["id"] == 1001 and len(upcoming) == 256
+    assert len(page) == 100
+    assert len(statements) == 2
+
+    plans = [" ".join(row[3] for row in db._conn.execute("EXPLAIN QUERY PLAN " + sql)) for sql in statements]
+    assert "USING INDEX schedules_reminder_time" in plans[0], plans[0]
+    assert "USING INDEX schedules_time" in plans[1], plans[1]
+    assert not any("TEMP B-TREE" in plan for plan in plans), plans
+    db.close()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_crud_round_trip,
+        test_upcoming_orders_by_reminder_time,
+        test_page_orders_by_time,
+        test_many_schedules,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+测试单实例协调（锁文件 + 把启动参数交给已运行的实例）
+"""
+import sys
+import os
+import json
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_engine import AlarmEngine
+import alarm_ipc
+from alarm_ipc import AlarmIPCServer
+from single_instance import InstanceLock, hand_off, lock_path_for
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_lock_is_exclusive():
+    """锁被持有时第二次获取失败，释放后可以重新获取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "instance.lock")
+        first = InstanceLock(path)
+        assert first.acquire()
+        second = InstanceLock(path)
+        assert not second.acquire()
+        assert second.owner_pid() == os.getpid()
+        first.release()
+        assert second.acquire()
+        second.release()
+
+
+def test_lock_released_when_process_exits():
+    """持有锁的进程退出后锁自动释放"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "instance.lock")
+        code = f"from single_instance import InstanceLock; assert InstanceLock({path!r}).acquire()"
+        assert subprocess.run([sys.executable, "-c", code], cwd=HERE).returncode == 0
+        lock = InstanceLock(path)
+        assert lock.acquire()
+        lock.release()
+
+
+def test_hand_off_waits_for_listener():
+    """实例刚启动还没开始监听时，交接会等待并重试"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        server = AlarmIPCServer(AlarmEngine(), path)
+        activated = []
+        server.controller.add_activate_listener(activated.append)
+        timer = threading.Timer(0.3, server.start)
+        timer.start()
+        try:
+            responses = hand_off([{'op': 'activate', 'argv': ["--asyncio"]}], path, timeout=5)
+            assert responses[0]['result'] == {'pid': os.getpid(), 'activated': True}
+            assert activated == [["--asyncio"]]
+        finally:
+            timer.join()
+            server.stop()
+
+
+def test_headless_instance_reports_no_window():
+    """没有界面的实例收到 activate 时报告没有窗口可以显示"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alarm.sock")
+        server = AlarmIPCServer(AlarmEngine(), path)
+        server.start()
+        try:
+            response = hand_off([{'op': 'activate', 'argv': []}], path, timeout=5)[0]
+            assert response['ok'] and response['result']['activated'] is False
+        finally:
+            server.stop()
+
+
+def test_tcp_transport_without_unix_sockets():
+    """没有 Unix 套接字时改用本机 TCP 端口交接，令牌不符的连接被断开"""
+    original = alarm_ipc.UNIX_SOCKETS
+    alarm_ipc.UNIX_SOCKETS = False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "alarm.sock")
+            server = AlarmIPCServer(AlarmEngine(), path)
+            server.start()
+            try:
+                with open(path, encoding='utf-8') as f:
+                    address = json.load(f)
+                assert os.stat(path).st_mode & 0o777 == 0o600
+                responses = hand_off([{'op': 'ping'}, {'op': 'activate', 'argv': []}], path, timeout=5)
+                assert [response['ok'] for response in responses] == [True, True]
+
+                with socket.create_connection((alarm_ipc.TCP_HOST, address['port']), timeout=5) as sock:
+                    sock.sendall(b'{"token": "wrong"}\n{"op": "ping"}\n')
+                    assert sock.recv(1024) == b""
+            finally:
+                server.stop()
+            assert not os.path.exists(path)
+    finally:
+        alarm_ipc.UNIX_SOCKETS = original
+
+
+def test_second_daemon_hands_off_and_exits():
+    """第二个守护进程把参数交给第一个后立即退出，第一个继续运行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sock = os.path.join(tmp, "alarm.sock")
+        args = [sys.executable, "alarm_daemon.py", "--no-store", "--socket", sock]
+        first = subprocess.Popen(args, cwd=HERE, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 10
+            while not os.path.exists(sock) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert os.path.exists(lock_path_for(sock))
+            second = subprocess.run(args, cwd=HERE, timeout=15, stderr=subprocess.PIPE, text=True)
+            assert second.returncode == 0, second.stderr
+            assert "已在运行" in second.stderr
+            assert first.poll() is None
+        finally:
+            first.send_signal(signal.SIGTERM)
+            assert first.wait(timeout=10) == 0
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_lock_is_exclusive,
+        test_lock_released_when_process_exits,
+        test_hand_off_waits_for_listener,
+        test_headless_instance_reports_no_window,
+        test_tcp_transport_without_unix_sockets,
+        test_second_daemon_hands_off_and_exits,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
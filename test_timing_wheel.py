@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测试分层时间轮
+"""
+import sys
+import os
+import random
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from timing_wheel import TimingWheel
+
+START = 1_700_000_000
+
+
+def test_expires_in_order_across_levels():
+    """秒/分/时/天/溢出各层的提醒都在到期时按顺序返回"""
+    wheel = TimingWheel(START)
+    deadlines = {"sec": START + 5, "min": START + 600, "hour": START + 7200,
+                 "day": START + 3 * 86400, "year": START + 400 * 86400}
+    for key, deadline in deadlines.items():
+        wheel.add(key, deadline, key)
+
+    assert wheel.next_expiry() == START + 5
+    assert wheel.advance(START + 4) == []
+    assert wheel.advance(START + 5) == [("sec", "sec")]
+    assert wheel.next_expiry() == START + 600
+    assert wheel.advance(START + 7200) == [("min", "min"), ("hour", "hour")]
+    assert wheel.advance(START + 400 * 86400 - 1) == [("day", "day")]
+    assert wheel.advance(START + 400 * 86400) == [("year", "year")]
+    assert len(wheel) == 0
+    assert wheel.next_expiry() is None
+
+
+def test_cancel_and_reschedule():
+    """取消的提醒不再返回，改期后按新的时间返回"""
+    wheel = TimingWheel(START)
+    wheel.add(1, START + 30)
+    wheel.add(2, START + 90)
+    assert wheel.cancel(1)
+    assert not wheel.cancel(1)
+    wheel.add(2, START + 10)
+    assert wheel.advance(START + 100) == [(2, None)]
+
+
+def test_past_deadline_is_ready():
+    """不晚于当前刻度的提醒在下一次推进时立即返回"""
+    wheel = TimingWheel(START)
+    wheel.add("late", START - 60)
+    assert wheel.next_expiry() == START
+    assert wheel.advance(START) == [("late", None)]
+
+
+def test_next_expiry_checks_higher_levels():
+    """高层槽位中尚未下放的提醒早于低层的提醒时，next_expiry 返回前者"""
+    wheel = TimingWheel(0)
+    wheel.add("A", 121)
+    wheel.advance(100)
+    wheel.add("B", 125)
+    assert wheel.next_expiry() == 121
+    assert wheel.advance(121) == [("A", None)]
+    assert wheel.next_expiry() == 125
+
+
+def test_matches_linear_scan():
+    """随机数据下与逐个比较的线性扫描结果一致"""
+    rng = random.Random(42)
+    wheel = TimingWheel(START)
+    pending = {}
+    for key in range(2000):
+        deadline = START + rng.randint(1, 40 * 86400)
+        wheel.add(key, deadline)
+        pending[key] = deadline
+    for key in rng.sample(sorted(pending), 300):
+        wheel.cancel(key)
+        del pending[key]
+
+    now = START
+    late = 0
+    while pending:
+        expected_next = min(pending.values())
+        assert wheel.next_expiry() == expected_next
+        now = expected_next + rng.randint(0, 5000)
+        # 推进途中再加入较近的提醒，使高层和低层同时有待下放的提醒
+        if late < 500:
+            late += 1
+            pending[("late", late)] = deadline = now + rng.randint(1, 200)
+            wheel.add(("late", late), deadline)
+        expired = {key for key, _ in wheel.advance(now)}
+        expected = {key for key, deadline in pending.items() if deadline <= now}
+        assert expired == expected
+        for key in expected:
+            del pending[key]
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_expires_in_order_across_levels,
+        test_cancel_and_reschedule,
+        test_past_deadline_is_ready,
+        test_next_expiry_checks_higher_levels,
+        test_matches_linear_scan,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+测试合成铃声缓存（波形与原来逐次合成的相同、循环旋律、LRU 淘汰、预先合成）
+"""
+import sys
+import os
+
+import types
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tone_cache
+from tone_cache import SAMPLE_RATE, ToneCache, pygame_sound, synthesize
+
+
+def _fake_sound(buffer, sample_rate, channels):
+    return (buffer, sample_rate, channels)
+
+
+def _mono():
+    return SAMPLE_RATE, 1
+
+
+def test_matches_inline_synthesis():
+    """合成的 PCM 数据与原来响铃和预览时逐次计算的相同"""
+    sample_rate, duration = 44100, 0.5
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    expected = np.concatenate((0.5 * np.sin(2 * np.pi * 1000 * t), 0.5 * np.sin(2 * np.pi * 1200 * t)))
+    assert synthesize((1000, 1200), duration) == np.int16(expected * 32767).tobytes()
+
+    mono = np.frombuffer(synthesize((800,), 0.3), dtype=np.int16)
+    stereo = np.frombuffer(synthesize((800,), 0.3, channels=2), dtype=np.int16)
+    assert len(mono) == int(44100 * 0.3)
+    assert (stereo[0::2] == mono).all() and (stereo[1::2] == mono).all()
+
+
+def test_melody_with_trailing_pause():
+    """整段旋律依次包含各个音符和结尾的静音，循环播放时与逐个音符播放再停顿的节奏相同"""
+    notes, duration, pause = (1000, 1200, 1000, 800), 0.3, 0.2
+    melody = np.frombuffer(synthesize(notes, duration, pause=pause), dtype=np.int16)
+    note_samples = int(44100 * duration)
+    assert len(melody) == len(notes) * note_samples + int(44100 * pause)
+    for i, frequency in enumerate(notes):
+        note = np.frombuffer(synthesize((frequency,), duration), dtype=np.int16)
+        assert (melody[i * note_samples:(i + 1) * note_samples] == note).all()
+    assert not melody[len(notes) * note_samples:].any()
+
+    cache = ToneCache(factory=_fake_sound, output_format=_mono)
+    assert cache.get(notes, duration, pause) is not cache.get(notes, duration)
+    assert len(cache) == 2
+
+
+def test_caches_and_evicts_least_recently_used():
+    """命中时返回同一个对象，超过容量时淘汰最久未使用的铃声"""
+    cache = ToneCache(maxsize=2, factory=_fake_sound, output_format=_mono)
+    first = cache.get((1000,), 0.3)
+    assert cache.get([1000], 0.3) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get((1200,), 0.3)
+    cache.get((1000,), 0.3)  # 最近使用过，不会被淘汰
+    cache.get((800,), 0.3)
+    assert len(cache) == 2
+    assert cache.get((1000,), 0.3) is first
+    cache.get((1200,), 0.3)
+    assert cache.misses == 4
+
+    # 时长、采样率或声道数不同的是不同的铃声
+    assert cache.get((1000,), 0.3, channels=2)[2] == 2
+    assert cache.get((1000,), 0.3, sample_rate=22050)[1] == 22050
+
+
+def test_warm_fills_cache():
+    """预先合成后响铃只需查表"""
+    calls = []
+    cache = ToneCache(factory=lambda *args: calls.append(args) or object(), output_format=_mono)
+    specs = [((frequency,), 0.3) for frequency in (1000, 1200, 1000, 800)] + [((1000, 1200), 0.5)]
+    specs.append(((1000, 1200, 1000, 800), 0.3, 0.2))
+    cache.warm(specs)
+    assert len(calls) == 5 and len(cache) == 5
+    for spec in specs:
+        cache.get(*spec)
+    assert len(calls) == 5
+
+
+def test_default_format_follows_mixer():
+    """未指定格式时按混音器的采样率和声道数合成（pygame 默认是立体声）"""
+    cache = ToneCache(factory=_fake_sound, output_format=lambda: (22050, 2))
+    buffer, sample_rate, channels = cache.get((1000,), 0.3)
+    assert (sample_rate, channels) == (22050, 2)
+    assert len(buffer) == int(22050 * 0.3) * 2 * 2
+    assert cache.get((1000,), 0.3, channels=2, sample_rate=22050)[0] is buffer
+
+
+class _StrictSound:
+    """与 pygame 2 相同：Sound 只接受一个位置参数或一个关键字参数"""
+
+    def __init__(self, *args, **kwargs):
+        if len(args) + len(kwargs) != 1:
+            raise TypeError("Sound takes either 1 positional or 1 keyword argument")
+        self.buffer = kwargs.get('buffer')
+
+
+def _fake_pygame(init):
+    mixer = types.SimpleNamespace(get_init=lambda: init, Sound=_StrictSound)
+    return types.SimpleNamespace(mixer=mixer)
+
+
+def test_pygame_sound_uses_mixer_format():
+    """pygame_sound 只把 buffer 传给 Sound，格式与混音器不一致时报错"""
+    original = sys.modules.get('pygame')
+    sys.modules['pygame'] = _fake_pygame((44100, -16, 2))
+    try:
+        cache = ToneCache()
+        sound = cache.get((1000, 1200), 0.5)
+        assert sound.buffer == synthesize((1000, 1200), 0.5, 44100, 2)
+        try:
+            pygame_sound(synthesize((1000,), 0.3), 44100, 1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("单声道数据不应交给立体声混音器")
+        sys.modules['pygame'] = _fake_pygame(None)
+        try:
+            ToneCache().get((1000,), 0.3)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("混音器未初始化时应当报错")
+    finally:
+        if original is None:
+            del sys.modules['pygame']
+        else:
+            sys.modules['pygame'] = original
+
+
+def test_real_pygame_sound():
+    """安装了 pygame 时用真实的混音器（无声驱动）创建缓存的铃声和后备铃声"""
+    try:
+        import pygame
+    except ImportError:
+        return  # 没有安装 pygame
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.init()
+    try:
+        frequency, _, channels = pygame.mixer.get_init()
+        sound = ToneCache().get((1000, 1200), 0.5)
+        assert abs(sound.get_length() - 1.0) < 0.01
+        assert abs(tone_cache.make_tone((1000,), 0.3, pause=0.2).get_length() - 0.5) < 0.01
+        assert len(sound.get_raw()) == int(frequency * 0.5) * 2 * 2 * channels
+    finally:
+        pygame.mixer.quit()
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_matches_inline_synthesis,
+        test_melody_with_trailing_pause,
+        test_caches_and_evicts_least_recently_used,
+        test_warm_fills_cache,
+        test_default_format_follows_mixer,
+        test_pygame_sound_uses_mixer_format,
+        test_real_pygame_sound,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+分层时间轮 - 用于大量日程提醒的定时索引
+
+四层时间轮分别以秒、分、时、天为刻度（60/60/24/366 个槽位），
+超出一年的提醒放在溢出表中。插入和取消都是 O(1)，
+每个刻度只处理当前槽位；高层槽位在进入对应的分钟/小时/天时
+整体下放到低一层，空闲时直接跳到下一个非空边界。
+"""
+import math
+import threading
+
+# 各层的槽位数和每个槽位代表的秒数
+LEVEL_SIZES = (60, 60, 24, 366)
+LEVEL_WIDTHS = (1, 60, 3600, 86400)
+
+
+class TimingWheel:
+    """分层时间轮（线程安全）
+
+    到期时间使用 time.time() 风格的时间戳，按整秒刻度触发，
+    不会早于到期时间返回。
+    """
+
+    def __init__(self, start):
+        """
+        Args:
+            start: 起始时间戳，早于或等于该时间的提醒视为已到期
+        """
+        self._tick = int(start)
+        self._wheels = [[{} for _ in range(size)] for size in LEVEL_SIZES]
+        self._counts = [0] * len(LEVEL_SIZES)
+        self._overflow = {}  # 超出最高层范围的提醒
+        self._ready = {}  # 已到期但尚未取走的提醒
+        self._locations = {}  # 键 -> (所在层, 槽位字典)，层为 None 表示溢出表或已到期
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locations)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._locations
+
+    @property
+    def current_tick(self):
+        """时间轮当前所在的整秒时间戳"""
+        return self._tick
+
+    def add(self, key, deadline, payload=None):
+        """加入或改期一个提醒
+
+        Args:
+            key: 提醒的唯一键（如日程ID）
+            deadline: 到期时间戳
+            payload: 到期时随键一起返回的对象
+        """
+        with self._lock:
+            self._remove(key)
+            self._place(key, int(math.ceil(deadline)), payload)
+
+    def cancel(self, key):
+        """取消一个提醒，返回是否存在"""
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        """清空所有提醒"""
+        with self._lock:
+            for wheel in self._wheels:
+                for slot in wheel:
+                    slot.clear()
+            self._counts = [0] * len(LEVEL_SIZES)
+            self._overflow.clear()
+            self._ready.clear()
+            self._locations.clear()
+
+    def advance(self, now):
+        """把时间轮推进到 now，返回期间到期的 (键, 对象) 列表（按到期时间排序）"""
+        target = int(now)
+        with self._lock:
+            while self._tick < target:
+                self._step(target)
+            expired = sorted(self._ready.items(), key=lambda item: item[1][0])
+            for key, _ in expired:
+                del self._locations[key]
+            self._ready.clear()
+            return [(key, payload) for key, (_, payload) in expired]
+
+    def next_expiry(self):
+        """返回最早的到期时间戳，没有提醒时返回 None"""
+        with self._lock:
+            if self._ready:
+                return self._tick
+            # 高层槽位中尚未下放的提醒可能早于低层最近的提醒，
+            # 因此取每一层最近的非空槽位中的最小值
+            candidates = []
+            for level, size in enumerate(LEVEL_SIZES):
+                if not self._counts[level]:
+                    continue
+                wheel = self._wheels[level]
+                unit = self._tick // LEVEL_WIDTHS[level]
+                for offset in range(1, size):
+                    slot = wheel[(unit + offset) % size]
+                    if slot:
+                        candidates.append(min(deadline for deadline, _ in slot.values()))
+                        break
+            if self._overflow:
+                candidates.append(min(deadline for deadline, _ in self._overflow.values()))
+            return min(candidates, default=None)
+
+    def _place(self, key, deadline, payload):
+        """按距离当前刻度的远近把提醒放入对应层的槽位"""
+        level = None
+        if deadline <= self._tick:
+            slot = self._ready
+        else:
+            slot = self._overflow
+            for candidate, (size, width) in enumerate(zip(LEVEL_SIZES, LEVEL_WIDTHS)):
+                if deadline // width - self._tick // width < size:
+                    level = candidate
+                    slot = self._wheels[level][(deadline // width) % size]
+                    self._counts[level] += 1
+                    break
+        slot[key] = (deadline, payload)
+        self._locations[key] = (level, slot)
+
+    def _remove(self, key):
+        location = self._locations.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        del slot[key]
+        if level is not None:
+            self._counts[level] -= 1
+        return True
+
+    def _step(self, target):
+        """推进一个刻度，或在低层为空时直接跳到下一个非空边界"""
+        tick = self._tick
+        next_tick = tick + 1
+        # 低层为空时跳过整段空闲时间，直到需要下放高层槽位的边界
+        for level in range(len(LEVEL_SIZES)):
+            if self._counts[level]:
+                break
+            if level + 1 < len(LEVEL_WIDTHS):
+                width = LEVEL_WIDTHS[level + 1]
+            elif self._overflow:
+                width = LEVEL_WIDTHS[-1]
+            else:
+                next_tick = target
+                break
+            next_tick = max(tick + 1, min(target, (tick // width + 1) * width))
+        self._tick = next_tick
+
+        # 从高到低依次下放进入当前刻度的槽位
+        if next_tick % 86400 == 0 and self._overflow:
+            self._cascade(self._overflow, None)
+        for level in range(len(LEVEL_SIZES) - 1, 0, -1):
+            width = LEVEL_WIDTHS[level]
+            if next_tick % width == 0:
+                slot = self._wheels[level][(next_tick // width) % LEVEL_SIZES[level]]
+                if slot:
+                    self._cascade(slot, level)
+
+        slot = self._wheels[0][next_tick % LEVEL_SIZES[0]]
+        if slot:
+            self._counts[0] -= len(slot)
+            for key, entry in slot.items():
+                self._ready[key] = entry
+                self._locations[key] = (None, self._ready)
+            slot.clear()
+
+    def _cascade(self, slot, level):
+        """把一个高层槽位中的提醒重新放入更低的层"""
+        entries = list(slot.items())
+        slot.clear()
+        if level is not None:
+            self._counts[level] -= len(entries)
+        for key, (deadline, payload) in entries:
+            self._place(key, deadline, payload)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+合成铃声缓存 - 默认铃声和预览音只合成一次
+
+可视化闹钟的默认铃声由若干正弦音符组成，原来每次响铃、每次预览都要用
+numpy 重新计算波形并创建新的 pygame.mixer.Sound。ToneCache 以
+(音符频率, 每个音符的时长, 结尾停顿, 采样率, 声道数) 为键缓存创建好的声音对象，
+启动时预先合成常用的铃声（warm），其余在第一次使用时合成；缓存项超过
+maxsize 个时淘汰最久未使用的一项（LRU）。
+
+pygame.mixer.Sound(buffer=...) 按混音器初始化时的格式解释原始数据，
+因此默认按 pygame.mixer.get_init() 的采样率和声道数合成（通常为 44100 Hz
+立体声），而不是固定的单声道。
+
+整段旋律（包括结尾的停顿）合成为一个缓冲区后，可以交给混音器用
+loops=-1 循环播放，响铃期间不需要 Python 线程逐个音符地播放和睡眠。
+"""
+import collections
+import threading
+
+SAMPLE_RATE = 44100
+AMPLITUDE = 0.5  # 正弦波振幅（相对于 16 位整数的最大值）
+DEFAULT_MAXSIZE = 16
+
+
+def synthesize(notes, duration, sample_rate=SAMPLE_RATE, channels=1, pause=0.0):
+    """依次合成若干正弦音符，返回 16 位整数 PCM 数据（bytes）
+
+    Args:
+        notes: 音符频率（Hz）序列
+        duration: 每个音符的时长（秒）
+        sample_rate: 采样率
+        channels: 声道数，多声道时每个声道的数据相同
+        pause: 最后一个音符之后的静音时长（秒），循环播放时作为两遍旋律之间的停顿
+    """
+    import numpy as np
+
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    parts = [AMPLITUDE * np.sin(2 * np.pi * frequency * t) for frequency in notes]
+    parts.append(np.zeros(int(sample_rate * pause)))
+    wave = np.concatenate(parts)
+    samples = np.int16(wave * 32767)
+    if channels > 1:
+        samples = np.repeat(samples, channels)  # 交错排列的多声道数据
+    return samples.tobytes()
+
+
+def pygame_mixer_format():
+    """返回已初始化的 pygame.mixer 的 (采样率, 声道数)，只支持 16 位有符号样本"""
+    import pygame
+
+    init = pygame.mixer.get_init()
+    if init is None:
+        raise RuntimeError("pygame.mixer 尚未初始化")
+    frequency, size, channels = init
+    if size != -16:
+        raise ValueError(f"不支持的混音器样本格式: {size}")
+    return frequency, channels
+
+
+def pygame_sound(buffer, sample_rate, channels):
+    """用 PCM 数据创建 pygame.mixer.Sound（需要已初始化 pygame.mixer）
+
+    Sound 只接受一个 buffer 参数并按混音器的格式解释数据，PCM 必须已按
+    pygame_mixer_format() 的采样率和声道数合成。
+    """
+    import pygame
+
+    if (sample_rate, channels) != pygame_mixer_format():
+        raise ValueError(f"PCM 格式 ({sample_rate} Hz, {channels} 声道) 与混音器不一致")
+    return pygame.mixer.Sound(buffer=buffer)
+
+
+def make_tone(notes, duration, pause=0.0):
+    """不经过缓存、用 pygame.sndarray 直接合成一个铃声（缓存出错时的后备）"""
+    import numpy as np
+    import pygame
+
+    sample_rate, channels = pygame_mixer_format()
+    samples = np.frombuffer(synthesize(notes, duration, sample_rate, channels, pause), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return pygame.sndarray.make_sound(samples.copy())
+
+
+class ToneCache:
+    """合成铃声的 LRU 缓存（线程安全）
+
+    Args:
+        maxsize: 最多缓存的铃声数
+        factory: factory(PCM数据, 采样率, 声道数) -> 声音对象，默认创建 pygame.mixer.Sound
+        output_format: output_format() -> (采样率, 声道数)，未指定格式时按它合成，
+            默认为 pygame.mixer 初始化时的格式
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, factory=pygame_sound, output_format=pygame_mixer_format):
+        self.maxsize = maxsize
+        self.factory = factory
+        self.output_format = output_format
+        self._sounds = collections.OrderedDict()  # (notes, duration, pause, sample_rate, channels) -> 声音对象
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sounds)
+
+    def get(self, notes, duration, pause=0.0, sample_rate=None, channels=None):
+        """返回依次播放 notes 中各音符（之后停顿 pause 秒）的声音对象，不在缓存中时合成并放入缓存
+
+        sample_rate、channels 为 None 时使用 output_format() 的格式。
+        """
+        if sample_rate is None or channels is None:
+            default_rate, default_channels = self.output_format()
+            sample_rate = sample_rate or default_rate
+            channels = channels or default_channels
+        key = (tuple(notes), duration, pause, sample_rate, channels)
+        with self._lock:
+            sound = self._sounds.get(key)
+            if sound is not None:
+                self._sounds.move_to_end(key)
+                self.hits += 1
+                return sound
+            self.misses += 1
+        # 在锁外合成，两个线程同时缓存未命中时各自合成一次，结果相同
+        sound = self.factory(synthesize(key[0], duration, sample_rate, channels, pause), sample_rate, channels)
+        with self._lock:
+            self._sounds[key] = sound
+            self._sounds.move_to_end(key)
+            while len(self._sounds) > self.maxsize:
+                self._sounds.popitem(last=False)
+        return sound
+
+    def warm(self, specs):
+        """预先合成铃声 [(notes, duration[, pause]), ...]"""
+        for spec in specs:
+            self.get(*spec)
+
+    def clear(self):
+        with self._lock:
+            self._sounds.clear()
@@ -7,10 +7,63 @@ from tkinter import ttk, messagebox, filedialog
 import datetime
 import time
 import threading
+import sys
 import os
 import logging
 import pygame
 import math
+from collections import deque
+
+from alarm_engine import AlarmEngine, next_fire_time
+from alarm_history import DISMISS, FIRE, SNOOZE, STOP, AlarmHistory
+from alarm_journal import AlarmJournal
+from alarm_scheduler import DeadlineWaiter
+from alarm_store import DATA_DIR
+from registry import IdRegistry
+from schedule_db import ScheduleDB, schedule_from_json, schedule_to_json
+from timing_wheel import TimingWheel
+from tone_cache import ToneCache, make_tone
+
+try:
+    from column_store import ColumnStore
+except ImportError:  # 未安装 numpy 时日程提醒使用时间轮
+    ColumnStore = None
+
+
+# 闹钟和日程的保存位置（与 alarm_clock_gui.py 的闹钟分开保存）
+VISUAL_ALARMS_PATH = os.path.join(DATA_DIR, "visual_alarms.json")
+VISUAL_SCHEDULES_PATH = os.path.join(DATA_DIR, "visual_schedules.json")
+VISUAL_HISTORY_DIR = os.path.join(DATA_DIR, "visual_history")
+
+SCHEDULE_WINDOW = 256  # 使用数据库时放进时间轮的最近提醒数量
+COLUMN_STORE_THRESHOLD = 10_000  # 日程提醒达到这么多时改用列式索引（需要 numpy）
+SCHEDULE_PAGE_SIZE = 100  # 日程列表每页显示的数量
+
+
+def make_schedule_index(count=0, column_store=None):
+    """创建日程提醒的索引（只用于日程提醒，闹钟仍在闹钟引擎的堆中）
+
+    Args:
+        count: 预计放进索引的提醒数量
+        column_store: True 使用列式索引，False 使用时间轮；None 时提醒数量
+            达到 COLUMN_STORE_THRESHOLD 且已安装 numpy 才使用列式索引
+    """
+    if column_store is None:
+        column_store = ColumnStore is not None and count >= COLUMN_STORE_THRESHOLD
+    if column_store:
+        if ColumnStore is None:
+            raise RuntimeError("列式索引需要安装 numpy")
+        return ColumnStore()
+    return TimingWheel(time.time())
+
+
+# 默认铃声的旋律和预览音（音符频率Hz, 每个音符的时长秒）
+RING_NOTES = (1000, 1200, 1000, 800)
+RING_NOTE_SECONDS = 0.3
+RING_PAUSE_SECONDS = 0.2  # 两遍旋律之间的停顿
+RING_CHANNEL = 0  # 为默认铃声保留的混音通道，预览音不会占用
+PREVIEW_NOTES = (1000, 1200)
+PREVIEW_NOTE_SECONDS = 0.5
 
 
 # 配置日志
@@ -23,8 +76,13 @@ logging.basicConfig(
 class VisualAlarmClock:
     """可视化闹钟应用类"""
     
-    def __init__(self, root):
-        """初始化应用"""
+    def __init__(self, root, column_store=None):
+        """初始化应用
+
+        Args:
+            root: Tk 根窗口
+            column_store: 日程提醒是否使用列式索引（见 make_schedule_index）
+        """
         self.root = root
         self.root.title("可视化闹钟")
         self.root.geometry("900x800")
@@ -41,18 +99,40 @@ class VisualAlarmClock:
         
         # 初始化内置播放器
         self.player = self._initialize_player()
-        
-        # 闹钟状态
-        self.alarms = []
+        self.ring_channel = self._reserve_ring_channel()
+        # 合成铃声缓存，响铃和预览时只需查表
+        self.tone_cache = ToneCache()
+        self._warm_tone_cache()
+        
+        # 闹钟状态（存储和触发由闹钟引擎负责）
+        self.engine = AlarmEngine()
+        self.engine.add_listener(self._on_alarms_triggered)
         self.next_alarm = None
         self.is_ringing = False
         self.ringing_alarm = None
+        self._alarm_waiter = DeadlineWaiter()  # 响铃线程的等待器，有新闹钟到期或响铃停止时被唤醒
+        self._pending_alarms = deque()  # 已到期、等待依次响铃的闹钟
         
         # 日程状态
-        self.schedules = []
+        self.schedules = IdRegistry()  # 日程ID -> 日程（ID单调递增，删除后不会重复）
         self.next_schedule = None
         self.is_schedule_reminding = False
         self.reminding_schedule = None
+        self._schedule_waiter = DeadlineWaiter()  # 日程检查线程的截止时间等待器
+        # 按提醒时间索引日程（以日程ID为键），见 make_schedule_index；
+        # 载入保存的日程后按数量重新选择（除非由 column_store 指定）
+        self.column_store = column_store
+        self.schedule_wheel = make_schedule_index(column_store=column_store)
+        self._pending_reminders = deque()  # 已到期、等待依次提醒的日程
+        self.schedule_page = 0  # 日程列表当前页
+        
+        # 闹钟和日程的日志（见 enable_persistence），未启用时不保存
+        self.alarm_journal = None
+        self.schedule_journal = None
+        self.history = None  # 响铃历史（见 enable_persistence）
+        # 日程数据库（见 enable_persistence），启用后日程不再全部放在内存中
+        self.schedule_db = None
+        self._window_end = None  # 时间轮中最晚的提醒时间，None 表示所有提醒都已载入
         
         # 当前选择的铃声
         self.current_ringtone = "默认铃声"
@@ -64,7 +144,8 @@ class VisualAlarmClock:
         # 启动时钟更新
         self.update_clock()
         
-        # 启动闹钟检查线程
+        # 启动闹钟引擎和响铃线程
+        self.engine.start()
         self.alarm_thread = threading.Thread(target=self._check_alarms, daemon=True)
         self.alarm_thread.start()
         
@@ -72,6 +153,85 @@ class VisualAlarmClock:
         self.schedule_thread = threading.Thread(target=self._check_schedules, daemon=True)
         self.schedule_thread.start()
     
+    def enable_persistence(self, alarm_journal=None, schedule_journal=None, schedule_db=None, history=None):
+        """恢复保存的闹钟和日程，之后的每次变更都追加写入日志（在后台线程中写盘）
+        
+        传入 schedule_db 时日程保存在 SQLite 数据库中（适合大量日程）：
+        时间轮中只放最近的 SCHEDULE_WINDOW 个提醒，列表按页读取。
+        """
+        self.alarm_journal = alarm_journal or AlarmJournal(VISUAL_ALARMS_PATH)
+        self.history = history or AlarmHistory(VISUAL_HISTORY_DIR)
+        restored_alarms = self.alarm_journal.restore(self.engine)
+        
+        if schedule_db is not None:
+            self.schedule_db = schedule_db
+            self._load_schedule_window()
+            restored_schedules = len(schedule_db)
+        else:
+            self.schedule_journal = schedule_journal or AlarmJournal(
+                VISUAL_SCHEDULES_PATH, key="schedules", to_json=schedule_to_json, from_json=schedule_from_json)
+            schedules = self.schedule_journal.load()
+            self.schedule_wheel = make_schedule_index(len(schedules), self.column_store)
+            for schedule in schedules:
+                self.schedules.put(schedule)
+                if schedule.get("reminder_time"):
+                    self.schedule_wheel.add(schedule["id"], schedule["reminder_time"].timestamp(), schedule)
+            restored_schedules = len(schedules)
+        
+        self._update_next_alarm()
+        self._refresh_alarm_list()
+        self._update_next_schedule()
+        self._refresh_schedule_list()
+        self._schedule_waiter.notify()
+        logging.info(f"已恢复 {restored_alarms} 个闹钟和 {restored_schedules} 个日程")
+    
+    def _load_schedule_window(self):
+        """从数据库载入最近的 SCHEDULE_WINDOW 个提醒，替换时间轮中的内容"""
+        upcoming = self.schedule_db.upcoming(SCHEDULE_WINDOW)
+        self.schedule_wheel.clear()
+        for schedule in upcoming:
+            self.schedule_wheel.add(schedule["id"], schedule["reminder_time"].timestamp(), schedule)
+        # 没有取满说明所有提醒都已在时间轮中，之后新增的提醒也都直接放进去
+        if len(upcoming) < SCHEDULE_WINDOW:
+            self._window_end = None
+        else:
+            self._window_end = upcoming[-1]["reminder_time"].timestamp()
+    
+    def _watch_reminder(self, schedule):
+        """把日程的提醒放进时间轮（超出已载入窗口的留在数据库中，窗口用完后再载入）"""
+        when = schedule["reminder_time"].timestamp()
+        if self._window_end is None or when <= self._window_end:
+            self.schedule_wheel.add(schedule["id"], when, schedule)
+    
+    def _get_schedule(self, schedule_id):
+        """按ID查找日程，不存在时返回 None"""
+        if self.schedule_db is not None:
+            return self.schedule_db.get(schedule_id)
+        return self.schedules.get(schedule_id)
+    
+    def _schedule_count(self):
+        if self.schedule_db is not None:
+            return len(self.schedule_db)
+        return len(self.schedules)
+    
+    def _record_schedule(self, op, schedule_id, schedule):
+        """把日程的变更写入日志（未启用持久化时忽略）"""
+        if self.schedule_journal:
+            self.schedule_journal.record(op, schedule_id, schedule)
+    
+    def on_closing(self):
+        """窗口关闭时停止引擎并把日志合并进快照"""
+        try:
+            self.engine.stop()
+            for journal in (self.alarm_journal, self.schedule_journal, self.history):
+                if journal:
+                    journal.close()
+            if self.schedule_db is not None:
+                self.schedule_db.close()
+        except Exception as e:
+            logging.error(f"关闭时保存数据失败: {e}")
+        self.root.destroy()
+    
     def configure_theme(self):
         """配置应用主题"""
         # 设置样式
@@ -237,6 +397,36 @@ class VisualAlarmClock:
             messagebox.showerror("错误", "内置音频播放器初始化失败")
             return None
     
+    def _reserve_ring_channel(self):
+        """保留一个混音通道专门循环播放默认铃声"""
+        if not self.player:
+            return None
+        try:
+            self.player.set_reserved(RING_CHANNEL + 1)
+            return self.player.Channel(RING_CHANNEL)
+        except Exception as e:
+            logging.error(f"保留铃声通道失败: {e}")
+            return None
+    
+    def _warm_tone_cache(self):
+        """启动时预先合成默认铃声的旋律和预览音"""
+        if not self.player:
+            return
+        try:
+            self.tone_cache.warm([(RING_NOTES, RING_NOTE_SECONDS, RING_PAUSE_SECONDS),
+                                  (PREVIEW_NOTES, PREVIEW_NOTE_SECONDS)])
+        except Exception as e:
+            # 第一次响铃或预览时再合成
+            logging.error(f"预先合成铃声失败: {e}")
+    
+    def _default_tone(self, notes, duration, pause=0.0):
+        """从合成铃声缓存中取出默认铃声，缓存出错时直接合成，不让闹钟静音"""
+        try:
+            return self.tone_cache.get(notes, duration, pause)
+        except Exception as e:
+            logging.error(f"从铃声缓存取出铃声失败，改为直接合成: {e}")
+            return make_tone(notes, duration, pause)
+    
     def create_widgets(self):
         """创建界面组件"""
         # 创建主框架
@@ -581,6 +771,15 @@ class VisualAlarmClock:
         
         ttk.Button(button_container, text="删除选中日程", command=self._delete_selected_schedule).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         ttk.Button(button_container, text="刷新列表", command=self._refresh_schedule_list).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        
+        # 分页（日程很多时列表只显示一页）
+        page_container = ttk.Frame(list_button_frame)
+        page_container.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Button(page_container, text="上一页", command=lambda: self._change_schedule_page(-1)).pack(side=tk.LEFT, padx=5)
+        self.schedule_page_var = tk.StringVar()
+        ttk.Label(page_container, textvariable=self.schedule_page_var).pack(side=tk.LEFT, padx=5, expand=True)
+        ttk.Button(page_container, text="下一页", command=lambda: self._change_schedule_page(1)).pack(side=tk.RIGHT, padx=5)
     
     def update_clock(self):
         """更新时钟显示"""
@@ -739,7 +938,6 @@ class VisualAlarmClock:
             
             # 创建日程对象
             schedule = {
-                "id": len(self.schedules) + 1,
                 "time": schedule_time,
                 "title": title,
                 "content": content,
@@ -747,11 +945,18 @@ class VisualAlarmClock:
                 "reminder_time": reminder_time
             }
             
-            # 添加到日程列表
-            self.schedules.append(schedule)
+            # 添加到日程表（分配ID）
+            if self.schedule_db is not None:
+                self.schedule_db.add(schedule)
+            else:
+                self.schedules.add(schedule)
+                self._record_schedule("add", schedule["id"], schedule)
+            if reminder_time:
+                self._watch_reminder(schedule)
             
             # 更新下次日程
             self._update_next_schedule()
+            self._schedule_waiter.notify()
             
             # 更新状态
             time_str = schedule_time.strftime("%Y-%m-%d %H:%M")
@@ -786,22 +991,12 @@ class VisualAlarmClock:
     
     def _update_next_schedule(self):
         """更新下次日程"""
-        if not self.schedules:
+        # 时间轮只需查看最近的非空槽位（列式索引只需二分查找），无需遍历所有日程
+        next_expiry = self.schedule_wheel.next_expiry()
+        if next_expiry is None:
             self.next_schedule = None
-            return
-        
-        # 找到最近的日程提醒时间
-        upcoming_schedules = []
-        now = datetime.datetime.now()
-        
-        for schedule in self.schedules:
-            if schedule["reminder_time"] and schedule["reminder_time"] > now:
-                upcoming_schedules.append(schedule["reminder_time"])
-        
-        if upcoming_schedules:
-            self.next_schedule = min(upcoming_schedules)
         else:
-            self.next_schedule = None
+            self.next_schedule = datetime.datetime.fromtimestamp(next_expiry)
     
     def _refresh_schedule_list(self):
         """刷新日程列表显示"""
@@ -809,45 +1004,83 @@ class VisualAlarmClock:
         for item in self.schedule_tree.get_children():
             self.schedule_tree.delete(item)
         
-        # 添加所有日程到列表
-        for schedule in self.schedules:
+        # 只添加当前页的日程
+        pages = max(1, -(-self._schedule_count() // SCHEDULE_PAGE_SIZE))
+        self.schedule_page = min(self.schedule_page, pages - 1)
+        offset = self.schedule_page * SCHEDULE_PAGE_SIZE
+        if self.schedule_db is not None:
+            schedules = self.schedule_db.page(offset, SCHEDULE_PAGE_SIZE)
+        else:
+            schedules = self.schedules.values()[offset:offset + SCHEDULE_PAGE_SIZE]
+        self.schedule_page_var.set(f"第 {self.schedule_page + 1} / {pages} 页")
+        
+        for schedule in schedules:
             datetime_str = schedule["time"].strftime("%Y-%m-%d %H:%M")
             content = schedule["content"] if len(schedule["content"]) <= 20 else schedule["content"][:20] + "..."
             
             self.schedule_tree.insert("", tk.END, values=(schedule["id"], datetime_str, schedule["title"], content, schedule["reminder"]))
     
+    def _change_schedule_page(self, delta):
+        """翻页"""
+        self.schedule_page = max(0, self.schedule_page + delta)
+        self._refresh_schedule_list()
+    
     def _delete_selected_schedule(self):
-        """删除选中的日程"""
-        selected_item = self.schedule_tree.selection()
-        if not selected_item:
+        """删除选中的日程（支持多选）"""
+        selected_items = self.schedule_tree.selection()
+        if not selected_items:
             messagebox.showinfo("提示", "请先选择要删除的日程")
             return
         
-        # 获取选中日程的ID
-        selected_id = int(self.schedule_tree.item(selected_item)['values'][0])
+        # 获取选中日程的ID并按ID删除
+        selected_ids = {int(self.schedule_tree.set(item, "id")) for item in selected_items}
+        if self.schedule_db is not None:
+            for schedule_id in self.schedule_db.remove_many(selected_ids):
+                self.schedule_wheel.cancel(schedule_id)
+        else:
+            for schedule in self.schedules.remove_many(selected_ids):
+                self.schedule_wheel.cancel(schedule["id"])
+                self._record_schedule("delete", schedule["id"], None)
         
-        # 找到并删除日程
-        for schedule in self.schedules:
-            if schedule["id"] == selected_id:
-                self.schedules.remove(schedule)
-                break
+        # 移除已到期但尚未提醒的日程（一次过滤，不逐个查找）
+        remaining = [s for s in self._pending_reminders if s["id"] not in selected_ids]
+        self._pending_reminders.clear()
+        self._pending_reminders.extend(remaining)
         
         # 更新下次日程
         self._update_next_schedule()
+        self._schedule_waiter.notify()
         
-        # 刷新日程列表
-        self._refresh_schedule_list()
+        # 只从列表中删除选中的行
+        self.schedule_tree.delete(*selected_items)
         
         # 更新状态
-        self.status_var.set(f"日程ID {selected_id} 已删除")
-        logging.info(f"日程ID {selected_id} 已删除")
-        messagebox.showinfo("成功", f"日程ID {selected_id} 已删除")
+        message = self._deleted_message("日程", selected_ids)
+        self.status_var.set(message)
+        logging.info(message)
+        messagebox.showinfo("成功", message)
+    
+    @staticmethod
+    def _deleted_message(kind, ids):
+        """删除结果的提示文本"""
+        if len(ids) == 1:
+            return f"{kind}ID {next(iter(ids))} 已删除"
+        return f"已删除 {len(ids)} 个{kind}"
     
     def _cancel_all_schedules(self):
         """取消所有日程"""
-        if self.schedules:
-            self.schedules = []
+        if self.schedule_db is not None:
+            cleared = self.schedule_db.clear()
+        else:
+            cleared = self.schedules.clear()
+            if cleared:
+                self._record_schedule("clear", None, None)
+        if cleared:
+            self.schedule_wheel.clear()
+            self._window_end = None
+            self._pending_reminders.clear()
             self.next_schedule = None
+            self._schedule_waiter.notify()
             self.status_var.set("所有日程已取消")
             
             # 刷新日程列表
@@ -861,20 +1094,33 @@ class VisualAlarmClock:
     def _check_schedules(self):
         """检查日程是否需要提醒"""
         while True:
-            if self.schedules and not self.is_schedule_reminding:
-                now = datetime.datetime.now()
-                for schedule in self.schedules:
-                    if schedule["reminder_time"] and now >= schedule["reminder_time"]:
-                        # 日程提醒
-                        self._remind_schedule(schedule)
-                        break
+            deadline = None
+            if not self.is_schedule_reminding:
+                # 推进时间轮，只处理到期槽位中的日程
+                expired = self.schedule_wheel.advance(time.time())
+                self._pending_reminders.extend(schedule for _, schedule in expired)
+                if self._pending_reminders:
+                    # 日程提醒（同时到期的日程在关闭提醒后依次提醒）
+                    self._remind_schedule(self._pending_reminders.popleft())
+                else:
+                    if self._window_end is not None and not len(self.schedule_wheel):
+                        # 已载入的提醒用完，从数据库载入下一批
+                        self._load_schedule_window()
+                    deadline = self.schedule_wheel.next_expiry()
             
-            time.sleep(1)
+            # 睡眠到下一次提醒时间，日程变化或提醒关闭时被唤醒
+            self._schedule_waiter.wait_until(deadline)
     
     def _remind_schedule(self, schedule):
         """日程提醒"""
         self.is_schedule_reminding = True
         self.reminding_schedule = schedule
+        # 已提醒的日程不再重复提醒，稍后提醒会重新设置提醒时间
+        schedule["reminder_time"] = None
+        if self.schedule_db is not None:
+            self.schedule_db.update(schedule["id"], reminder_time=None)
+        else:
+            self._record_schedule("fire", schedule["id"], schedule)
         
         logging.info(f"日程提醒: {schedule['time'].strftime('%Y-%m-%d %H:%M')} - {schedule['title']}")
         
@@ -921,6 +1167,7 @@ class VisualAlarmClock:
     def _close_schedule_reminder(self):
         """关闭日程提醒"""
         self.is_schedule_reminding = False
+        self._schedule_waiter.notify()
         
         if hasattr(self, "reminder_window"):
             self.reminder_window.destroy()
@@ -937,18 +1184,20 @@ class VisualAlarmClock:
         self._close_schedule_reminder()
         
         # 找到原日程
-        original_schedule = None
-        for schedule in self.schedules:
-            if schedule["id"] == self.reminding_schedule["id"]:
-                original_schedule = schedule
-                break
+        original_schedule = self._get_schedule(self.reminding_schedule["id"])
         
         if original_schedule:
             # 更新提醒时间
             original_schedule["reminder_time"] = datetime.datetime.now() + datetime.timedelta(minutes=minutes)
+            if self.schedule_db is not None:
+                self.schedule_db.update(original_schedule["id"], reminder_time=original_schedule["reminder_time"])
+            else:
+                self._record_schedule("snooze", original_schedule["id"], original_schedule)
+            self._watch_reminder(original_schedule)
             
             # 更新下次日程
             self._update_next_schedule()
+            self._schedule_waiter.notify()
             
             # 更新状态
             self.status_var.set(f"日程将在{minutes}分钟后再次提醒: {original_schedule['title']}")
@@ -990,32 +1239,8 @@ class VisualAlarmClock:
             self.player.stop()
             
             if self.ringtone_var.get() == "默认铃声":
-                # 使用Pygame生成默认铃声
-                # 创建一个简单的旋律
-                import numpy as np
-                import pygame
-                
-                # 设置音频参数
-                sample_rate = 44100
-                duration = 0.5  # 持续时间(秒)
-                frequency = 1000  # 频率(Hz)
-                
-                # 生成音频数据
-                t = np.linspace(0, duration, int(sample_rate * duration), False)
-                note = 0.5 * np.sin(2 * np.pi * frequency * t)
-                
-                # 创建另一个高一点的音符
-                frequency2 = 1200
-                note2 = 0.5 * np.sin(2 * np.pi * frequency2 * t)
-                
-                # 合并音符
-                sound_data = np.concatenate((note, note2))
-                
-                # 转换为16位整数
-                sound_data = np.int16(sound_data * 32767)
-                
-                # 创建Pygame Sound对象
-                sound = pygame.mixer.Sound(buffer=sound_data.tobytes(), channels=1, frequency=sample_rate, size=-16)
+                # 两个音符的预览音（从合成铃声缓存中取出）
+                sound = self._default_tone(PREVIEW_NOTES, PREVIEW_NOTE_SECONDS)
                 
                 # 播放铃声
                 sound.set_volume(self.volume_var.get())
@@ -1038,6 +1263,11 @@ class VisualAlarmClock:
         volume_percent = int(volume * 100)
         self.volume_label.config(text=f"{volume_percent}%")
     
+    @property
+    def alarms(self):
+        """当前所有闹钟（引擎中闹钟的列表副本）"""
+        return self.engine.alarms()
+    
     def _set_alarm(self):
         """设置闹钟"""
         try:
@@ -1046,26 +1276,17 @@ class VisualAlarmClock:
             minute = self.minute_var.get()
             label = self.label_var.get()
             
-            # 创建闹钟时间
-            now = datetime.datetime.now()
-            alarm_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            # 创建闹钟时间（已经过去则设置为明天）
+            alarm_time = next_fire_time(hour, minute)
             
-            # 如果设置的时间已经过去，则设置为明天
-            if alarm_time <= now:
-                alarm_time += datetime.timedelta(days=1)
-            
-            # 创建闹钟对象
-            alarm = {
-                "id": len(self.alarms) + 1,
-                "time": alarm_time,
-                "label": label,
-                "ringtone": self.ringtone_var.get(),
-                "ringtone_path": self.ringtone_path,
-                "volume": self.volume_var.get()
-            }
-            
-            # 添加到闹钟列表
-            self.alarms.append(alarm)
+            # 添加到闹钟引擎
+            self.engine.add_alarm(
+                alarm_time,
+                label=label,
+                ringtone=self.ringtone_var.get(),
+                ringtone_path=self.ringtone_path,
+                volume=self.volume_var.get()
+            )
             
             # 更新下次闹钟
             self._update_next_alarm()
@@ -1086,13 +1307,7 @@ class VisualAlarmClock:
     
     def _update_next_alarm(self):
         """更新下次闹钟"""
-        if not self.alarms:
-            self.next_alarm = None
-            return
-        
-        # 找到最近的闹钟
-        self.alarms.sort(key=lambda x: x["time"])
-        self.next_alarm = self.alarms[0]["time"]
+        self.next_alarm = self.engine.next_fire_time()
     
     def _refresh_alarm_list(self):
         """刷新闹钟列表显示"""
@@ -1100,8 +1315,8 @@ class VisualAlarmClock:
         for item in self.alarm_tree.get_children():
             self.alarm_tree.delete(item)
         
-        # 添加所有闹钟到列表
-        for alarm in self.alarms:
+        # 按触发时间添加所有闹钟到列表
+        for alarm in sorted(self.alarms, key=lambda x: x["time"]):
             time_str = alarm["time"].strftime("%Y-%m-%d %H:%M")
             volume = f"{int(alarm['volume'] * 100)}%"
             
@@ -1110,39 +1325,37 @@ class VisualAlarmClock:
             if ringtone.startswith("本地音乐:"):
                 ringtone = os.path.basename(alarm["ringtone_path"])
             
-            self.alarm_tree.insert("", tk.END, values=(alarm["id"], time_str, alarm["label"], ringtone, volume))
+            label = alarm["label"]
+            if alarm.get("snoozed"):
+                label += f" (贪睡×{alarm['snooze_count']})"
+            self.alarm_tree.insert("", tk.END, values=(alarm["id"], time_str, label, ringtone, volume))
     
     def _delete_selected_alarm(self):
-        """删除选中的闹钟"""
-        selected_item = self.alarm_tree.selection()
-        if not selected_item:
+        """删除选中的闹钟（支持多选）"""
+        selected_items = self.alarm_tree.selection()
+        if not selected_items:
             messagebox.showinfo("提示", "请先选择要删除的闹钟")
             return
         
-        # 获取选中闹钟的ID
-        selected_id = int(self.alarm_tree.item(selected_item)['values'][0])
-        
-        # 找到并删除闹钟
-        for alarm in self.alarms:
-            if alarm["id"] == selected_id:
-                self.alarms.remove(alarm)
-                break
+        # 获取选中闹钟的ID并批量删除
+        selected_ids = {int(self.alarm_tree.set(item, "id")) for item in selected_items}
+        self.engine.remove_alarms(selected_ids)
         
         # 更新下次闹钟
         self._update_next_alarm()
         
-        # 刷新闹钟列表
-        self._refresh_alarm_list()
+        # 只从列表中删除选中的行
+        self.alarm_tree.delete(*selected_items)
         
         # 更新状态
-        self.status_var.set(f"闹钟ID {selected_id} 已删除")
-        logging.info(f"闹钟ID {selected_id} 已删除")
-        messagebox.showinfo("成功", f"闹钟ID {selected_id} 已删除")
+        message = self._deleted_message("闹钟", selected_ids)
+        self.status_var.set(message)
+        logging.info(message)
+        messagebox.showinfo("成功", message)
     
     def _cancel_all_alarms(self):
         """取消所有闹钟"""
-        if self.alarms:
-            self.alarms = []
+        if self.engine.clear():
             self.next_alarm = None
             self.status_var.set("所有闹钟已取消")
             
@@ -1154,27 +1367,24 @@ class VisualAlarmClock:
         else:
             messagebox.showinfo("提示", "没有设置的闹钟")
     
+    def _on_alarms_triggered(self, alarms):
+        """闹钟引擎的到期回调（在引擎线程中调用），把到期闹钟交给响铃线程"""
+        if self.history:
+            self.history.record_many(FIRE, alarms)
+        self._pending_alarms.extend(alarms)
+        self._update_next_alarm()
+        self.root.after(0, self._refresh_alarm_list)
+        self._alarm_waiter.notify()
+    
     def _check_alarms(self):
-        """检查闹钟是否响铃"""
+        """响铃线程：依次为到期的闹钟响铃"""
         while True:
-            if self.alarms and not self.is_ringing:
-                now = datetime.datetime.now()
-                for alarm in self.alarms:
-                    if now >= alarm["time"]:
-                        # 闹钟响铃
-                        self._ring_alarm(alarm)
-                        
-                        # 从列表中移除已响铃的闹钟
-                        self.alarms.remove(alarm)
-                        
-                        # 更新下次闹钟
-                        self._update_next_alarm()
-                        
-                        # 刷新闹钟列表
-                        self.root.after(0, self._refresh_alarm_list)
-                        break
+            if self._pending_alarms and not self.is_ringing:
+                self._ring_alarm(self._pending_alarms.popleft())
+                continue
             
-            time.sleep(1)
+            # 等待新的闹钟到期或当前响铃停止
+            self._alarm_waiter.wait_until(None)
     
     def _ring_alarm(self, alarm):
         """闹钟响铃"""
@@ -1190,46 +1400,18 @@ class VisualAlarmClock:
             if not self.player:
                 # 如果Pygame播放器不可用，使用简单的音效
                 messagebox.showerror("错误", "内置播放器不可用")
-                self._stop_alarm()
+                self._stop_alarm(DISMISS)
             else:
                 # 使用内置Pygame播放器
                 self.player.stop()
                 
                 if alarm["ringtone"] == "默认铃声":
-                    # 使用Pygame生成默认铃声
-                    import numpy as np
-                    import pygame
-                    
-                    # 设置音频参数
-                    sample_rate = 44100
-                    duration = 0.3  # 持续时间(秒)
-                    
-                    # 创建旋律
-                    frequencies = [1000, 1200, 1000, 800]  # 音符频率
-                    sounds = []
-                    
-                    for freq in frequencies:
-                        # 生成音频数据
-                        t = np.linspace(0, duration, int(sample_rate * duration), False)
-                        note = 0.5 * np.sin(2 * np.pi * freq * t)
-                        
-                        # 转换为16位整数
-                        sound_data = np.int16(note * 32767)
-                        
-                        # 创建Pygame Sound对象
-                        sound = pygame.mixer.Sound(buffer=sound_data.tobytes(), channels=1, frequency=sample_rate, size=-16)
-                        sounds.append(sound)
-                    
-                    # 循环播放旋律直到停止
-                    while self.is_ringing:
-                        for sound in sounds:
-                            if not self.is_ringing:
-                                break
-                            sound.set_volume(alarm["volume"])
-                            sound.play()
-                            time.sleep(duration)
-                        if self.is_ringing:
-                            time.sleep(0.2)  # 短暂停顿
+                    # 整段旋律（含结尾停顿）是一个缓冲区，由混音器循环播放直到停止，
+                    # 响铃线程不再逐个音符地播放和睡眠
+                    melody = self._default_tone(RING_NOTES, RING_NOTE_SECONDS, RING_PAUSE_SECONDS)
+                    channel = self.ring_channel or self.player.find_channel(True)
+                    channel.set_volume(alarm["volume"])
+                    channel.play(melody, loops=-1)
                 elif alarm["ringtone_path"]:
                     # 播放本地音乐
                     self.player.music.load(alarm["ringtone_path"])
@@ -1263,12 +1445,20 @@ class VisualAlarmClock:
         ttk.Button(button_frame, text="停止", command=self._stop_alarm).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         ttk.Button(button_frame, text="贪睡5分钟", command=lambda: self._snooze_alarm(5)).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
     
-    def _stop_alarm(self):
-        """停止闹钟"""
+    def _stop_alarm(self, kind=STOP):
+        """停止闹钟，kind 为写入响铃历史的事件类型"""
+        if self.history and self.is_ringing and self.ringing_alarm:
+            self.history.record(kind, self.ringing_alarm)
         self.is_ringing = False
+        self._alarm_waiter.notify()
         
         if self.player:
             self.player.music.stop()
+            # 停止循环播放的默认铃声（没有保留通道时停止所有通道）
+            if self.ring_channel:
+                self.ring_channel.stop()
+            else:
+                self.player.stop()
         
         if hasattr(self, "ringing_window"):
             self.ringing_window.destroy()
@@ -1282,23 +1472,15 @@ class VisualAlarmClock:
             return
         
         # 停止当前响铃
-        self._stop_alarm()
-        
-        # 创建贪睡闹钟
-        now = datetime.datetime.now()
-        snooze_time = now + datetime.timedelta(minutes=minutes)
+        self._stop_alarm(SNOOZE)
         
-        snooze_alarm = self.ringing_alarm.copy()
-        snooze_alarm["id"] = len(self.alarms) + 1
-        snooze_alarm["time"] = snooze_time
-        snooze_alarm["label"] = f"贪睡 - {self.ringing_alarm['label']}"
-        
-        # 添加到闹钟列表
-        self.alarms.append(snooze_alarm)
+        # 在引擎中以原ID改期，不复制闹钟、不重新排序列表
+        snooze_alarm = self.engine.snooze(self.ringing_alarm, minutes)
         self._update_next_alarm()
+        self._refresh_alarm_list()
         
         # 更新状态
-        time_str = snooze_time.strftime("%H:%M")
+        time_str = snooze_alarm["time"].strftime("%H:%M")
         self.status_var.set(f"贪睡闹钟已设置: {time_str}")
         logging.info(f"贪睡闹钟已设置: {time_str} - {self.ringing_alarm['label']}")
 
@@ -1308,7 +1490,11 @@ class VisualAlarmClock:
 if __name__ == "__main__":
     try:
         root = tk.Tk()
-        app = VisualAlarmClock(root)
+        # --columns: 日程提醒总是使用列式索引（需要 numpy），默认按日程数量选择
+        app = VisualAlarmClock(root, column_store=True if "--columns" in sys.argv[1:] else None)
+        # --sqlite: 日程保存在 SQLite 数据库中（适合大量日程）
+        app.enable_persistence(schedule_db=ScheduleDB() if "--sqlite" in sys.argv[1:] else None)
+        root.protocol("WM_DELETE_WINDOW", app.on_closing)
         root.mainloop()
     except Exception as e:
         logging.error(f"应用程序错误: {e}")